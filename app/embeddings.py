@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+# =====================================================
+# EMBEDDING BACKENDS
+# =====================================================
+# Both produce the same vectors (bge-small-en: CLS pooling + L2 norm), so
+# an index built with one can be queried with the other:
+#   - sentence-transformers : full PyTorch model (default)
+#   - onnx                  : ONNX Runtime + tokenizers, no torch import;
+#                             model from scripts/export_onnx_embedder.py
+#
+# EMBEDDING_BACKEND   sentence-transformers | onnx
+# EMBEDDING_MODEL     HF model id for sentence-transformers
+# EMBEDDING_ONNX_DIR  directory holding tokenizer.json + model*.onnx
+# EMBEDDING_ONNX_FILE model.onnx | model_int8.onnx
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en")
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "models/bge-small-en-onnx")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "model.onnx")
+
+MAX_TOKENS = 512
+
+
+class SentenceTransformerEmbedder:
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        # Imported here so the onnx path never loads torch
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: list) -> np.ndarray:
+        return np.asarray(self.model.encode(texts), dtype=np.float32)
+
+
+class OnnxEmbedder:
+    name = "onnx"
+
+    def __init__(
+        self,
+        model_dir: str | Path = EMBEDDING_ONNX_DIR,
+        model_file: str = EMBEDDING_ONNX_FILE,
+        threads: int | None = None,
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        model_path = model_dir / model_file
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"ONNX embedder not found: {model_path} "
+                "(run scripts/export_onnx_embedder.py)"
+            )
+
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_TOKENS)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts: list) -> np.ndarray:
+        batch = self.tokenizer.encode_batch(list(texts))
+
+        inputs = {
+            "input_ids": np.array([e.ids for e in batch], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in batch], dtype=np.int64),
+        }
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in batch], dtype=np.int64)
+
+        hidden = self.session.run(None, inputs)[0]
+
+        # bge: CLS token + L2 normalisation (same as its sentence-transformers config)
+        cls = hidden[:, 0].astype(np.float32)
+        return cls / np.maximum(np.linalg.norm(cls, axis=1, keepdims=True), 1e-12)
+
+
+BACKENDS = {
+    SentenceTransformerEmbedder.name: SentenceTransformerEmbedder,
+    OnnxEmbedder.name: OnnxEmbedder,
+}
+
+
+def get_embedder(backend: str | None = None):
+    backend = backend or EMBEDDING_BACKEND
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend} (expected one of {list(BACKENDS)})")
+
+    return BACKENDS[backend]()
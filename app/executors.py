@@ -0,0 +1,35 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+# =====================================================
+# EXECUTORS FOR BLOCKING WORK (KEEP THE EVENT LOOP FREE)
+# =====================================================
+# - CPU pool: Whisper / local model inference. Small, so concurrent
+#   requests queue instead of oversubscribing the cores (torch and
+#   CTranslate2 already use several threads per call and release the GIL).
+# - IO pool: pipelines that mostly wait on Ollama / NVIDIA HTTP calls.
+#   Large, since those threads are idle while the model generates.
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "1"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+
+CPU_POOL = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+IO_POOL = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(CPU_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def run_io(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IO_POOL, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown():
+    CPU_POOL.shutdown(wait=False, cancel_futures=True)
+    IO_POOL.shutdown(wait=False, cancel_futures=True)
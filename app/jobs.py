@@ -0,0 +1,413 @@
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import ipaddress
+import threading
+from urllib.parse import urlsplit
+from pathlib import Path
+from contextlib import contextmanager
+
+import requests
+
+
+# =====================================================
+# PERSISTENT JOB QUEUE (SQLITE, NO BROKER)
+# =====================================================
+# Jobs survive restarts and crashed workers: a running job holds a lease
+# (heartbeat renewed every JOBS_LEASE_S / 3 by the process running it);
+# a job whose heartbeat is older than JOBS_LEASE_S was left by a dead
+# process and is re-queued, up to JOBS_MAX_ATTEMPTS claims, then failed.
+# Workers claim the highest priority, oldest job with BEGIN IMMEDIATE,
+# so several worker threads (or processes sharing the same file) never
+# run the same job twice.
+#
+# Webhooks are delivered by their own thread, never by a job worker.
+# Only http(s) URLs to JOBS_WEBHOOK_HOSTS (comma-separated) are accepted;
+# without an allow-list the host must resolve to public addresses only.
+#
+# status: queued → running → done | failed
+
+JOBS_DB = os.getenv("JOBS_DB", "data/jobs.sqlite3")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_POLL_S = float(os.getenv("JOBS_POLL_S", "1.0"))
+JOBS_RETENTION_S = float(os.getenv("JOBS_RETENTION_S", str(7 * 86400)))
+JOBS_LEASE_S = float(os.getenv("JOBS_LEASE_S", "120"))
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "3"))
+WEBHOOK_TIMEOUT_S = float(os.getenv("JOBS_WEBHOOK_TIMEOUT_S", "10"))
+WEBHOOK_RETRIES = int(os.getenv("JOBS_WEBHOOK_RETRIES", "3"))
+WEBHOOK_HOSTS = {
+    h.strip().lower() for h in os.getenv("JOBS_WEBHOOK_HOSTS", "").split(",") if h.strip()
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    kind      TEXT NOT NULL,
+    priority  INTEGER NOT NULL DEFAULT 0,
+    status    TEXT NOT NULL,
+    payload   TEXT NOT NULL,
+    result    TEXT,
+    error     TEXT,
+    webhook   TEXT,
+    created   REAL NOT NULL,
+    started   REAL,
+    heartbeat REAL,
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    finished  REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created);
+"""
+
+
+class JobQueue:
+    def __init__(self, path: str | Path = JOBS_DB, workers: int = JOBS_WORKERS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+
+        self._handlers = {}
+        self._cleanups = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        # Jobs running in this process → heartbeats renewed by _keep_leases
+        self._running = set()
+        self._running_lock = threading.Lock()
+        self._webhooks = queue.Queue()
+
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            # Files created before leases / attempt counts existed
+            columns = {r["name"] for r in db.execute("PRAGMA table_info(jobs)")}
+            for name, decl in (("heartbeat", "REAL"), ("attempts", "INTEGER NOT NULL DEFAULT 0")):
+                if name not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
+            db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?",
+                (time.time() - JOBS_RETENTION_S,),
+            )
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per operation → safe from any thread
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            yield db
+        finally:
+            db.close()
+
+    # --------------------------------------------------
+    # PRODUCER
+    # --------------------------------------------------
+    def register(self, kind: str, handler, cleanup=None):
+        """
+        handler(payload) → JSON-serialisable result
+        cleanup(payload) → runs after the job finishes either way
+        """
+        self._handlers[kind] = handler
+        if cleanup:
+            self._cleanups[kind] = cleanup
+
+    def submit(self, kind: str, payload: dict, priority: int = 0, webhook: str | None = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, priority, status, payload, webhook, created) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, int(priority), json.dumps(payload), webhook, time.time()),
+            )
+
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+            if row is None:
+                return None
+
+            job = _as_dict(row)
+            if job["status"] == "queued":
+                job["position"] = db.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' "
+                    "AND (priority > ? OR (priority = ? AND created < ?))",
+                    (row["priority"], row["priority"], row["created"]),
+                ).fetchone()[0]
+
+        return job
+
+    def pending_payloads(self) -> list:
+        """Payloads of queued / running jobs (files they still need)."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT payload FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        return [json.loads(r["payload"]) for r in rows]
+
+    # --------------------------------------------------
+    # METRICS
+    # --------------------------------------------------
+    def stats(self) -> dict:
+        now = time.time()
+
+        with self._connect() as db:
+            by_status = dict(db.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall())
+            by_priority = dict(db.execute(
+                "SELECT priority, COUNT(*) FROM jobs WHERE status = 'queued' GROUP BY priority"
+            ).fetchall())
+            oldest = db.execute(
+                "SELECT MIN(created) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+            recent = db.execute(
+                "SELECT AVG(started - created), AVG(finished - started) FROM ("
+                " SELECT created, started, finished FROM jobs WHERE status = 'done'"
+                " ORDER BY finished DESC LIMIT 100)"
+            ).fetchone()
+
+        return {
+            "queue_depth": by_status.get("queued", 0),
+            "running": by_status.get("running", 0),
+            "done": by_status.get("done", 0),
+            "failed": by_status.get("failed", 0),
+            "queued_by_priority": {str(p): n for p, n in sorted(by_priority.items(), reverse=True)},
+            "oldest_queued_age_s": round(now - oldest, 1) if oldest else 0.0,
+            "avg_wait_s": round(recent[0], 2) if recent[0] is not None else None,
+            "avg_run_s": round(recent[1], 2) if recent[1] is not None else None,
+            "workers": self.workers,
+        }
+
+    # --------------------------------------------------
+    # WORKERS
+    # --------------------------------------------------
+    def start(self):
+        # Crashed mid-job (previous run or another process) → run it again
+        self._requeue_expired()
+
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+        for target, name in ((self._keep_leases, "job-leases"), (self._deliver_webhooks, "job-webhooks")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def _claim(self) -> dict | None:
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' "
+                "ORDER BY priority DESC, created LIMIT 1"
+            ).fetchone()
+
+            if row is None:
+                db.execute("COMMIT")
+                return None
+
+            started = time.time()
+            db.execute(
+                "UPDATE jobs SET status = 'running', started = ?, heartbeat = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                (started, started, row["id"]),
+            )
+            db.execute("COMMIT")
+
+        with self._running_lock:
+            self._running.add(row["id"])
+        return {**dict(row), "started": started}
+
+    def _finish(self, job_id: str, result=None, error: str | None = None):
+        with self._running_lock:
+            self._running.discard(job_id)
+
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?",
+                (
+                    "failed" if error is not None else "done",
+                    json.dumps(result, default=str) if error is None else None,
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    # --------------------------------------------------
+    # LEASES
+    # --------------------------------------------------
+    def _keep_leases(self):
+        while not self._stop.wait(JOBS_LEASE_S / 3):
+            try:
+                with self._running_lock:
+                    running = list(self._running)
+                if running:
+                    with self._connect() as db:
+                        db.execute(
+                            f"UPDATE jobs SET heartbeat = ? WHERE status = 'running' "
+                            f"AND id IN ({','.join('?' * len(running))})",
+                            (time.time(), *running),
+                        )
+                self._requeue_expired()
+            except Exception as e:
+                print(f"⚠️ Job lease renewal failed: {e}")
+
+    def _requeue_expired(self):
+        cutoff = time.time() - JOBS_LEASE_S
+
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            expired = db.execute(
+                "SELECT id, kind, payload, webhook, attempts FROM jobs "
+                "WHERE status = 'running' AND COALESCE(heartbeat, started, 0) < ?",
+                (cutoff,),
+            ).fetchall()
+
+            # Claimed JOBS_MAX_ATTEMPTS times and never finished → it kills its worker
+            failed = [r for r in expired if r["attempts"] >= JOBS_MAX_ATTEMPTS]
+            for r in expired:
+                if r in failed:
+                    db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?",
+                        (f"Worker lost {r['attempts']} times while running this job", time.time(), r["id"]),
+                    )
+                else:
+                    db.execute(
+                        "UPDATE jobs SET status = 'queued', started = NULL, heartbeat = NULL WHERE id = ?",
+                        (r["id"],),
+                    )
+            db.execute("COMMIT")
+
+        for r in failed:
+            print(f"❌ Job {r['id']} ({r['kind']}) failed after {r['attempts']} attempts")
+            self._cleanup(r["id"], r["kind"], json.loads(r["payload"]))
+            if r["webhook"]:
+                self._webhooks.put((r["webhook"], r["id"]))
+
+        requeued = len(expired) - len(failed)
+        if requeued:
+            print(f"⚠️ Re-queued {requeued} job(s) whose worker stopped renewing its lease")
+            self._wake.set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            # One bad iteration (locked DB, failing cleanup / webhook) must
+            # not kill the thread: nothing would restart it
+            try:
+                self._work_once()
+            except Exception as e:
+                print(f"❌ Job worker error: {e}")
+                self._stop.wait(JOBS_POLL_S)
+
+    def _work_once(self):
+        job = self._claim()
+
+        if job is None:
+            # Woken by submit() in this process, polling covers other processes
+            self._wake.wait(JOBS_POLL_S)
+            self._wake.clear()
+            return
+
+        payload = json.loads(job["payload"])
+        try:
+            result = self._handlers[job["kind"]](payload)
+            self._finish(job["id"], result=result)
+        except Exception as e:
+            # str() of e.g. TimeoutError() is "" → keep the type
+            error = str(e) or repr(e)
+            print(f"❌ Job {job['id']} ({job['kind']}) failed: {error}")
+            self._finish(job["id"], error=error)
+        finally:
+            self._cleanup(job["id"], job["kind"], payload)
+
+        if job["webhook"]:
+            self._webhooks.put((job["webhook"], job["id"]))
+
+    def _cleanup(self, job_id: str, kind: str, payload: dict):
+        cleanup = self._cleanups.get(kind)
+        if cleanup:
+            try:
+                cleanup(payload)
+            except Exception as e:
+                print(f"⚠️ Job {job_id} cleanup failed: {e}")
+
+    # --------------------------------------------------
+    # WEBHOOKS
+    # --------------------------------------------------
+    def _deliver_webhooks(self):
+        while not self._stop.is_set():
+            try:
+                url, job_id = self._webhooks.get(timeout=JOBS_POLL_S)
+            except queue.Empty:
+                continue
+            try:
+                self._notify(url, self.get(job_id))
+            except Exception as e:
+                print(f"⚠️ Webhook {url} for job {job_id} failed: {e}")
+
+    def _notify(self, url: str, job: dict):
+        # Re-checked at delivery: the host may resolve elsewhere by now
+        check_webhook_url(url)
+
+        for attempt in range(WEBHOOK_RETRIES):
+            try:
+                r = requests.post(url, json=job, timeout=WEBHOOK_TIMEOUT_S, allow_redirects=False)
+                if r.status_code < 500:
+                    return
+            except Exception as e:
+                print(f"⚠️ Webhook {url} attempt {attempt + 1} failed: {e}")
+            time.sleep(2 ** attempt)
+
+
+def check_webhook_url(url: str) -> str:
+    """
+    ValueError unless `url` is http(s) and its host is in WEBHOOK_HOSTS
+    or, without an allow-list, resolves to public addresses only.
+    Resolves the host → call it off the event loop.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("webhook_url must be an http(s) URL")
+
+    host = parts.hostname.lower()
+    if WEBHOOK_HOSTS:
+        if host not in WEBHOOK_HOSTS:
+            raise ValueError(f"webhook host not allowed: {host}")
+        return url
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parts.port or None)}
+    except (socket.gaierror, UnicodeError):
+        raise ValueError(f"webhook host does not resolve: {host}") from None
+
+    for address in addresses:
+        # Internal, loopback, link-local (cloud metadata), reserved ...
+        if not ipaddress.ip_address(address.split("%")[0]).is_global:
+            raise ValueError(f"webhook host is not public: {host}")
+    return url
+
+
+def _as_dict(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job.pop("payload", None)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
@@ -0,0 +1,122 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.base_llm import BaseLLM
+
+
+class _Batch:
+    def __init__(self, key, kwargs: dict):
+        self.key = key
+        self.kwargs = kwargs
+        self.items = []
+
+
+class BatchingLLM(BaseLLM):
+    """
+    Micro-batching dispatcher in front of an LLM backend.
+
+    Calls for the same phase with the same system prompt (i.e. the same
+    rubric-bearing prefix) that arrive within `max_wait_ms` of each other
+    are collected and sent as one `ask_batch(system_prompt, user_prompts,
+    **kwargs)` call. `ask_batch` returns one answer per prompt, or the
+    exception that prompt failed with.
+
+    Only wrap backends that implement `ask_batch` (NvidiaLLM: concurrent
+    completions sharing the prefix). Ollama requests are serialised by
+    the residency scheduler, so LLMClient is used unwrapped.
+    Calls without a `phase` are passed straight through.
+    """
+
+    def __init__(
+        self,
+        backend,
+        max_wait_ms: float | None = None,
+        max_batch: int | None = None,
+    ):
+        if not hasattr(backend, "ask_batch"):
+            raise TypeError(f"{type(backend).__name__} has no ask_batch, use it unwrapped")
+
+        self.backend = backend
+        self.max_wait = (
+            float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "20"))
+            if max_wait_ms is None else max_wait_ms
+        ) / 1000
+        self.max_batch = (
+            int(os.getenv("LLM_BATCH_MAX_SIZE", "32"))
+            if max_batch is None else max_batch
+        )
+
+        self._lock = threading.Lock()
+        self._batches = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_batch,
+            thread_name_prefix="llm-batch"
+        )
+
+    # --------------------------------------------------
+    # BaseLLM
+    # --------------------------------------------------
+    def ask(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        phase = kwargs.get("phase")
+
+        if phase is None or self.max_wait <= 0 or self.max_batch <= 1:
+            return self.backend.ask(system_prompt, user_prompt, **kwargs)
+
+        key = (
+            phase,
+            system_prompt,
+            tuple(sorted((k, repr(v)) for k, v in kwargs.items())),
+        )
+        future = Future()
+
+        with self._lock:
+            batch = self._batches.get(key)
+
+            if batch is None:
+                batch = _Batch(key, kwargs)
+                self._batches[key] = batch
+                timer = threading.Timer(self.max_wait, self._flush, (batch,))
+                timer.daemon = True
+                timer.start()
+
+            batch.items.append((user_prompt, future))
+            full = len(batch.items) >= self.max_batch
+
+        if full:
+            self._flush(batch)
+
+        return future.result()
+
+    # --------------------------------------------------
+    # INTERNAL
+    # --------------------------------------------------
+    def _flush(self, batch: _Batch):
+        with self._lock:
+            # Timer and size trigger can both fire → only the first wins
+            if self._batches.get(batch.key) is not batch:
+                return
+            del self._batches[batch.key]
+
+        system_prompt = batch.key[1]
+        user_prompts = [u for u, _ in batch.items]
+        futures = [f for _, f in batch.items]
+
+        self._executor.submit(
+            self._run_batch, system_prompt, user_prompts, futures, batch.kwargs
+        )
+
+    def _run_batch(self, system_prompt, user_prompts, futures, kwargs):
+        try:
+            results = self.backend.ask_batch(
+                system_prompt, user_prompts, **kwargs
+            )
+            for future, result in zip(futures, results):
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
@@ -0,0 +1,162 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.base_llm import BaseLLM
+from app.singleflight import SingleFlight
+
+
+class ResponseCache:
+    """
+    In-process LRU of raw LLM responses with a TTL.
+
+    Keyed on a hash of (model, system prompt, user prompt, call kwargs),
+    so identical phase calls (same rubric, same transcript / essay) are
+    answered once, whichever pipeline makes them.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_s: float = 86400):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_s:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: str):
+        """get() without touching LRU order or hit / miss counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_s:
+                return None
+            return entry[1]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class CachedLLM(BaseLLM):
+    """
+    Read-through response cache in front of any LLM backend.
+
+    validate: optional raw → bool; responses failing it (e.g. unparseable
+    JSON) are returned but not cached, so the next call retries.
+    validators: {phase: raw → bool}, used instead of validate for calls
+    made with that phase= (e.g. phase_fast must carry every band).
+
+    Misses go through a single-flight group on the same key: identical
+    prompts already in flight (concurrent duplicate submissions) are sent
+    to the backend once and every caller gets that response.
+    """
+
+    def __init__(self, backend, cache: ResponseCache | None = None, validate=None,
+                 flight: SingleFlight | None = None, validators: dict | None = None):
+        self.backend = backend
+        self.cache = cache or get_response_cache()
+        self.validate = validate
+        self.validators = validators or {}
+        self.flight = flight or get_llm_flight()
+        self.model = _model_name(backend)
+
+    def ask(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        key = cache_key(self.model, system_prompt, user_prompt, kwargs)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        return self.flight.do(key, self._fetch, key, system_prompt, user_prompt, kwargs)
+
+    def _fetch(self, key: str, system_prompt: str, user_prompt: str, kwargs: dict) -> str:
+        # A flight for this key may have finished between get() and do()
+        cached = self.cache.peek(key)
+        if cached is not None:
+            return cached
+
+        raw = self.backend.ask(system_prompt, user_prompt, **kwargs)
+
+        # Backends return "" on failure → never cache it
+        validate = self.validators.get(kwargs.get("phase"), self.validate)
+        if raw and (validate is None or validate(raw)):
+            self.cache.put(key, raw)
+        return raw
+
+
+def cache_key(model: str, system_prompt: str, user_prompt: str, kwargs: dict) -> str:
+    h = hashlib.sha256()
+    for part in (
+        model,
+        system_prompt,
+        user_prompt,
+        json.dumps(kwargs, sort_keys=True, default=str),
+    ):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _model_name(llm) -> str:
+    # Unwrap BatchingLLM / CachedLLM wrappers
+    while not hasattr(llm, "model") and hasattr(llm, "backend"):
+        llm = llm.backend
+    return str(getattr(llm, "model", type(llm).__name__))
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache shared by every CachedLLM."""
+    global _cache
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                max_entries=int(os.getenv("LLM_CACHE_SIZE", "2048")),
+                ttl_s=float(os.getenv("LLM_CACHE_TTL_S", "86400")),
+            )
+        return _cache
+
+
+_flight = None
+
+
+def get_llm_flight() -> SingleFlight:
+    """Process-wide in-flight group shared by every CachedLLM."""
+    global _flight
+
+    with _cache_lock:
+        if _flight is None:
+            _flight = SingleFlight()
+        return _flight
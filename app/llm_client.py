@@ -1,26 +1,50 @@
 import requests
 import json
+from contextlib import nullcontext
+
+from app.ollama_config import OLLAMA_URL, ollama_request_fields
+from app.model_scheduler import get_scheduler
+from app.llm_metrics import PREFIX_CACHE
 
 class LLMClient:
-    def __init__(self, model_name="llama3.1"):
+    def __init__(self, model_name="llama3.1", **options):
+        """
+        options: default Ollama options for every call
+                 (num_ctx, num_thread, keep_alive, temperature, ...)
+        """
         self.model = model_name
-        self.url = "http://127.0.0.1:11434/api/chat"
+        self.url = f"{OLLAMA_URL}/api/chat"
+        self.options = options
+        self.scheduler = get_scheduler()
+
+    def ask(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        """
+        kwargs:
+        - phase: phase name used to pick keep_alive / num_ctx / options
+        - any Ollama option, overriding the phase defaults
+        """
+        phase = kwargs.pop("phase", None)
 
-    def ask(self, system_prompt: str, user_prompt: str) -> str:
         payload = {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            "stream": False
+            "stream": False,
+            **ollama_request_fields(phase, **{**self.options, **kwargs}),
         }
 
+        slot = self.scheduler.use(self.model) if self.scheduler else nullcontext()
+
         try:
-            r = requests.post(self.url, json=payload)
+            with slot:
+                r = requests.post(self.url, json=payload)
             r.raise_for_status()
+            data = r.json()
+            PREFIX_CACHE.record_ollama(phase, system_prompt + user_prompt, data)
             # TRẢ VỀ RAW STRING, KHÔNG PARSE JSON Ở ĐÂY
-            return r.json()["message"]["content"]
+            return data["message"]["content"]
         except Exception as e:
             print(f"LLM Error: {e}")
-            return ""
\ No newline at end of file
+            return ""
@@ -0,0 +1,114 @@
+import threading
+
+
+class PrefixCacheStats:
+    """
+    Per backend/phase prefill accounting (plus completion tokens, for
+    per-phase token cost).
+
+    Completion tokens are split into reasoning (<think>, never returned)
+    and answer tokens; stopped_early counts streams cut as soon as the
+    answer JSON was complete.
+
+    - OpenAI-compatible backends report usage.prompt_tokens and
+      usage.prompt_tokens_details.cached_tokens → exact hit rate
+    - Ollama only reports prompt_eval_count (tokens actually evaluated),
+      so the prompt size is estimated from its length and the hit rate
+      is marked as estimated
+    """
+
+    # Rough chars/token for English prompts (llama / qwen tokenizers)
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def record(
+        self,
+        backend: str,
+        phase: str | None,
+        prompt_tokens: int,
+        cached_tokens: int,
+        prefill_ms: float | None = None,
+        estimated: bool = False,
+        completion_tokens: int = 0,
+        reasoning_tokens: int = 0,
+        stopped_early: bool = False,
+    ):
+        key = (backend, phase or "unknown")
+
+        with self._lock:
+            row = self._rows.setdefault(key, {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "cached_tokens": 0,
+                "completion_tokens": 0,
+                "reasoning_tokens": 0,
+                "stopped_early": 0,
+                "prefill_ms": 0.0,
+                "estimated": False,
+            })
+            row["calls"] += 1
+            row["prompt_tokens"] += max(0, int(prompt_tokens or 0))
+            row["cached_tokens"] += max(0, int(cached_tokens or 0))
+            row["completion_tokens"] += max(0, int(completion_tokens or 0))
+            row["reasoning_tokens"] += max(0, int(reasoning_tokens or 0))
+            row["stopped_early"] += int(bool(stopped_early))
+            row["prefill_ms"] += prefill_ms or 0.0
+            row["estimated"] = row["estimated"] or estimated
+
+    def record_ollama(self, phase, prompt_text: str, response: dict):
+        estimated_prompt = len(prompt_text) // self.CHARS_PER_TOKEN
+        evaluated = response.get("prompt_eval_count") or 0
+        duration_ns = response.get("prompt_eval_duration") or 0
+
+        self.record(
+            backend="ollama",
+            phase=phase,
+            prompt_tokens=max(estimated_prompt, evaluated),
+            cached_tokens=max(0, estimated_prompt - evaluated),
+            prefill_ms=duration_ns / 1e6,
+            estimated=True,
+            completion_tokens=response.get("eval_count") or 0,
+        )
+
+    def record_openai(self, backend: str, phase, usage, reasoning_chars: int = 0, answer_chars: int = 0):
+        if usage is None:
+            return
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) if details else 0
+
+        # Usage has no reasoning split → apportion completion tokens by length
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        total_chars = reasoning_chars + answer_chars
+        reasoning = round(completion * reasoning_chars / total_chars) if total_chars else 0
+
+        self.record(
+            backend=backend,
+            phase=phase,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0),
+            cached_tokens=cached or 0,
+            completion_tokens=completion,
+            reasoning_tokens=reasoning,
+        )
+
+    def report(self) -> list:
+        with self._lock:
+            rows = [
+                {"backend": b, "phase": p, **row}
+                for (b, p), row in sorted(self._rows.items())
+            ]
+
+        for row in rows:
+            prompt = row["prompt_tokens"]
+            row["hit_rate"] = round(row["cached_tokens"] / prompt, 3) if prompt else 0.0
+            row["answer_tokens"] = row["completion_tokens"] - row["reasoning_tokens"]
+            row["avg_prefill_ms"] = round(row["prefill_ms"] / row["calls"], 1)
+            row["prefill_ms"] = round(row["prefill_ms"], 1)
+
+        return rows
+
+
+PREFIX_CACHE = PrefixCacheStats()
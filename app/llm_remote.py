@@ -1,29 +1,299 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from openai import OpenAI
 from app.base_llm import BaseLLM
+from app.llm_metrics import PREFIX_CACHE
+
+
+# =====================================================
+# REASONING BUDGETS (DEEPSEEK-R1 AND OTHER <think> MODELS)
+# =====================================================
+# Responses are streamed and consumed as they arrive:
+# - everything up to </think> (or delta.reasoning_content) is reasoning:
+#   counted, never returned, never scanned by extract_json
+# - reasoning past the phase's budget → stream closed, one follow-up
+#   call asks for the answer given the reasoning so far; it may reason
+#   for FOLLOW_UP_REASONING_TOKENS at most, past that the call fails
+# - a reasoning model that opens with "{" instead of <think> is
+#   answering directly → treated as answer from the first chunk
+# - generation is cut as soon as the answer holds one complete JSON
+#   object (every phase prompt asks for JSON only)
+#
+# Token counts are per streamed chunk (≈ one token each), so they are
+# recorded as estimated.
+#
+# NVIDIA_STREAM=0 → single non-streamed call, <think> still stripped.
+
+REASONING_BUDGETS = {
+    "default": {"reasoning_tokens": 2048, "max_tokens": 4096},
+
+    # Structure extraction: nothing to deliberate
+    "phase1_parse": {"reasoning_tokens": 512, "max_tokens": 2048},
+    "phase1_parse_task2": {"reasoning_tokens": 512, "max_tokens": 2048},
+
+    # Gated rubric judgments: most of the value of a reasoning model
+    "phase2_ta": {"reasoning_tokens": 2048, "max_tokens": 4096},
+    "phase2_tr": {"reasoning_tokens": 2048, "max_tokens": 4096},
+
+    "phase3_cc": {"reasoning_tokens": 1024, "max_tokens": 3072},
+    "phase4_lr": {"reasoning_tokens": 1024, "max_tokens": 3072},
+    "phase5_gra": {"reasoning_tokens": 1024, "max_tokens": 3072},
+
+    "phase_fast": {"reasoning_tokens": 768, "max_tokens": 2048},
+
+    # Long JSON answer, little to decide (bands are final already)
+    "phase7_feedback": {"reasoning_tokens": 1024, "max_tokens": 4096},
+    "phase7_feedback_task2": {"reasoning_tokens": 1024, "max_tokens": 4096},
+}
+
+NVIDIA_STREAM = os.getenv("NVIDIA_STREAM", "1") != "0"
+
+# Concurrent completions per ask_batch (NIM shares the prompt prefix
+# between in-flight requests with automatic prefix caching)
+NVIDIA_BATCH_CONCURRENCY = int(os.getenv("NVIDIA_BATCH_CONCURRENCY", "8"))
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+FOLLOW_UP = "Your reasoning budget is used up. Reply now with ONLY the final JSON object."
+FOLLOW_UP_REASONING_TOKENS = int(os.getenv("NVIDIA_FOLLOW_UP_REASONING_TOKENS", "128"))
+
+
+def strip_reasoning(text: str) -> tuple:
+    """(reasoning, answer) of a full response; no </think> → all answer."""
+    text = text or ""
+    if THINK_CLOSE not in text:
+        return "", text.replace(THINK_OPEN, "", 1).strip()
+    reasoning, _, answer = text.partition(THINK_CLOSE)
+    return reasoning.replace(THINK_OPEN, "", 1).strip(), answer.strip()
+
+
+class JSONEndDetector:
+    """Incremental brace matcher: end offset of the first complete JSON object."""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.seen = 0
+
+    def feed(self, text: str) -> int | None:
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.depth:
+                self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    end = self.seen + i + 1
+                    self.seen += len(text)
+                    return end
+        self.seen += len(text)
+        return None
+
 
 class NvidiaLLM(BaseLLM):
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model: str = "deepseek-ai/deepseek-r1"):
         if not api_key:
             raise ValueError("Missing NVIDIA API key")
 
+        self.model = model
+        # R1-style models open every answer with a <think> block
+        self.reasoning = "r1" in model.lower()
+
         self.client = OpenAI(
             base_url="https://integrate.api.nvidia.com/v1",
             api_key=api_key
         )
+        self._batch_pool = ThreadPoolExecutor(
+            max_workers=NVIDIA_BATCH_CONCURRENCY,
+            thread_name_prefix="nvidia-batch"
+        )
+
+    def ask_batch(self, system_prompt: str, user_prompts: list, **kwargs) -> list:
+        """
+        Same system prompt, several essays: sent as concurrent completions,
+        back to back, so the rubric prefix is prefilled once server-side.
+        Returns one answer per prompt, or the exception it failed with.
+        """
+        futures = [
+            self._batch_pool.submit(self.ask, system_prompt, user_prompt, **kwargs)
+            for user_prompt in user_prompts
+        ]
+
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
 
     def ask(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        phase = kwargs.get("phase")
+        budget = REASONING_BUDGETS.get(phase) or REASONING_BUDGETS["default"]
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        params = {
+            "temperature": kwargs.get("temperature", 0.6),
+            "top_p": kwargs.get("top_p", 0.7),
+            "max_tokens": kwargs.get("max_tokens", budget["max_tokens"]),
+        }
+
+        if not NVIDIA_STREAM:
+            return self._ask_once(messages, phase, params)
+
+        reasoning_cap = kwargs.get("reasoning_tokens", budget["reasoning_tokens"])
+        out = self._stream(messages, params, reasoning_cap if self.reasoning else None)
+
+        if out["budget_hit"]:
+            # Keep the reasoning so far, ask for the answer only
+            follow_up = messages + [
+                {"role": "assistant", "content": out["reasoning"]},
+                {"role": "user", "content": FOLLOW_UP},
+            ]
+            extra = self._stream(follow_up, params, FOLLOW_UP_REASONING_TOKENS if self.reasoning else None)
+            for k in ("reasoning_tokens", "answer_tokens"):
+                out[k] += extra[k]
+            if extra["budget_hit"]:
+                raise RuntimeError(
+                    f"{phase}: model kept reasoning after its budget ({reasoning_cap} tokens) was used up"
+                )
+            out["answer"] = extra["answer"]
+            out["stopped_early"] = extra["stopped_early"]
+            print(f"⚠️ {phase}: reasoning budget ({reasoning_cap} tokens) reached, answer forced")
+
+        prompt_chars = len(system_prompt) + len(user_prompt)
+        PREFIX_CACHE.record(
+            backend="nvidia",
+            phase=phase,
+            prompt_tokens=prompt_chars // PREFIX_CACHE.CHARS_PER_TOKEN,
+            cached_tokens=0,
+            estimated=True,
+            completion_tokens=out["reasoning_tokens"] + out["answer_tokens"],
+            reasoning_tokens=out["reasoning_tokens"],
+            stopped_early=out["stopped_early"],
+        )
+
+        return out["answer"]
+
+    # --------------------------------------------------
+    # STREAMED CALL
+    # --------------------------------------------------
+    def _stream(self, messages: list, params: dict, reasoning_cap: int | None) -> dict:
+        """
+        reasoning_cap: None → reasoning not capped (and not expected when
+        the model is not a reasoning model).
+        """
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+
+        expect_think = self.reasoning
+        text = ""            # content before </think> is found
+        held = 0             # chunks in text
+        reasoning = []
+        answer = []
+        detector = JSONEndDetector()
+        out = {"reasoning_tokens": 0, "answer_tokens": 0, "stopped_early": False, "budget_hit": False}
+
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+
+                # Reasoning as a separate field (some deployments)
+                separate = getattr(delta, "reasoning_content", None)
+                if separate:
+                    reasoning.append(separate)
+                    out["reasoning_tokens"] += 1
+                    expect_think = False
+
+                piece = delta.content or ""
+                if not piece:
+                    if separate and reasoning_cap is not None and out["reasoning_tokens"] > reasoning_cap:
+                        out["budget_hit"] = True
+                        break
+                    continue
+
+                if expect_think:
+                    # Inline <think> block: hold everything until </think>
+                    text += piece
+                    held += 1
+                    out["reasoning_tokens"] += 1
+
+                    if text.lstrip().startswith("{"):
+                        # No <think> at all: answering directly
+                        out["reasoning_tokens"] -= held
+                        out["answer_tokens"] += held
+                        expect_think = False
+                        piece, text = text, ""
+                    elif THINK_CLOSE not in text:
+                        if reasoning_cap is not None and out["reasoning_tokens"] > reasoning_cap:
+                            reasoning.append(text.replace(THINK_OPEN, "", 1))
+                            out["budget_hit"] = True
+                            break
+                        continue
+                    else:
+                        head, _, piece = text.partition(THINK_CLOSE)
+                        reasoning.append(head.replace(THINK_OPEN, "", 1))
+                        expect_think = False
+                        text = ""
+                        if not piece:
+                            continue
+                else:
+                    out["answer_tokens"] += 1
+
+                end = detector.feed(piece)
+                if end is not None:
+                    # One complete JSON object → nothing useful follows
+                    answer.append(piece[:len(piece) - (detector.seen - end)])
+                    out["stopped_early"] = True
+                    break
+                answer.append(piece)
+        finally:
+            stream.close()
+
+        # Stream ended inside an unterminated <think>: no separate answer
+        if expect_think and text and not out["budget_hit"]:
+            _, leftover = strip_reasoning(text)
+            answer.append(leftover)
+
+        out["reasoning"] = "".join(reasoning).strip()
+        out["answer"] = "".join(answer).strip()
+        return out
+
+    # --------------------------------------------------
+    # SINGLE CALL (NVIDIA_STREAM=0)
+    # --------------------------------------------------
+    def _ask_once(self, messages: list, phase: str | None, params: dict) -> str:
         completion = self.client.chat.completions.create(
-            model="deepseek-ai/deepseek-r1",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=kwargs.get("temperature", 0.6),
-            top_p=kwargs.get("top_p", 0.7),
-            max_tokens=kwargs.get("max_tokens", 4096),
-            stream=False
+            model=self.model,
+            messages=messages,
+            stream=False,
+            **params
         )
 
         msg = completion.choices[0].message
+        reasoning, answer = strip_reasoning(msg.content)
+        reasoning = getattr(msg, "reasoning_content", None) or reasoning
+
+        PREFIX_CACHE.record_openai("nvidia", phase, completion.usage, reasoning_chars=len(reasoning),
+                                   answer_chars=len(answer))
 
-        return msg.content
+        return answer
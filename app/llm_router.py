@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import threading
+
+from app.base_llm import BaseLLM
+from app.llm_batcher import BatchingLLM
+
+
+# =====================================================
+# PER-PHASE MODEL ROUTING
+# =====================================================
+# task → phase → {"backend": "nvidia" | "ollama", "model": ...}
+# "default" covers every phase not listed. Phase names are the `phase=`
+# values passed to llm.ask in app/pipeline/phases.py.
+#
+# Mechanical phases (structure extraction) go to a small local model;
+# judgment phases stay on the model each task was tuned with.
+#
+# LLM_ROUTING_FILE: JSON with the same shape; its phases replace the
+# defaults below per task. Compare routings with scripts/eval_routing.py.
+
+ROUTING = {
+    "task1": {
+        "default": {"backend": "nvidia", "model": "deepseek-ai/deepseek-r1"},
+        # Deterministic segmentation fallback: no reasoning needed
+        "phase1_parse": {"backend": "ollama", "model": "llama3.1"},
+    },
+    "task2": {
+        "default": {"backend": "ollama", "model": "llama3.1"},
+    },
+}
+
+
+def load_routing(path: str | None = None) -> dict:
+    # Read at call time → picks up LLM_ROUTING_FILE from .env (load_dotenv)
+    path = path or os.getenv("LLM_ROUTING_FILE")
+    routing = {task: dict(routes) for task, routes in ROUTING.items()}
+    if not path:
+        return routing
+
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+
+    for task, routes in overrides.items():
+        routing.setdefault(task, {}).update(routes)
+    return routing
+
+
+# --------------------------------------------------
+# BACKENDS (ONE PER BACKEND/MODEL PER PROCESS)
+# --------------------------------------------------
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def make_backend(backend: str, model: str):
+    """
+    One backend per (backend, model). NVIDIA backends are wrapped in a
+    shared BatchingLLM: phases of different tasks routed to the same
+    model batch together. Ollama goes through the residency scheduler.
+    """
+    key = (backend, model)
+
+    with _backends_lock:
+        if key not in _backends:
+            if backend == "nvidia":
+                from app.llm_remote import NvidiaLLM
+                llm = NvidiaLLM(api_key=os.getenv("NVIDIA_API_KEY"), model=model)
+            elif backend == "ollama":
+                from app.llm_client import LLMClient
+                llm = LLMClient(model)
+            else:
+                raise ValueError(f"Unknown LLM backend: {backend}")
+
+            _backends[key] = BatchingLLM(llm) if hasattr(llm, "ask_batch") else llm
+
+        return _backends[key]
+
+
+class RoutedLLM(BaseLLM):
+    """
+    Dispatches each ask() to the backend routed for its `phase`.
+
+    Every route is built at init, so a bad routing (unknown backend,
+    missing API key) fails at startup, not on the first request.
+    """
+
+    def __init__(self, routes: dict):
+        if "default" not in routes:
+            raise ValueError("Routing needs a 'default' route")
+
+        self.routes = routes
+        self._llms = {
+            phase: make_backend(route["backend"], route["model"])
+            for phase, route in routes.items()
+        }
+
+        # CachedLLM keys on this → a different routing never shares responses
+        digest = hashlib.sha256(json.dumps(routes, sort_keys=True).encode("utf-8")).hexdigest()
+        self.model = f"routed:{digest[:12]}"
+
+    @classmethod
+    def for_task(cls, task: str, routing: dict | None = None):
+        routing = routing or load_routing()
+        return cls(routing[task])
+
+    def route(self, phase: str | None) -> dict:
+        return self.routes.get(phase) or self.routes["default"]
+
+    def ask(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        phase = kwargs.get("phase")
+        llm = self._llms.get(phase) or self._llms["default"]
+        return llm.ask(system_prompt, user_prompt, **kwargs)
@@ -1,83 +1,252 @@
-from fastapi import FastAPI, UploadFile, File, Form
-import tempfile
-import json
-import re
+from fastapi import FastAPI, Request, HTTPException
 
-from app.whisper_transcriber import Transcriber
-from app.llm_client import LLMClient
+from app.whisper_transcriber import Transcriber, SPEAKING_MODES
 from app.vision_client import VisionClient
-from app.pipeline.writing import WritingPipeline
+from app.pipeline.writing import WritingPipeline, WRITING_MODES
+from app.pipeline.speaking import SpeakingPipeline
+from app.llm_cache import get_response_cache, get_llm_flight
+from app.singleflight import AsyncSingleFlight
+from app.pipeline.score_store import submission_id, get_score_store, flush_score_store
+from app.jobs import JobQueue, check_webhook_url
+from app import executors
+from app.llm_metrics import PREFIX_CACHE
+from app.model_scheduler import get_scheduler
+from app.uploads import (
+    BodySizeLimitMiddleware, UploadStore,
+    MAX_AUDIO_BYTES, MAX_AUDIO_SECONDS, MAX_CHART_BYTES,
+)
 
 app = FastAPI()
 
+# Oversized bodies → 413 before the multipart parser spools them
+app.add_middleware(BodySizeLimitMiddleware)
+
 # ===== Global Services =====
-transcriber = Transcriber("medium")
-llm = LLMClient("llama3.1")
+transcriber = Transcriber()
 vision = VisionClient("qwen3-vl:8b")
 
 # ===== Pipeline =====
 writing_pipeline = WritingPipeline()
+speaking_pipeline = SpeakingPipeline()
+
+# ===== Uploads (memory / spooled, deduplicated, scoped cleanup) =====
+uploads = UploadStore()
+
+# File fields of the upload endpoints (suffix None → from the filename)
+AUDIO_FIELD = {"max_bytes": MAX_AUDIO_BYTES, "max_seconds": MAX_AUDIO_SECONDS, "suffix": None}
+CHART_FIELD = {"max_bytes": MAX_CHART_BYTES, "suffix": ".png"}
+
+# ===== Single-flight: double submits / client retries share one run =====
+writing_flight = AsyncSingleFlight()
+
+# ===== Job Queue =====
+jobs = JobQueue()
+
+
+def _run_writing_job(payload: dict):
+    chart = None
+    if payload.get("chart_path"):
+        try:
+            with open(payload["chart_path"], "rb") as f:
+                chart = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError("Chart upload expired before the job ran") from None
+
+    return writing_pipeline.score_writing(
+        question=payload["question"],
+        answer=payload["answer"],
+        chart=chart,
+        mode=payload.get("mode", "full"),
+    )
+
+
+def _cleanup_writing_job(payload: dict):
+    if payload.get("chart_path"):
+        uploads.discard(payload["chart_path"])
+
+
+def _job_chart_paths() -> set:
+    return {p["chart_path"] for p in jobs.pending_payloads() if p.get("chart_path")}
+
+
+jobs.register("writing", _run_writing_job, cleanup=_cleanup_writing_job)
+
+
+@app.on_event("startup")
+def start_job_workers():
+    jobs.start()
+    uploads.start_janitor(keep=_job_chart_paths)
+
+    store = get_score_store()
+    if store:
+        store.start_flusher()
+
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    jobs.stop()
+    uploads.stop_janitor()
+    executors.shutdown()
+    flush_score_store()
 
 
 # ============================================================
 # SPEAKING SCORING
 # ============================================================
 @app.post("/speaking/score")
-async def score_speaking(
-    file: UploadFile = File(...),
-    question: str = Form(...)
-):
-    with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        tmp.write(await file.read())
-        tmp_path = tmp.name
-
-    transcript = transcriber.transcribe(tmp_path)
-
-    rag_results = writing_pipeline.rag.retrieve(
-        f"IELTS Speaking {question}",
-        top_k=8,
-        where={"type": "speaking_rubric"}
+async def score_speaking(request: Request):
+    # Form parsed here, not by FastAPI: limits apply while the audio streams in.
+    # Upload removed as soon as transcription is done (Whisper / ffmpeg need a path)
+    async with uploads.form(request, files={"file": AUDIO_FIELD}) as (fields, files):
+        question = _required(fields, "question")
+        mode = fields.get("mode") or "exam"
+        _check_speaking_mode(mode)
+        audio = _required(files, "file")
+
+        # Up to MAX_AUDIO_BYTES copied to a named file → off the event loop
+        audio_path = await executors.run_io(audio.path)
+
+        # mode: exam | practice → Whisper model size (WHISPER_MODEL / WHISPER_MODEL_PRACTICE)
+        transcript = await executors.run_cpu(
+            transcriber.transcribe, audio_path, request_class=mode
+        )
+
+    return await executors.run_io(
+        speaking_pipeline.score, question=question, transcript=transcript
     )
 
-    context = "\n\n---\n\n".join(rag_results["documents"])
 
-    with open("app/prompts/speaking.txt", "r", encoding="utf-8") as f:
-        system_prompt = f.read()
-
-    user_prompt = f"""
-Context:
-{context}
+# ============================================================
+# WRITING SCORING (TASK 1 + TASK 2)
+# ============================================================
+@app.post("/writing/score")
+async def score_writing(request: Request):
+    # Fields: question, answer, chart (optional image), mode
+    # mode: fast (band estimate, one LLM call) | full (examiner flow + feedback)
+    async with uploads.form(request, files={"chart": CHART_FIELD}) as (fields, files):
+        question = _required(fields, "question")
+        answer = _required(fields, "answer")
+        mode = fields.get("mode") or "full"
+        _check_mode(mode)
+        key = f"{submission_id(question, answer)}:{mode}"
+
+        image = files.get("chart")
+        if image is None:
+            return await writing_flight.do(
+                key,
+                executors.run_io,
+                writing_pipeline.score_writing, question=question, answer=answer, mode=mode
+            )
+
+        # Chart bytes go straight to the vision model, no file re-read
+        return await writing_flight.do(
+            f"{key}:{image.sha256}",
+            executors.run_io,
+            writing_pipeline.score_writing,
+            question=question,
+            answer=answer,
+            chart=image.read(),
+            mode=mode
+        )
+
+
+def _required(values: dict, name: str):
+    value = values.get(name)
+    if value is None:
+        raise HTTPException(status_code=422, detail=f"Missing form field: {name}")
+    return value
+
+
+def _check_mode(mode: str):
+    if mode not in WRITING_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {list(WRITING_MODES)}")
+
+
+def _check_speaking_mode(mode: str):
+    if mode not in SPEAKING_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {list(SPEAKING_MODES)}")
 
-Question:
-{question}
 
-Transcript:
-{transcript}
-"""
 
-    raw = llm.ask(system_prompt, user_prompt)
-    result = json.loads(re.search(r"\{[\s\S]*\}", raw).group())
-    result["transcript"] = transcript
-    return result
+# ============================================================
+# JOBS (ASYNC SCORING + POLLING / WEBHOOK)
+# ============================================================
+@app.post("/jobs/writing", status_code=202)
+async def submit_writing_job(request: Request):
+    # Fields: question, answer, chart (optional image), priority, webhook_url, mode
+    async with uploads.form(request, files={"chart": CHART_FIELD}) as (fields, files):
+        mode = fields.get("mode") or "full"
+        _check_mode(mode)
+        try:
+            priority = int(fields.get("priority") or 0)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="priority must be an integer") from None
+        webhook_url = fields.get("webhook_url") or None
+        if webhook_url:
+            try:
+                await executors.run_io(check_webhook_url, webhook_url)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e)) from None
+
+        payload = {
+            "question": _required(fields, "question"),
+            "answer": _required(fields, "answer"),
+            "mode": mode,
+        }
+
+        image = files.get("chart")
+        if image is not None:
+            # Job-owned file, removed by _cleanup_writing_job: survives a
+            # restart and can be run by any worker process
+            payload["chart_sha256"] = image.sha256
+            payload["chart_path"] = await executors.run_io(uploads.persist, image)
+
+    try:
+        job_id = jobs.submit("writing", payload, priority=priority, webhook=webhook_url)
+    except Exception:
+        if payload.get("chart_path"):
+            uploads.discard(payload["chart_path"])
+        raise
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 # ============================================================
-# WRITING SCORING (TASK 1 + TASK 2)
+# METRICS
 # ============================================================
-@app.post("/writing/score")
-async def score_writing(
-    question: str = Form(...),
-    answer: str = Form(...),
-    chart: UploadFile | None = File(None)
-):
-    chart_path = None
-    if chart:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-            tmp.write(await chart.read())
-            chart_path = tmp.name
+@app.get("/metrics/prefix-cache")
+def prefix_cache_metrics():
+    return {"phases": PREFIX_CACHE.report()}
 
-    return writing_pipeline.score_writing(
-        question=question,
-        answer=answer,
-        chart_path=chart_path
-    )
+
+@app.get("/metrics/llm-cache")
+def llm_cache_metrics():
+    return get_response_cache().stats()
+
+
+@app.get("/metrics/single-flight")
+def single_flight_metrics():
+    return {"writing": writing_flight.stats(), "llm": get_llm_flight().stats()}
+
+
+@app.get("/metrics/scheduler")
+def scheduler_metrics():
+    scheduler = get_scheduler()
+    return scheduler.stats() if scheduler is not None else {"enabled": False}
+
+
+@app.get("/metrics/uploads")
+def upload_metrics():
+    return uploads.stats()
+
+
+@app.get("/metrics/jobs")
+def job_metrics():
+    return jobs.stats()
@@ -0,0 +1,132 @@
+import os
+import threading
+from contextlib import contextmanager
+
+
+class ModelResidencyScheduler:
+    """
+    Serialises access to a single Ollama server so that requests for the
+    model that is already loaded are served before switching models.
+
+    On a CPU box with room for one model, llama3.1 (Task 2 text phases)
+    and qwen3-vl (Task 1 chart phase) evict each other. Interleaving
+    concurrent requests in arrival order causes a reload on almost every
+    call; grouping them by model keeps reloads to one per group.
+
+    - max_parallel: requests allowed in flight on the resident model
+      (match OLLAMA_NUM_PARALLEL)
+    - max_run: how many requests the resident model may serve while
+      another model is waiting, so nobody starves
+    """
+
+    def __init__(self, max_parallel: int = 1, max_run: int = 8):
+        self.max_parallel = max_parallel
+        self.max_run = max_run
+
+        self._cond = threading.Condition()
+        self._resident = None
+        self._active = 0
+        self._run = 0
+        self._waiting = {}
+
+        self.swaps = 0
+
+    # --------------------------------------------------
+    # PUBLIC
+    # --------------------------------------------------
+    @contextmanager
+    def use(self, model: str):
+        with self._cond:
+            self._waiting[model] = self._waiting.get(model, 0) + 1
+
+            while not self._can_enter(model):
+                self._cond.wait()
+
+            self._waiting[model] -= 1
+
+            if self._resident != model:
+                if self._resident is not None:
+                    self.swaps += 1
+                self._resident = model
+                self._run = 0
+
+            self._active += 1
+            self._run += 1
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_parallel": self.max_parallel,
+                "max_run": self.max_run,
+                "resident": self._resident,
+                "active": self._active,
+                "waiting": {m: c for m, c in self._waiting.items() if c},
+                "swaps": self.swaps,
+            }
+
+    # --------------------------------------------------
+    # INTERNAL
+    # --------------------------------------------------
+    def _others_waiting(self, model: str) -> bool:
+        return any(
+            c > 0 for m, c in self._waiting.items() if m != model
+        )
+
+    def _can_enter(self, model: str) -> bool:
+        if self._active == 0:
+            return model == self._next_model()
+
+        if model != self._resident:
+            return False
+
+        if self._active >= self.max_parallel:
+            return False
+
+        return self._run < self.max_run or not self._others_waiting(model)
+
+    def _next_model(self):
+        resident = self._resident
+
+        if self._waiting.get(resident, 0) > 0:
+            if self._run < self.max_run or not self._others_waiting(resident):
+                return resident
+
+        candidates = {
+            m: c for m, c in self._waiting.items()
+            if c > 0 and m != resident
+        }
+        if not candidates:
+            return resident
+
+        return max(candidates, key=candidates.get)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ModelResidencyScheduler | None:
+    """
+    Process-wide scheduler shared by every Ollama client.
+    Disabled with OLLAMA_RESIDENCY_SCHEDULING=0 (e.g. when the server
+    has enough RAM to keep all models loaded).
+    """
+    global _scheduler
+
+    if os.getenv("OLLAMA_RESIDENCY_SCHEDULING", "1") == "0":
+        return None
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ModelResidencyScheduler(
+                max_parallel=int(os.getenv("OLLAMA_NUM_PARALLEL", "1")),
+                max_run=int(os.getenv("OLLAMA_MAX_RUN", "8")),
+            )
+        return _scheduler
@@ -0,0 +1,120 @@
+import os
+
+# =====================================================
+# OLLAMA SERVER
+# =====================================================
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434")
+
+# How long Ollama keeps a model resident after the last request.
+# "-1" = forever, "0" = unload immediately, otherwise a duration ("30m").
+DEFAULT_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Threads used for CPU inference (None → let Ollama decide)
+DEFAULT_NUM_THREAD = (
+    int(os.getenv("OLLAMA_NUM_THREAD"))
+    if os.getenv("OLLAMA_NUM_THREAD")
+    else None
+)
+
+
+# =====================================================
+# PER-PHASE REQUEST TUNING
+# =====================================================
+# keep_alive → top-level payload field
+# everything else → payload["options"]
+#
+# num_ctx is sized to the longest prompt of the phase (system prompt
+# with rubric + essay + headroom). Oversizing it costs RAM and prefill
+# time on CPU, undersizing silently truncates the rubric.
+
+PHASE_OPTIONS = {
+
+    "default": {
+        "num_ctx": 4096,
+    },
+
+    # Vision: one call per Task 1 request → don't pin the model in RAM
+    "phase0_chart": {
+        "keep_alive": "5m",
+        "num_ctx": 4096,
+        "temperature": 0,
+    },
+
+    # Structural extraction → deterministic
+    "phase1_parse": {
+        "num_ctx": 4096,
+        "temperature": 0,
+    },
+    "phase1_parse_task2": {
+        "num_ctx": 4096,
+        "temperature": 0,
+    },
+
+    # Long gated rubrics
+    "phase2_ta": {
+        "num_ctx": 6144,
+    },
+    "phase2_tr": {
+        "num_ctx": 8192,
+    },
+
+    "phase3_cc": {
+        "num_ctx": 6144,
+    },
+    "phase4_lr": {
+        "num_ctx": 6144,
+    },
+    "phase5_gra": {
+        "num_ctx": 6144,
+    },
+
+    # Fast tier: essay + features, four bands + one summary
+    "phase_fast": {
+        "num_ctx": 4096,
+        "temperature": 0,
+    },
+
+    # Free text, longest generation
+    "phase7_feedback": {
+        "num_ctx": 8192,
+    },
+    "phase7_feedback_task2": {
+        "num_ctx": 8192,
+    },
+
+    # One short rubric + transcript per criterion (SpeakingPipeline)
+    "speaking_fc": {
+        "num_ctx": 4096,
+    },
+    "speaking_lr": {
+        "num_ctx": 4096,
+    },
+    "speaking_gra": {
+        "num_ctx": 4096,
+    },
+    "speaking_pr": {
+        "num_ctx": 4096,
+    },
+}
+
+
+def ollama_request_fields(phase: str | None = None, **overrides) -> dict:
+    """
+    Build the tuning fields merged into an Ollama payload.
+
+    Returns {"keep_alive": ..., "options": {...}} for the given phase,
+    falling back to PHASE_OPTIONS["default"]. Keyword overrides win.
+    """
+    options = dict(PHASE_OPTIONS["default"])
+    options.update(PHASE_OPTIONS.get(phase, {}))
+    options.update({k: v for k, v in overrides.items() if v is not None})
+
+    keep_alive = options.pop("keep_alive", DEFAULT_KEEP_ALIVE)
+
+    if DEFAULT_NUM_THREAD and "num_thread" not in options:
+        options["num_thread"] = DEFAULT_NUM_THREAD
+
+    return {
+        "keep_alive": keep_alive,
+        "options": options,
+    }
@@ -0,0 +1,102 @@
+import os
+import threading
+from collections import OrderedDict
+
+from app.pipeline.utils import extract_exemplar
+
+
+# =====================================================
+# TASK 2 BAND EXEMPLARS (RAG)
+# =====================================================
+# Same-topic samples from the ielts_rag collection (scripts/index_rubrics.py),
+# searched with a "task" filter (same Task 2 type first, then any Task 2
+# type for the bands still missing), at most one per band, trimmed to a
+# fixed character budget so the phase2_tr prompt stays bounded. Cached
+# per (question, task type).
+
+EXEMPLAR_TOP_K = int(os.getenv("EXEMPLAR_TOP_K", "3"))
+EXEMPLAR_BUDGET = int(os.getenv("EXEMPLAR_BUDGET_CHARS", "2400"))
+EXEMPLAR_CACHE_SIZE = int(os.getenv("EXEMPLAR_CACHE_SIZE", "512"))
+
+
+class ExemplarRetriever:
+    def __init__(self, rag, top_k: int = EXEMPLAR_TOP_K, budget: int = EXEMPLAR_BUDGET):
+        self.rag = rag
+        self.top_k = top_k
+        self.budget = budget
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def retrieve(self, question: str, task_type: str) -> list:
+        """[{"id", "task", "band", "text"}] best first, within budget."""
+        key = (" ".join(question.split()).lower(), task_type)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        exemplars = self._search(question, task_type)
+
+        with self._lock:
+            self._cache[key] = exemplars
+            if len(self._cache) > EXEMPLAR_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        return exemplars
+
+    def _search(self, question: str, task_type: str) -> list:
+        task2 = [t for t in self.rag.task_values() if t.startswith("task2")]
+        same_type = [t for t in task2 if _same_task_type(t, task_type)]
+        if same_type == task2:
+            same_type = []
+
+        # Same task type first, any Task 2 sample fills the remaining bands;
+        # the filters go into the search so top-k is never spent on Task 1
+        hits = []
+        seen_ids = set()
+        for tasks in (same_type, task2):
+            if not tasks or len({h[2]["band"] for h in hits}) >= self.top_k:
+                continue
+            results = self.rag.retrieve_hybrid(
+                question, top_k=self.top_k * 4, where={"task": {"$in": tasks}}
+            )
+            for doc_id, doc, meta in zip(results["ids"], results["documents"], results["metadatas"]):
+                meta = meta or {}
+                if doc_id not in seen_ids and meta.get("band") is not None:
+                    seen_ids.add(doc_id)
+                    hits.append((doc_id, doc, meta))
+
+        exemplars = []
+        seen_bands = set()
+        used = 0
+
+        for doc_id, doc, meta in hits:
+            band = meta["band"]
+            if band in seen_bands:
+                continue
+
+            text = extract_exemplar(doc)
+            if used + len(text) > self.budget:
+                continue
+
+            exemplars.append({
+                "id": doc_id,
+                "task": meta.get("task"),
+                "band": band,
+                "text": text,
+            })
+            seen_bands.add(band)
+            used += len(text)
+
+            if len(exemplars) >= self.top_k:
+                break
+
+        return sorted(exemplars, key=lambda e: -float(e["band"]))
+
+
+def _same_task_type(task: str | None, task_type: str) -> bool:
+    # sample folders are "task2_<type>", e.g. task2_opinion ↔ opinion_agree_disagree
+    folder = str(task or "").split("_", 1)[-1]
+    return bool(folder) and (folder in task_type or task_type in folder)
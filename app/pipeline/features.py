@@ -0,0 +1,275 @@
+import re
+
+import numpy as np
+
+from app.pipeline.ruleset import HARD_CAP_RULES, SOFT_RULES
+
+
+# =====================================================
+# LOCAL PRE-SCORING FEATURES (NO LLM)
+# =====================================================
+# Everything here is countable, so it is measured instead of asked for:
+# - feeds the rule engine directly (soft rules + GRA ceilings)
+# - is passed to phase4_lr / phase5_gra as measured facts so the LLM
+#   only judges what needs judgment
+
+WORD_RE = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+FIRST_ALPHA_RE = re.compile(r"[A-Za-z]")
+LOWER_I_RE = re.compile(r"(?:^|\s)i(?:\s|'|$)")
+SPACE_BEFORE_PUNCT_RE = re.compile(r"\s+[,.;:!?]")
+MISSING_SPACE_RE = re.compile(r"[a-z][,;:][A-Za-z]|[a-z]\.[A-Z]")
+DOUBLE_PUNCT_RE = re.compile(r"([,;:])\1|[,;:][.!?]|\.\.(?!\.)")
+
+ARTICLES = frozenset({"a", "an", "the"})
+
+MATTR_WINDOW = 50
+RUN_ON_WORDS = 40
+
+# Thresholds that turn counts into violations
+OPENING_REPEAT_RATIO = 0.3
+OPENING_REPEAT_MIN = 3
+CAPITALIZATION_MIN = 2
+PUNCTUATION_MIN = 3
+RUN_ON_MIN = 2
+
+# ~K1 band: the most frequent English words. A high share of tokens
+# from this list = narrow lexical range.
+COMMON_WORDS = frozenset("""
+a about after all also an and any are as at be because been before being
+between both but by can could did do does doing down during each even few
+for from further get gets got had has have having he her here hers him his
+how i if in into is it its just know like make many may me more most much
+must my new no nor not now of off on once one only or other our out over own
+people same she should so some such than that the their them then there
+these they thing things think this those through time to too under until up
+very was way we well were what when where which while who whom why will with
+would year years you your good bad big small great important lot lots
+give go goes going makes made say says said see seen take takes
+use used want work works life world day days country countries place part
+number group problem problems fact case point government company system
+really always often never sometimes usually every another however
+therefore although though since first second last next least better
+best worse worst high low large long short old young right wrong different
+able public social help helps need needs show shows shown find
+""".split())
+
+
+def extract_features(parsed_essay: dict) -> dict:
+    """
+    parsed_essay: output of phase1_parse / phase1_parse_task2
+                  (only "sentences" is used)
+    """
+    sentences = [
+        s.strip() for s in parsed_essay.get("sentences", []) or []
+        if isinstance(s, str) and s.strip()
+    ]
+
+    words = [WORD_RE.findall(s) for s in sentences]
+    lengths = np.array([len(w) for w in words], dtype=np.int32)
+    tokens = [w.lower() for ws in words for w in ws]
+
+    features = {
+        "sentence_count": len(sentences),
+        "word_count": int(lengths.sum()) if lengths.size else 0,
+        "avg_sentence_length": round(float(lengths.mean()), 2) if lengths.size else 0.0,
+        "sentence_length_std": round(float(lengths.std()), 2) if lengths.size else 0.0,
+        **_lexical_features(tokens),
+        **_opening_features(words),
+        **_mechanics_features(sentences, lengths),
+    }
+
+    features["violations"] = _violations(features)
+    features["gra_flags"] = [
+        key for key in ("capitalization_errors", "systematic_punctuation_errors", "run_on_sentences")
+        if features["violations"].get(key, {}).get("active")
+    ]
+
+    return features
+
+
+def summarize_features(features: dict, keys: tuple) -> dict:
+    """Subset of features rendered into phase prompts."""
+    return {k: features[k] for k in keys if k in features}
+
+
+def rule_violations(features: dict) -> dict:
+    """Active local violations handled by apply_all_rules (HARD + SOFT)."""
+    return {
+        k: v for k, v in features["violations"].items()
+        if v["active"] and (k in SOFT_RULES or k in HARD_CAP_RULES)
+    }
+
+
+def with_gra_flags(gra_violations, features: dict):
+    """Add local GRA ceiling flags to the LLM's GRA violations (dict or list)."""
+    flags = features.get("gra_flags", [])
+
+    if isinstance(gra_violations, dict):
+        return {
+            **gra_violations,
+            **{k: features["violations"][k] for k in flags},
+        }
+
+    return list(gra_violations or []) + flags
+
+
+# =====================================================
+# INTERNAL
+# =====================================================
+def _lexical_features(tokens: list) -> dict:
+    if not tokens:
+        return {
+            "type_token_ratio": 0.0,
+            "mattr": 0.0,
+            "common_word_ratio": 0.0,
+            "long_word_ratio": 0.0,
+        }
+
+    vocab, ids = np.unique(np.array(tokens), return_inverse=True)
+    n = len(ids)
+
+    common = np.isin(vocab, list(COMMON_WORDS))[ids]
+    word_len = np.char.str_len(vocab)[ids]
+
+    return {
+        "type_token_ratio": round(len(vocab) / n, 3),
+        "mattr": round(_mattr(ids, MATTR_WINDOW), 3),
+        "common_word_ratio": round(float(common.mean()), 3),
+        "long_word_ratio": round(float((word_len >= 7).mean()), 3),
+    }
+
+
+def _mattr(ids: np.ndarray, window: int) -> float:
+    """
+    Moving-average type-token ratio.
+
+    prev[i] = index of the previous occurrence of token i (-1 if none);
+    token i is a new type in window [s, s + w) iff prev[i] < s.
+    """
+    n = len(ids)
+    if n <= window:
+        return len(np.unique(ids)) / n
+
+    prev = np.full(n, -1, dtype=np.int64)
+    last = {}
+    for i, t in enumerate(ids.tolist()):
+        prev[i] = last.get(t, -1)
+        last[t] = i
+
+    starts = np.arange(n - window + 1)
+    idx = starts[:, None] + np.arange(window)[None, :]
+    types = (prev[idx] < starts[:, None]).sum(axis=1)
+
+    return float(types.mean() / window)
+
+
+def _opening_features(words: list) -> dict:
+    # "The chart ..." / "The figure ..." is not repetition → an article
+    # opening is keyed together with the following word
+    openings = [
+        " ".join(ws[:2]).lower() if ws[0].lower() in ARTICLES else ws[0].lower()
+        for ws in words if ws
+    ]
+
+    if not openings:
+        return {"opening_repeat_ratio": 0.0, "repeated_openings": {}}
+
+    vocab, counts = np.unique(np.array(openings), return_counts=True)
+    repeated = {
+        str(w): int(c) for w, c in zip(vocab, counts)
+        if c >= OPENING_REPEAT_MIN
+    }
+
+    return {
+        "opening_repeat_ratio": round(float(counts.max() / len(openings)), 3),
+        "repeated_openings": repeated,
+    }
+
+
+def _mechanics_features(sentences: list, lengths: np.ndarray) -> dict:
+    if not sentences:
+        return {
+            "capitalization_errors": 0,
+            "punctuation_errors": 0,
+            "run_on_sentences": 0,
+            "mechanics_evidence": {
+                "capitalization_errors": None,
+                "systematic_punctuation_errors": None,
+                "run_on_sentences": None,
+            },
+        }
+
+    lower_start = np.array([
+        bool((m := FIRST_ALPHA_RE.search(s)) and m.group().islower())
+        for s in sentences
+    ])
+    lower_i = np.array([len(LOWER_I_RE.findall(s)) for s in sentences])
+
+    no_terminal = np.array([s[-1] not in ".!?\"')" for s in sentences])
+    punct = np.array([
+        len(SPACE_BEFORE_PUNCT_RE.findall(s))
+        + len(MISSING_SPACE_RE.findall(s))
+        + len(DOUBLE_PUNCT_RE.findall(s))
+        for s in sentences
+    ]) + no_terminal
+
+    commas = np.array([s.count(",") + s.count(";") for s in sentences])
+    run_on = (lengths > RUN_ON_WORDS) & (commas <= 1)
+
+    cap_per_sentence = lower_start + lower_i
+
+    return {
+        "capitalization_errors": int(cap_per_sentence.sum()),
+        "punctuation_errors": int(punct.sum()),
+        "run_on_sentences": int(run_on.sum()),
+        "mechanics_evidence": {
+            "capitalization_errors": _first(sentences, cap_per_sentence > 0),
+            "systematic_punctuation_errors": _first(sentences, punct > 0),
+            "run_on_sentences": _first(sentences, run_on),
+        },
+    }
+
+
+def _first(sentences: list, mask: np.ndarray):
+    hits = np.flatnonzero(mask)
+    return sentences[hits[0]][:120] if hits.size else None
+
+
+def _violation(active: bool, evidence, reason: str) -> dict:
+    return {
+        "active": bool(active),
+        "location": "overall" if active else "",
+        "evidence": evidence if active else "",
+        "reason": reason if active else "",
+        "source": "local_features",
+    }
+
+
+def _violations(f: dict) -> dict:
+    evidence = f["mechanics_evidence"]
+    n = max(f["sentence_count"], 1)
+
+    repeated = f["repeated_openings"]
+
+    return {
+        "repetitive_sentence_openings": _violation(
+            f["opening_repeat_ratio"] >= OPENING_REPEAT_RATIO and bool(repeated),
+            ", ".join(f"'{w}' x{c}" for w, c in repeated.items()),
+            "Many sentences open with the same word",
+        ),
+        "capitalization_errors": _violation(
+            f["capitalization_errors"] >= CAPITALIZATION_MIN,
+            evidence["capitalization_errors"],
+            f"{f['capitalization_errors']} capitalization errors",
+        ),
+        "systematic_punctuation_errors": _violation(
+            f["punctuation_errors"] >= max(PUNCTUATION_MIN, n // 5),
+            evidence["systematic_punctuation_errors"],
+            f"{f['punctuation_errors']} punctuation errors across {n} sentences",
+        ),
+        "run_on_sentences": _violation(
+            f["run_on_sentences"] >= RUN_ON_MIN,
+            evidence["run_on_sentences"],
+            f"{f['run_on_sentences']} sentences over {RUN_ON_WORDS} words with little punctuation",
+        ),
+    }
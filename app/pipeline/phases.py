@@ -1,24 +1,51 @@
 from app.pipeline.utils import extract_json
-from app.pipeline.prompt_loader import load_prompt
+from app.pipeline.prompt_loader import load_prompt, render_input
+from app.pipeline.features import summarize_features
+from app.pipeline import segmenter
+
+LR_FEATURE_KEYS = (
+    "word_count",
+    "type_token_ratio",
+    "mattr",
+    "common_word_ratio",
+    "long_word_ratio",
+)
+
+GRA_FEATURE_KEYS = (
+    "sentence_count",
+    "avg_sentence_length",
+    "sentence_length_std",
+    "capitalization_errors",
+    "punctuation_errors",
+    "run_on_sentences",
+)
 
 
 # =====================================================
 # PHASE 0 – CHART UNDERSTANDING
 # =====================================================
-def phase0_chart(vision, chart_path: str):
-    return vision.describe_chart(chart_path)
+def phase0_chart(vision, chart: bytes | str):
+    return vision.describe_chart(chart)
 
 
 # =====================================================
 # PHASE 1 – PARSE ESSAY STRUCTURE
 # =====================================================
-def phase1_parse(llm, essay: str):
+def phase1_parse(llm, essay: str, local: bool = True):
+    # Deterministic segmentation first; LLM only when unsure
+    if local:
+        parsed = segmenter.segment_task1(essay)
+        if parsed["_confidence"] >= segmenter.MIN_CONFIDENCE:
+            return parsed
+
     system_prompt = load_prompt(
         "phase1_parse.txt",
         rubric_name=None
     )
 
-    raw = llm.ask(system_prompt, essay)
+    user_prompt = render_input({"ESSAY": essay})
+
+    raw = llm.ask(system_prompt, user_prompt, phase="phase1_parse")
     result = extract_json(raw)
 
     if not isinstance(result, dict):
@@ -27,21 +54,24 @@ def phase1_parse(llm, essay: str):
     return result
 
 
-def phase1_parse_task2(llm, question: str, essay: str):
+def phase1_parse_task2(llm, question: str, essay: str, local: bool = True):
+    # Deterministic segmentation first; LLM only when unsure
+    if local:
+        parsed = segmenter.segment_task2(question, essay)
+        if parsed["_confidence"] >= segmenter.MIN_CONFIDENCE:
+            return parsed
+
     system_prompt = load_prompt(
         "phase1_parse_task2.txt",
         rubric_name=None
     )
 
-    user_prompt = f"""
-[QUESTION]
-{question}
+    user_prompt = render_input({
+        "QUESTION": question,
+        "ESSAY": essay,
+    })
 
-[ESSAY]
-{essay}
-"""
-
-    raw = llm.ask(system_prompt, user_prompt)
+    raw = llm.ask(system_prompt, user_prompt, phase="phase1_parse_task2")
     result = extract_json(raw)
 
     if not isinstance(result, dict):
@@ -59,25 +89,27 @@ def phase2_ta(llm, chart_data, parsed_essay):
         rubric_name="TA"
     )
 
-    user_prompt = f"""
-[CHART]
-{chart_data}
-
-[OVERVIEW]
-{parsed_essay.get("overview")}
-
-[BODY_PARAGRAPHS]
-{parsed_essay.get("body_paragraphs")}
-"""
+    user_prompt = render_input({
+        "CHART": chart_data,
+        "OVERVIEW": parsed_essay.get("overview"),
+        "BODY_PARAGRAPHS": parsed_essay.get("body_paragraphs"),
+    })
 
-    raw = llm.ask(system_prompt, user_prompt)
+    raw = llm.ask(system_prompt, user_prompt, phase="phase2_ta")
     result = extract_json(raw)
 
     _ensure_band(result, "TA")
     return result
 
 
-def phase2_tr(llm, question: str, parsed_essay: dict, task_type: str, debug: bool = False):
+def phase2_tr(
+    llm,
+    question: str,
+    parsed_essay: dict,
+    task_type: str,
+    exemplars: list | None = None,
+    debug: bool = False,
+):
     system_prompt = load_prompt(
         "phase2_tr.txt",
         rubric_name="TR"
@@ -85,21 +117,16 @@ def phase2_tr(llm, question: str, parsed_essay: dict, task_type: str, debug: boo
 
     essay_text = "\n".join(parsed_essay["sentences"])
 
-    user_prompt = f"""
-[QUESTION]
-{question}
-
-TASK TYPE (FIXED – DO NOT REINTERPRET):
-{task_type}
+    # Task-type instructions live in the system prompt; only the
+    # values vary here
+    user_prompt = render_input({
+        "QUESTION": question,
+        "TASK_TYPE": task_type,
+        "BAND EXEMPLARS": _render_exemplars(exemplars),
+        "ESSAY": essay_text,
+    })
 
-You MUST evaluate Task Response STRICTLY according to this task type.
-Do NOT apply requirements from other task types.
-
-[ESSAY]
-{essay_text}
-"""
-
-    raw = llm.ask(system_prompt, user_prompt)
+    raw = llm.ask(system_prompt, user_prompt, phase="phase2_tr")
     result = extract_json(raw)
 
     _ensure_band(result, "TR")
@@ -116,6 +143,16 @@ Do NOT apply requirements from other task types.
 
     return result
 
+def _render_exemplars(exemplars: list | None) -> str:
+    if not exemplars:
+        return "None available."
+
+    return "\n\n---\n\n".join(
+        f"Band {e['band']} ({e['task']}):\n{e['text']}"
+        for e in exemplars
+    )
+
+
 # =====================================================
 # PHASE 3 – COHERENCE & COHESION
 # =====================================================
@@ -125,25 +162,20 @@ def phase3_cc(llm, parsed_essay):
         rubric_name="CC"
     )
 
-    user_prompt = f"""
-[INTRODUCTION]
-{parsed_essay.get("introduction")}
+    user_prompt = render_input({
+        "INTRODUCTION": parsed_essay.get("introduction"),
+        "BODY_PARAGRAPHS": parsed_essay.get("body_paragraphs"),
+        "CONCLUSION": parsed_essay.get("conclusion"),
+    })
 
-[BODY_PARAGRAPHS]
-{parsed_essay.get("body_paragraphs")}
-
-[CONCLUSION]
-{parsed_essay.get("conclusion")}
-"""
-
-    raw = llm.ask(system_prompt, user_prompt)
+    raw = llm.ask(system_prompt, user_prompt, phase="phase3_cc")
     result = extract_json(raw)
 
     _ensure_band(result, "CC")
     return result
 
 
-def phase4_lr(llm, parsed_essay):
+def phase4_lr(llm, parsed_essay, features=None):
     system_prompt = load_prompt(
         "phase4_lr.txt",
         rubric_name="LR"
@@ -151,12 +183,12 @@ def phase4_lr(llm, parsed_essay):
 
     essay_text = "\n".join(parsed_essay["sentences"])
 
-    user_prompt = f"""
-[SENTENCES]
-{essay_text}
-"""
+    user_prompt = render_input({
+        "MEASURED FEATURES": summarize_features(features or {}, LR_FEATURE_KEYS),
+        "SENTENCES": essay_text,
+    })
 
-    raw = llm.ask(system_prompt, user_prompt)
+    raw = llm.ask(system_prompt, user_prompt, phase="phase4_lr")
     result = extract_json(raw)
 
     _ensure_band(result, "LR")
@@ -167,18 +199,18 @@ def phase4_lr(llm, parsed_essay):
 # =====================================================
 # PHASE 5 – GRAMMATICAL RANGE & ACCURACY
 # =====================================================
-def phase5_gra(llm, parsed_essay):
+def phase5_gra(llm, parsed_essay, features=None):
     system_prompt = load_prompt(
         "phase5_gra.txt",
         rubric_name="GRA"
     )
     sentences_text = "\n".join(parsed_essay["sentences"])
-    user_prompt = f"""
-[SENTENCES]
-{sentences_text}
-"""
+    user_prompt = render_input({
+        "MEASURED FEATURES": summarize_features(features or {}, GRA_FEATURE_KEYS),
+        "SENTENCES": sentences_text,
+    })
 
-    raw = llm.ask(system_prompt, user_prompt)
+    raw = llm.ask(system_prompt, user_prompt, phase="phase5_gra")
     result = extract_json(raw)
 
     _ensure_band(result, "GRA") 
@@ -196,6 +228,73 @@ def phase5_gra(llm, parsed_essay):
     return gra
 
 
+# =====================================================
+# FAST TIER – ALL FOUR BANDS IN ONE CALL
+# =====================================================
+FAST_FEATURE_KEYS = tuple(dict.fromkeys(LR_FEATURE_KEYS + GRA_FEATURE_KEYS))
+
+# One retry; after that the request fails, never with made-up bands
+FAST_ATTEMPTS = 2
+
+
+def phase_fast(llm, question: str, essay: str, features: dict, primary: str, chart_data=None):
+    """
+    primary: "TA" (Task 1) | "TR" (Task 2)
+    returns {"bands": {primary, CC, LR, GRA}, "summary": str}
+    """
+    system_prompt = load_prompt("phase_fast.txt")
+
+    user_prompt = render_input({
+        "TASK": "Task 1 – Task Achievement" if primary == "TA" else "Task 2 – Task Response",
+        "QUESTION": question,
+        "CHART": chart_data,
+        "ESSAY": essay,
+        "MEASURED FEATURES": summarize_features(features, FAST_FEATURE_KEYS),
+    })
+
+    error = None
+    for attempt in range(1, FAST_ATTEMPTS + 1):
+        raw = llm.ask(system_prompt, user_prompt, phase="phase_fast")
+        try:
+            return _parse_fast(raw, primary)
+        except ValueError as e:
+            error = str(e)
+            print(f"⚠️ phase_fast: {error} (attempt {attempt}/{FAST_ATTEMPTS})")
+
+    raise RuntimeError(f"phase_fast failed: {error}")
+
+
+def _parse_fast(raw: str, primary: str) -> dict:
+    """ValueError unless every band is present: a made-up 5.0 would pass the rule engine."""
+    result = extract_json(raw)
+    if not isinstance(result, dict):
+        raise ValueError("invalid JSON result")
+
+    raw_bands = result.get("bands")
+    if not isinstance(raw_bands, dict):
+        raise ValueError("response has no bands")
+
+    bands = {}
+    for key, criterion in (("TASK", primary), ("CC", "CC"), ("LR", "LR"), ("GRA", "GRA")):
+        band = _ensure_band({"band": raw_bands.get(key, raw_bands.get(criterion))}, criterion)
+        if band.get("_band_fallback"):
+            raise ValueError(f"response has no {criterion} band")
+        bands[criterion] = band["band"]
+
+    return {"bands": bands, "summary": str(result.get("summary", "")).strip()}
+
+
+def fast_has_bands(raw: str) -> bool:
+    """CachedLLM validator for phase_fast: band-less answers are not cached → the retry reaches the model."""
+    for primary in ("TA", "TR"):
+        try:
+            _parse_fast(raw, primary)
+            return True
+        except ValueError:
+            pass
+    return False
+
+
 # =====================================================
 # PHASE 6 – FINAL BAND CALCULATION (LLM-BASED)
 # =====================================================
@@ -248,35 +347,16 @@ def phase7_feedback(
 
     system_prompt = load_prompt("phase7_feedback.txt")
 
-    user_prompt = f"""
-[CHART]
-{chart}
-
-[ESSAY]
-{essay}
-
-[FINAL BANDS]
-{bands}
-
-[HARD CAPS APPLIED]
-{hard_traces}
-
-[SOFT PENALTIES APPLIED]
-{soft_traces}
-
-INSTRUCTIONS:
-- Explain ONLY issues that appear in HARD CAPS or SOFT PENALTIES
-- Do NOT invent new problems
-- For each issue, explain:
-  1. What is wrong
-  2. Where it appears in the essay
-  3. Why it blocks a higher band
-  4. How to fix it
-- If content is irrelevant, say explicitly that it is NOT RELATED to the chart
-- Use IELTS examiner logic, not AI guessing
-"""
+    # Feedback scope instructions live in the system prompt
+    user_prompt = render_input({
+        "CHART": chart,
+        "ESSAY": essay,
+        "FINAL BANDS": bands,
+        "HARD CAPS APPLIED": hard_traces,
+        "SOFT PENALTIES APPLIED": soft_traces,
+    })
 
-    feedback_text = llm.ask(system_prompt, user_prompt)
+    feedback_text = llm.ask(system_prompt, user_prompt, phase="phase7_feedback")
 
     return {
         "type": "tutor_feedback",
@@ -296,36 +376,16 @@ def phase7_feedback_task2(
 
     system_prompt = load_prompt("phase7_feedback_task2.txt")
 
-    user_prompt = f"""
-[QUESTION]
-{question}
-
-[ESSAY]
-{essay}
-
-[FINAL BANDS]
-{bands}
-
-[HARD CAPS APPLIED]
-{hard_traces}
-
-[SOFT PENALTIES APPLIED]
-{soft_traces}
-
-INSTRUCTIONS:
-- Explain ONLY issues that appear in HARD CAPS or SOFT PENALTIES
-- Do NOT invent new problems
-- For each issue, explain:
-  1. What is wrong
-  2. Where it appears in the essay
-  3. Why it blocks a higher band for IELTS Writing Task 2
-  4. How to fix it
-- If content is irrelevant, say explicitly that it is NOT RELATED to the QUESTION
-- Use official IELTS examiner logic
-- Do NOT comment on grammar or vocabulary unless they appear in penalties
-"""
+    # Feedback scope instructions live in the system prompt
+    user_prompt = render_input({
+        "QUESTION": question,
+        "ESSAY": essay,
+        "FINAL BANDS": bands,
+        "HARD CAPS APPLIED": hard_traces,
+        "SOFT PENALTIES APPLIED": soft_traces,
+    })
 
-    feedback_text = llm.ask(system_prompt, user_prompt)
+    feedback_text = llm.ask(system_prompt, user_prompt, phase="phase7_feedback_task2")
 
     return {
         "type": "tutor_feedback",
@@ -0,0 +1,241 @@
+import os
+import json
+
+import numpy as np
+
+from app.pipeline.features import WORD_RE, COMMON_WORDS
+
+
+# =====================================================
+# PRE-SCREEN (BEFORE PHASE 1, NO LLM)
+# =====================================================
+# Junk submissions are caught with cheap checks and answered with a
+# capped, templated result instead of going through every LLM phase:
+#   empty        no words at all
+#   not_english  mostly non-Latin script / almost no English function words
+#   copied_prompt  most of the answer is n-grams of the question
+#   too_short    far below the task's word count (band scaled by length)
+#   off_topic    (Task 2) low embedding similarity to the question AND
+#                almost none of the question's keywords
+#
+# Checks run cheapest first; the embedder only runs when all others pass.
+
+MIN_WORDS = {
+    1: int(os.getenv("PRESCREEN_MIN_WORDS_TASK1", "50")),
+    2: int(os.getenv("PRESCREEN_MIN_WORDS_TASK2", "80")),
+}
+COPY_NGRAM = 3
+MAX_COPY_RATIO = float(os.getenv("PRESCREEN_MAX_COPY_RATIO", "0.6"))
+MIN_LATIN_RATIO = 0.8
+MIN_COMMON_RATIO = float(os.getenv("PRESCREEN_MIN_COMMON_RATIO", "0.15"))
+MIN_SIMILARITY = float(os.getenv("PRESCREEN_MIN_SIMILARITY", "0.7"))
+MIN_KEYWORD_OVERLAP = float(os.getenv("PRESCREEN_MIN_KEYWORD_OVERLAP", "0.15"))
+EMBED_CHARS = 2000
+
+# reason → band given to every criterion (and overall)
+PRESCREEN_BANDS = {
+    "empty": 0.0,
+    "not_english": 0.0,
+    "copied_prompt": 1.0,
+    "off_topic": 2.0,
+    "too_short": 3.0,
+}
+
+# too_short: the public band 1 descriptor covers answers of 20 words or
+# fewer; below half the minimum word count → 2; otherwise PRESCREEN_BANDS
+BAND_1_MAX_WORDS = 20
+
+TEMPLATES = {
+    "empty": (
+        "No answer was submitted.",
+        "Write a full response to the question before submitting.",
+    ),
+    "not_english": (
+        "The answer is not written in English, so it cannot be assessed.",
+        "Write your full answer in English.",
+    ),
+    "copied_prompt": (
+        "Most of the answer repeats the wording of the question. Copied "
+        "question text is not counted towards your answer.",
+        "Paraphrase the question in one sentence, then develop your own ideas in full paragraphs.",
+    ),
+    "off_topic": (
+        "The answer is NOT RELATED to the QUESTION. An off-topic response "
+        "cannot score above a very low band, whatever its language quality.",
+        "Re-read the question, identify exactly what it asks, and answer that directly.",
+    ),
+    "too_short": (
+        "The answer is far below the required length ({words} words; at least "
+        "{required} are expected), so the task cannot be fully addressed.",
+        "Plan an introduction, developed body paragraphs and a conclusion to reach the word count.",
+    ),
+}
+
+REQUIRED_WORDS = {1: 150, 2: 250}
+
+
+def _words(text: str) -> list:
+    return [w.lower() for w in WORD_RE.findall(text)]
+
+
+def _ngrams(words: list, n: int) -> set:
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _keywords(words: list) -> set:
+    return {w for w in words if len(w) > 3 and w not in COMMON_WORDS}
+
+
+def language_stats(text: str, words: list) -> dict:
+    letters = [c for c in text if c.isalpha()]
+    latin = sum(1 for c in letters if c.isascii())
+    common = sum(1 for w in words if w in COMMON_WORDS)
+    return {
+        "latin_ratio": round(latin / len(letters), 3) if letters else 0.0,
+        "common_ratio": round(common / len(words), 3) if words else 0.0,
+    }
+
+
+def copy_ratio(question_words: list, answer_words: list, n: int = COPY_NGRAM) -> float:
+    """Share of the answer's n-grams that also appear in the question."""
+    answer_ngrams = [tuple(answer_words[i:i + n]) for i in range(len(answer_words) - n + 1)]
+    if not answer_ngrams:
+        return 0.0
+    question_ngrams = _ngrams(question_words, n)
+    return round(sum(1 for g in answer_ngrams if g in question_ngrams) / len(answer_ngrams), 3)
+
+
+def keyword_overlap(question_words: list, answer_words: list) -> float:
+    """Share of the question's content words used in the answer."""
+    keywords = _keywords(question_words)
+    if not keywords:
+        return 1.0
+    return round(len(keywords & set(answer_words)) / len(keywords), 3)
+
+
+class PreScreen:
+    def __init__(self, embedder=None):
+        # Shared with RAGManager (bge-small-en) → no second model load
+        self.embedder = embedder
+
+    def check(self, question: str, answer: str, task: int = 2) -> dict:
+        """
+        {"passed": bool, "reason": str | None, "checks": {...}}
+        """
+        answer_words = _words(answer)
+        question_words = _words(question)
+        checks = {"word_count": len(answer_words)}
+
+        if not any(c.isalnum() for c in answer):
+            return _verdict("empty", checks)
+
+        checks.update(language_stats(answer, answer_words))
+        if checks["latin_ratio"] < MIN_LATIN_RATIO or (
+            len(answer_words) >= 20 and checks["common_ratio"] < MIN_COMMON_RATIO
+        ):
+            return _verdict("not_english", checks)
+
+        checks["copy_ratio"] = copy_ratio(question_words, answer_words)
+        if checks["copy_ratio"] >= MAX_COPY_RATIO:
+            return _verdict("copied_prompt", checks)
+
+        if len(answer_words) < MIN_WORDS[task]:
+            return _verdict("too_short", checks)
+
+        # Task 1 relevance is judged against the chart (phase2_ta)
+        if task == 2:
+            checks["keyword_overlap"] = keyword_overlap(question_words, answer_words)
+            similarity = self.similarity(question, answer)
+            if similarity is not None:
+                checks["similarity"] = similarity
+                if similarity < MIN_SIMILARITY and checks["keyword_overlap"] < MIN_KEYWORD_OVERLAP:
+                    return _verdict("off_topic", checks)
+
+        return _verdict(None, checks)
+
+    def similarity(self, question: str, answer: str) -> float | None:
+        if self.embedder is None:
+            return None
+        try:
+            q, a = np.asarray(self.embedder.encode([question, answer[:EMBED_CHARS]]), dtype=np.float32)
+        except Exception as e:
+            # A screening aid only → never fail scoring over it
+            print(f"⚠️ Pre-screen embedding failed: {e}")
+            return None
+        denom = float(np.linalg.norm(q) * np.linalg.norm(a)) or 1.0
+        return round(float(q @ a) / denom, 3)
+
+
+def _verdict(reason: str | None, checks: dict) -> dict:
+    return {"passed": reason is None, "reason": reason, "checks": checks}
+
+
+def prescreen_band(screen: dict, task: int = 2) -> float:
+    reason = screen["reason"]
+    if reason == "too_short":
+        words = screen["checks"]["word_count"]
+        if words <= BAND_1_MAX_WORDS:
+            return 1.0
+        if words < MIN_WORDS[task] / 2:
+            return 2.0
+    return PRESCREEN_BANDS[reason]
+
+
+# =====================================================
+# CAPPED RESULT (SAME SHAPE AS THE FULL PIPELINES)
+# =====================================================
+def prescreen_result(screen: dict, task: int = 2) -> dict:
+    reason = screen["reason"]
+    band = prescreen_band(screen, task)
+    main = "TR" if task == 2 else "TA"
+
+    problem, strategy = TEMPLATES[reason]
+    problem = problem.format(words=screen["checks"]["word_count"], required=REQUIRED_WORDS[task])
+
+    violation = {
+        "active": True,
+        "location": "whole answer",
+        "evidence": screen["checks"],
+        "reason": problem,
+    }
+
+    bands = {
+        c: {
+            "base_band": band,
+            "final_band": band,
+            "band": band,
+            "violations": {f"prescreen_{reason}": violation} if c == main else {},
+        }
+        for c in (main, "CC", "LR", "GRA")
+    }
+    bands[main]["applied_soft"] = []
+
+    feedback = {
+        "target_band_increase": "1.0",
+        "improvements": [{
+            "criterion": main,
+            "issue_type": reason,
+            "original_sentence": "",
+            "improved_sentence": "",
+            "reason": problem,
+        }],
+        "overall_strategy": strategy,
+    }
+
+    return {
+        "task": f"IELTS Writing Task {task}",
+        "overall": {
+            "band": band,
+            "note": f"Pre-screen: {reason}",
+            "hard_caps": [{
+                "violation": f"prescreen_{reason}",
+                "caps": {"overall": band},
+                "location": violation["location"],
+                "evidence": violation["evidence"],
+                "reason": problem,
+            }],
+        },
+        "bands": bands,
+        "feedback": {"type": "tutor_feedback", "content": json.dumps(feedback)},
+        "prescreen": screen,
+    }
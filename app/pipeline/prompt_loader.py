@@ -1,16 +1,32 @@
+import json
+from functools import lru_cache
 from pathlib import Path
-from app.pipeline.rubric_cache import get_rubric
+from app.pipeline.rubric_cache import get_rubric, get_speaking_rubric
 
 PROMPT_DIR = Path("app/pipeline/prompts")
 
 
+# =====================================================
+# PROMPT LAYOUT (PREFIX-CACHE FRIENDLY)
+# =====================================================
+# system message = instructions + rubric   → byte-stable per phase
+# user message   = render_input(...)       → variable suffix only
+#
+# Nothing request-specific may be spliced into the system prompt, and
+# static instructions must not follow variable text in the user prompt,
+# otherwise the backend KV/prefix cache stops at the first varying byte.
+
+
+@lru_cache(maxsize=32)
 def load_prompt(
     filename: str,
-    rubric_name: str | None = None
+    rubric_name: str | None = None,
+    speaking: bool = False,
 ) -> str:
     """
     filename: phase2_ta.txt, phase3_cc.txt, ...
     rubric_name: TA | CC | LR | GRA | None
+                 (speaking=True: FC | LR | GRA | PR from data/speaking_rubric)
     """
     path = PROMPT_DIR / filename
 
@@ -20,10 +36,35 @@ def load_prompt(
     prompt = path.read_text(encoding="utf-8")
 
     if rubric_name:
-        rubric = get_rubric(rubric_name)
+        rubric = (get_speaking_rubric if speaking else get_rubric)(rubric_name)
         prompt = prompt.replace(
             f"{{{rubric_name}_RUBRIC}}",
             rubric
         )
 
     return prompt
+
+
+def render_input(sections: dict) -> str:
+    """
+    Build the variable user message.
+
+    sections: {"HEADING": value} in the order declared by the prompt's
+    INPUT block. Values are normalised (stripped strings, JSON for
+    lists/dicts) so the same essay always renders to the same bytes.
+    """
+    parts = [
+        f"[{name}]\n{_as_text(value)}"
+        for name, value in sections.items()
+    ]
+    return "\n\n".join(parts) + "\n"
+
+
+def _as_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False, indent=2, default=str)
+    return str(value)
@@ -1,7 +1,11 @@
+import re
 from functools import lru_cache
 from pathlib import Path
 
 RUBRIC_DIR = Path("data/writing_rubric")
+SPEAKING_RUBRIC_DIR = Path("data/speaking_rubric")
+
+BAND_FILE_RE = re.compile(r"band(\d+)_")
 
 
 @lru_cache(maxsize=16)
@@ -15,3 +19,43 @@ def get_rubric(name: str) -> str:
         raise FileNotFoundError(f"Rubric not found: {path}")
 
     return path.read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=1)
+def get_speaking_rubrics() -> dict:
+    """
+    {criterion: {band: descriptor}} for data/speaking_rubric/<criterion>/band<N>_<criterion>.txt,
+    bands highest first. Read once per process; the rubric never changes
+    at runtime, so no vector search is needed to fetch it.
+    """
+    rubrics = {}
+
+    for folder in sorted(p for p in SPEAKING_RUBRIC_DIR.iterdir() if p.is_dir()):
+        bands = {}
+        for path in folder.glob(f"band*_{folder.name}.txt"):
+            m = BAND_FILE_RE.match(path.name)
+            if m:
+                bands[int(m.group(1))] = path.read_text(encoding="utf-8").strip()
+
+        if bands:
+            rubrics[folder.name] = dict(sorted(bands.items(), reverse=True))
+
+    return rubrics
+
+
+def get_speaking_rubric(name: str) -> str:
+    """
+    name: FC | LR | GRA | PR
+    All band descriptors of one criterion, highest band first.
+    """
+    bands = get_speaking_rubrics().get(name)
+
+    if not bands:
+        raise FileNotFoundError(f"Speaking rubric not found: {SPEAKING_RUBRIC_DIR / name}")
+
+    return "\n\n".join(bands.values())
+
+
+def band_descriptor(name: str, band: float) -> str | None:
+    """Descriptor of the whole band at or below `band` (None if out of range)."""
+    return get_speaking_rubrics().get(name, {}).get(int(band))
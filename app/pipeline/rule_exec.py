@@ -1,8 +1,121 @@
 # =====================================================
-# IELTS WRITING TASK 1 – SCORING ENGINE (FIXED)
+# IELTS WRITING TASK 1 + TASK 2 – SCORING ENGINE
 # =====================================================
+# Hard caps, soft penalties, GRA ceilings and the TA / TR overall
+# ceiling, from app/pipeline/ruleset.py. Two paths over the same
+# CompiledRules: apply_all_rules + finalize_bands (one submission, with
+# traces) and score_batch (N submissions, numbers only); their results
+# are kept identical by tests/test_rule_exec.py.
 
-from .ruleset import HARD_CAP_RULES, SOFT_RULES
+import numpy as np
+
+from .ruleset import HARD_CAP_RULES, SOFT_RULES, GRA_CEILING_RULES
+
+
+# =====================================================
+# COMPILED RULE TABLES (BUILT ONCE AT IMPORT)
+# =====================================================
+
+CRITERIA = ("TA", "TR", "CC", "LR", "GRA")
+CRITERION_INDEX = {c: i for i, c in enumerate(CRITERIA)}
+
+# Soft penalties never push TA / TR below 6.0
+SOFT_FLOOR = {"TA": 6.0, "TR": 6.0}
+
+
+class CompiledRules:
+    """
+    Array-backed view of HARD_CAP_RULES / SOFT_RULES / GRA_CEILING_RULES.
+
+    - violations / gra_flags: column order of the violation masks
+    - hard_caps (V, C): per-criterion cap, inf = no cap
+    - overall_caps (V,): overall cap, inf = no cap
+    - soft_penalty (V, C): penalty per criterion, 0 = none
+    - gra_ceilings (G,): GRA ceiling per flag
+
+    The per-violation dicts keep the scalar path (apply_all_rules) free of
+    string parsing while producing the same traces.
+    """
+
+    def __init__(self, hard_rules: dict, soft_rules: dict, gra_ceiling_rules: dict):
+        self.violations = tuple(dict.fromkeys([*hard_rules, *soft_rules]))
+        self.violation_index = {v: i for i, v in enumerate(self.violations)}
+        self.gra_flags = tuple(gra_ceiling_rules)
+        self.gra_flag_index = {g: i for i, g in enumerate(self.gra_flags)}
+
+        n_v, n_c = len(self.violations), len(CRITERIA)
+
+        self.hard_caps = np.full((n_v, n_c), np.inf)
+        self.overall_caps = np.full(n_v, np.inf)
+        self.soft_penalty = np.zeros((n_v, n_c))
+        self.soft_floor = np.array([SOFT_FLOOR.get(c, 0.0) for c in CRITERIA])
+        self.gra_ceilings = np.array(
+            [gra_ceiling_rules[g] for g in self.gra_flags], dtype=float
+        )
+
+        # violation → {"TA": 6.0, "overall": 6.5}
+        self.hard = {}
+        # violation → (criterion, penalty, explain)
+        self.soft = {}
+        self.gra_ceiling = dict(gra_ceiling_rules)
+
+        for violation, rule in hard_rules.items():
+            i = self.violation_index[violation]
+            caps = {}
+            for k, max_value in rule.items():
+                if not k.endswith("_max"):
+                    continue
+                crit = k[:-len("_max")]
+                caps[crit] = max_value
+                if crit == "overall":
+                    self.overall_caps[i] = max_value
+                elif crit in CRITERION_INDEX:
+                    self.hard_caps[i, CRITERION_INDEX[crit]] = max_value
+            self.hard[violation] = caps
+
+        for violation, rule in soft_rules.items():
+            crit = rule.get("criterion")
+            penalty = rule.get("penalty")
+            if penalty is None:
+                continue
+            self.soft[violation] = (crit, penalty, rule.get("explain"))
+            if crit in CRITERION_INDEX:
+                self.soft_penalty[self.violation_index[violation], CRITERION_INDEX[crit]] = penalty
+
+    # --------------------------------------------------
+    # MASK BUILDERS
+    # --------------------------------------------------
+    def violation_mask(self, violations: dict) -> np.ndarray:
+        mask = np.zeros(len(self.violations), dtype=bool)
+        for violation, data in (violations or {}).items():
+            i = self.violation_index.get(violation)
+            if i is not None and isinstance(data, dict) and data.get("active"):
+                mask[i] = True
+        return mask
+
+    def gra_mask(self, gra_violations) -> np.ndarray:
+        mask = np.zeros(len(self.gra_flags), dtype=bool)
+        for flag in gra_violations or []:
+            i = self.gra_flag_index.get(flag)
+            if i is not None:
+                mask[i] = True
+        return mask
+
+    def band_vector(self, bands: dict) -> np.ndarray:
+        return np.array(
+            [bands.get(c, np.nan) for c in CRITERIA], dtype=float
+        )
+
+
+def compile_rules(
+    hard_rules: dict = HARD_CAP_RULES,
+    soft_rules: dict = SOFT_RULES,
+    gra_ceiling_rules: dict = GRA_CEILING_RULES,
+) -> CompiledRules:
+    return CompiledRules(hard_rules, soft_rules, gra_ceiling_rules)
+
+
+RULES = compile_rules()
 
 # =====================================================
 # PHASE 2 – TA RULE DETECTION (NO BAND CHANGE)
@@ -38,19 +151,12 @@ def apply_ta_rules(ta_output):
 # PHASE 3 – GRAMMAR
 # =====================================================
 
-GRA_CEILING_RULES = {
-    "capitalization_errors": 7.0,
-    "systematic_punctuation_errors": 7.0,
-    "run_on_sentences": 7.0
-}
-
-
-def apply_gra_ceiling(gra_band, gra_violations):
+def apply_gra_ceiling(gra_band, gra_violations, rules: CompiledRules = RULES):
 
     capped = gra_band
     for v in gra_violations or []:
-        if v in GRA_CEILING_RULES:
-            capped = min(capped, GRA_CEILING_RULES[v])
+        if v in rules.gra_ceiling:
+            capped = min(capped, rules.gra_ceiling[v])
 
     return capped
 
@@ -59,28 +165,24 @@ def apply_gra_ceiling(gra_band, gra_violations):
 # GENERIC RULE ENGINE (HARD + SOFT, SINGLE SOURCE)
 # =====================================================
 
-def apply_all_rules(bands: dict, violations: dict):
+def apply_all_rules(bands: dict, violations: dict, rules: CompiledRules = RULES):
     capped = bands.copy()
     overall_cap = None
     applied_hard = []
     applied_soft = []
 
-    # ---------- HARD CAPS ----------
-    for violation, data in violations.items():
-        if not data.get("active"):
-            continue
+    active = [
+        (violation, data) for violation, data in violations.items()
+        if data.get("active")
+    ]
 
-        rule = HARD_CAP_RULES.get(violation)
-        if not rule:
+    # ---------- HARD CAPS ----------
+    for violation, data in active:
+        caps = rules.hard.get(violation)
+        if caps is None:
             continue
 
-        caps = {}
-        for k, max_value in rule.items():
-            if not k.endswith("_max"):
-                continue
-            crit = k.replace("_max", "")
-            caps[crit] = max_value
-
+        for crit, max_value in caps.items():
             if crit != "overall" and crit in capped:
                 capped[crit] = min(capped[crit], max_value)
 
@@ -92,33 +194,25 @@ def apply_all_rules(bands: dict, violations: dict):
 
         applied_hard.append({
             "violation": violation,
-            "caps": caps,
+            "caps": dict(caps),
             "location": data.get("location"),
             "evidence": data.get("evidence"),
             "reason": data.get("reason"),
         })
 
     # ---------- SOFT PENALTIES ----------
-    for violation, data in violations.items():
-        if not data.get("active"):
-            continue
-
-        rule = SOFT_RULES.get(violation)
+    for violation, data in active:
+        rule = rules.soft.get(violation)
         if not rule:
             continue
 
-        crit = rule.get("criterion")
-        penalty = rule.get("penalty")
+        crit, penalty, explain = rule
 
-        if crit not in capped or penalty is None:
+        if crit not in capped:
             continue
 
         old = capped[crit]
-
-        if crit in ["TA", "TR"]:
-            new_val = max(6.0, old - penalty)
-        else:
-            new_val = max(0.0, old - penalty)
+        new_val = max(SOFT_FLOOR.get(crit, 0.0), old - penalty)
 
         if new_val < old:
             capped[crit] = new_val
@@ -127,7 +221,7 @@ def apply_all_rules(bands: dict, violations: dict):
                 "violation": violation,
                 "location": data.get("location"),
                 "evidence": data.get("evidence"),
-                "reason": rule.get("explain"),
+                "reason": explain,
                 "penalty": penalty
             })
 
@@ -178,20 +272,35 @@ def ielts_rounding(score):
 # PHASE 4 – FINAL SCORING (SINGLE SOURCE OF TRUTH)
 # =====================================================
 
-def finalize_score(
+OVERALL_CEILINGS = {
+    "TA": apply_ta_overall_ceiling,
+    "TR": apply_tr_overall_ceiling,
+}
+
+
+def finalize_bands(
     bands_after_rules,
     gra_violations,
-    overall_cap
+    overall_cap,
+    primary: str = "TA",
+    rules: CompiledRules = RULES
 ):
+    """
+    Apply every post-rule ceiling once.
 
-    ta = bands_after_rules["TA"]
-    cc = bands_after_rules["CC"]
-    lr = bands_after_rules["LR"]
-    gra = apply_gra_ceiling(bands_after_rules["GRA"], gra_violations)
+    primary: "TA" (Task 1) | "TR" (Task 2)
+    returns (final_bands, final_overall, note); final_bands["GRA"] has
+    the GRA ceiling applied
+    """
+    final_bands = dict(bands_after_rules)
+    final_bands["GRA"] = apply_gra_ceiling(
+        bands_after_rules["GRA"], gra_violations, rules
+    )
 
-    raw = (ta + cc + lr + gra) / 4
+    main = final_bands[primary]
+    raw = (main + final_bands["CC"] + final_bands["LR"] + final_bands["GRA"]) / 4
 
-    capped, note = apply_ta_overall_ceiling(raw, ta)
+    capped, note = OVERALL_CEILINGS[primary](raw, main)
 
     if overall_cap is not None:
         capped = min(capped, overall_cap)
@@ -199,6 +308,18 @@ def finalize_score(
 
     final = ielts_rounding(capped)
 
+    return final_bands, final, note
+
+
+def finalize_score(
+    bands_after_rules,
+    gra_violations,
+    overall_cap
+):
+
+    _, final, note = finalize_bands(
+        bands_after_rules, gra_violations, overall_cap, primary="TA"
+    )
     return final, note
 
 def finalize_score_task2(
@@ -211,20 +332,87 @@ def finalize_score_task2(
     gra_violations: list of str
     overall_cap: float | None
     """
-    tr = bands_after_rules["TR"]
-    cc = bands_after_rules["CC"]
-    lr = bands_after_rules["LR"]
-    gra = apply_gra_ceiling(bands_after_rules["GRA"], gra_violations)
+    _, final, note = finalize_bands(
+        bands_after_rules, gra_violations, overall_cap, primary="TR"
+    )
+    return final, note
 
-    raw = (tr + cc + lr + gra) / 4
 
-    capped, note = apply_tr_overall_ceiling(raw, tr)
+# =====================================================
+# BATCH SCORING (VECTORIZED, NO TRACES)
+# =====================================================
 
-    if overall_cap is not None:
-        capped = min(capped, overall_cap)
-        note += " + HARD overall cap"
+def score_batch(
+    bands: np.ndarray,
+    violation_mask: np.ndarray,
+    gra_mask: np.ndarray,
+    task2,
+    rules: CompiledRules = RULES
+) -> dict:
+    """
+    Score N submissions at once; same numbers as apply_all_rules +
+    finalize_bands.
 
-    final = ielts_rounding(capped)
+    bands: (N, len(CRITERIA)) raw bands, NaN for unused criteria
+    violation_mask: (N, len(rules.violations)) active violations
+    gra_mask: (N, len(rules.gra_flags)) active GRA ceiling flags
+    task2: bool or (N,) bool → TR is the primary criterion
+    """
+    bands = np.asarray(bands, dtype=float)
+    violation_mask = np.asarray(violation_mask, dtype=bool)
+    gra_mask = np.asarray(gra_mask, dtype=bool)
+    n = bands.shape[0]
 
-    return final, note
+    # ---------- HARD CAPS ----------
+    # Loop over the (few) rules, vectorised over submissions
+    caps = np.full(bands.shape, np.inf)
+    overall_cap = np.full(n, np.inf)
+    for v in range(len(rules.violations)):
+        hit = violation_mask[:, v]
+        if not hit.any():
+            continue
+        caps[hit] = np.minimum(caps[hit], rules.hard_caps[v])
+        overall_cap[hit] = np.minimum(overall_cap[hit], rules.overall_caps[v])
+
+    capped = np.minimum(bands, caps)
 
+    # ---------- SOFT PENALTIES ----------
+    # Sequential max(floor, b - p) steps collapse to min(b, max(floor, b - Σp))
+    penalty = violation_mask.astype(float) @ rules.soft_penalty
+    softened = np.minimum(capped, np.maximum(rules.soft_floor, capped - penalty))
+    capped = np.where(penalty > 0, softened, capped)
+
+    # ---------- GRA CEILING ----------
+    gra_cap = np.where(gra_mask, rules.gra_ceilings, np.inf).min(axis=1, initial=np.inf)
+    gra_i = CRITERION_INDEX["GRA"]
+    capped[:, gra_i] = np.minimum(capped[:, gra_i], gra_cap)
+
+    # ---------- OVERALL ----------
+    task2 = np.broadcast_to(np.asarray(task2, dtype=bool), (n,))
+    main = np.where(
+        task2,
+        capped[:, CRITERION_INDEX["TR"]],
+        capped[:, CRITERION_INDEX["TA"]]
+    )
+    raw = (
+        main
+        + capped[:, CRITERION_INDEX["CC"]]
+        + capped[:, CRITERION_INDEX["LR"]]
+        + capped[:, gra_i]
+    ) / 4
+
+    # TA / TR → overall ceiling
+    ceiling = np.where(main < 6.0, 6.5, np.where(main <= 6.5, 7.0, np.inf))
+    overall = np.minimum(np.minimum(raw, ceiling), overall_cap)
+
+    return {
+        "bands": capped,
+        "overall_cap": np.where(np.isinf(overall_cap), np.nan, overall_cap),
+        "overall": ielts_rounding_array(overall),
+    }
+
+
+def ielts_rounding_array(scores: np.ndarray) -> np.ndarray:
+    whole = np.trunc(scores)
+    d = scores - whole
+    return whole + np.where(d < 0.25, 0.0, np.where(d < 0.75, 0.5, 1.0))
@@ -0,0 +1,227 @@
+import os
+import time
+import atexit
+import hashlib
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from app.pipeline.rule_exec import CRITERIA, RULES, CompiledRules
+
+
+# =====================================================
+# RAW PHASE OUTPUT STORE (COLUMNAR, APPEND-ONLY)
+# =====================================================
+# One .npz chunk per `chunk_size` submissions:
+#   ids            (N,)    submission content hash
+#   created        (N,)    unix seconds
+#   task2          (N,)    bool
+#   bands          (N, C)  raw bands over CRITERIA, NaN = unused
+#   violations     (N, V)  active violation mask
+#   gra_flags      (N, G)  active GRA ceiling flags
+#   final_band     (N,)    overall band served at scoring time
+#   violation_names / gra_names / criteria → column labels
+#
+# Column labels are stored per chunk: the ruleset's keys plus every other
+# active key seen in the chunk (LLM-emitted violations with no rule yet),
+# so a candidate ruleset that adds a rule for such a key can replay it.
+# Chunks are remapped onto the requested ruleset on load.
+#
+# Rows are buffered and written at `chunk_size` rows, every
+# SCORE_STORE_FLUSH_S seconds (flusher thread) and on shutdown
+# (flush_score_store: FastAPI shutdown hook, pre-fork worker exit).
+
+CHUNK_PREFIX = "chunk_"
+SCORE_STORE_FLUSH_S = float(os.getenv("SCORE_STORE_FLUSH_S", "60"))
+
+
+def submission_id(question: str, answer: str) -> str:
+    h = hashlib.sha256()
+    h.update(question.strip().encode("utf-8"))
+    h.update(b"\0")
+    h.update(answer.strip().encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+class ScoreStore:
+    def __init__(self, root: str | Path, chunk_size: int = 1000, rules: CompiledRules = RULES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.rules = rules
+
+        self._lock = threading.Lock()
+        self._rows = []
+        self._stop = threading.Event()
+        self._flusher = None
+
+        atexit.register(self.flush)
+
+    # --------------------------------------------------
+    # WRITE
+    # --------------------------------------------------
+    def append(
+        self,
+        sub_id: str,
+        task2: bool,
+        raw_bands: dict,
+        violations: dict,
+        gra_violations,
+        final_band: float,
+    ):
+        row = (
+            sub_id,
+            int(time.time()),
+            bool(task2),
+            self.rules.band_vector(raw_bands),
+            # Every active key, not only the ones with a rule today
+            tuple(
+                v for v, data in (violations or {}).items()
+                if isinstance(data, dict) and data.get("active")
+            ),
+            tuple(dict.fromkeys(gra_violations or [])),
+            float(final_band),
+        )
+
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) < self.chunk_size:
+                return
+            rows, self._rows = self._rows, []
+
+        self._write_chunk(rows)
+
+    def flush(self):
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            self._write_chunk(rows)
+
+    def start_flusher(self, interval: float = SCORE_STORE_FLUSH_S):
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"⚠️ Score store flush failed: {e}")
+
+        self._stop.clear()
+        self._flusher = threading.Thread(target=loop, name="score-store-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop_flusher(self):
+        self._stop.set()
+
+    def _write_chunk(self, rows: list):
+        ids, created, task2, bands, viol, gra, final = zip(*rows)
+
+        violation_names = _vocabulary(self.rules.violations, viol)
+        gra_names = _vocabulary(self.rules.gra_flags, gra)
+
+        name = f"{CHUNK_PREFIX}{time.time_ns()}_{os.getpid()}.npz"
+        tmp = self.root / f".{name}.tmp"
+
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                ids=np.array(ids),
+                created=np.array(created, dtype=np.int64),
+                task2=np.array(task2, dtype=bool),
+                bands=np.stack(bands).astype(np.float32),
+                violations=_mask(viol, violation_names),
+                gra_flags=_mask(gra, gra_names),
+                final_band=np.array(final, dtype=np.float32),
+                criteria=np.array(CRITERIA),
+                violation_names=np.array(violation_names, dtype=str),
+                gra_names=np.array(gra_names, dtype=str),
+            )
+
+        os.replace(tmp, self.root / name)
+
+    # --------------------------------------------------
+    # READ
+    # --------------------------------------------------
+    def chunk_paths(self) -> list:
+        return sorted(self.root.glob(f"{CHUNK_PREFIX}*.npz"))
+
+    def iter_chunks(self, rules: CompiledRules | None = None):
+        """
+        Yield one dict of arrays per chunk, with violation / GRA columns
+        remapped onto `rules` (default: the store's ruleset).
+        Names unknown to `rules` are reported under "dropped".
+        """
+        rules = rules or self.rules
+
+        for path in self.chunk_paths():
+            with np.load(path) as z:
+                yield {
+                    "ids": z["ids"],
+                    "created": z["created"],
+                    "task2": z["task2"],
+                    "bands": _remap(z["bands"], z["criteria"], CRITERIA, np.nan),
+                    "violations": _remap(z["violations"], z["violation_names"], rules.violations, False),
+                    "gra_flags": _remap(z["gra_flags"], z["gra_names"], rules.gra_flags, False),
+                    "final_band": z["final_band"],
+                    "dropped": sorted(
+                        set(z["violation_names"].tolist()) - set(rules.violations)
+                    ),
+                }
+
+
+def _vocabulary(known: tuple, rows: tuple) -> tuple:
+    """Ruleset keys first, then keys seen in the rows that have no rule."""
+    extra = sorted({k for keys in rows for k in keys} - set(known))
+    return tuple(known) + tuple(extra)
+
+
+def _mask(rows: tuple, names: tuple) -> np.ndarray:
+    index = {n: i for i, n in enumerate(names)}
+    mask = np.zeros((len(rows), len(names)), dtype=bool)
+    for r, keys in enumerate(rows):
+        for k in keys:
+            mask[r, index[k]] = True
+    return mask
+
+
+def _remap(values: np.ndarray, names: np.ndarray, target: tuple, fill):
+    names = names.tolist()
+    if tuple(names) == tuple(target):
+        return values
+
+    out = np.full((values.shape[0], len(target)), fill, dtype=values.dtype)
+    index = {n: i for i, n in enumerate(names)}
+    for j, name in enumerate(target):
+        i = index.get(name)
+        if i is not None:
+            out[:, j] = values[:, i]
+    return out
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_score_store() -> ScoreStore | None:
+    """Process-wide store; enabled by SCORE_STORE_DIR."""
+    global _store
+
+    root = os.getenv("SCORE_STORE_DIR")
+    if not root:
+        return None
+
+    with _store_lock:
+        if _store is None:
+            _store = ScoreStore(
+                root,
+                chunk_size=int(os.getenv("SCORE_STORE_CHUNK", "1000")),
+            )
+        return _store
+
+
+def flush_score_store():
+    """Write buffered rows now (shutdown hooks; atexit is skipped by os._exit)."""
+    store = _store
+    if store is not None:
+        store.stop_flusher()
+        store.flush()
@@ -0,0 +1,157 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.llm_client import LLMClient
+from app.llm_cache import CachedLLM
+from app.pipeline.utils import extract_json
+from app.pipeline.prompt_loader import load_prompt, render_input
+from app.pipeline.phases import _ensure_band
+from app.pipeline.rule_exec import ielts_rounding
+from app.pipeline.rubric_cache import get_speaking_rubrics, band_descriptor
+
+
+# criterion → (prompt file, display name)
+SPEAKING_CRITERIA = {
+    "FC": ("speaking_fc.txt", "Fluency and Coherence"),
+    "LR": ("speaking_lr.txt", "Lexical Resource"),
+    "GRA": ("speaking_gra.txt", "Grammatical Range and Accuracy"),
+    "PR": ("speaking_pr.txt", "Pronunciation"),
+}
+
+# One retry per criterion; after that it is reported as failed, never
+# given a made-up band
+SPEAKING_ATTEMPTS = 2
+
+
+# =====================================================
+# PHASE – ONE SPEAKING CRITERION
+# =====================================================
+def score_criterion(llm, criterion: str, question: str, transcript: str) -> dict:
+    filename, _ = SPEAKING_CRITERIA[criterion]
+
+    system_prompt = load_prompt(filename, rubric_name=criterion, speaking=True)
+    user_prompt = render_input({
+        "QUESTION": question,
+        "TRANSCRIPT": transcript,
+    })
+
+    error = None
+    for attempt in range(1, SPEAKING_ATTEMPTS + 1):
+        raw = llm.ask(system_prompt, user_prompt, phase=f"speaking_{criterion.lower()}")
+        try:
+            return _parse_criterion(raw, criterion)
+        except ValueError as e:
+            error = str(e)
+            print(f"⚠️ speaking {criterion}: {error} (attempt {attempt}/{SPEAKING_ATTEMPTS})")
+
+    return {"band": None, "failed": True, "error": error}
+
+
+def _parse_criterion(raw: str, criterion: str) -> dict:
+    result = _ensure_band(extract_json(raw), criterion)
+    if result.get("_band_fallback"):
+        raise ValueError("response has no band")
+    # e.g. 65 for 6.5, or a 0–100 score → would skew the overall mean
+    if not 0.0 <= result["band"] <= 9.0:
+        raise ValueError(f"band out of range: {result['band']}")
+    return result
+
+
+def _has_band(raw: str) -> bool:
+    """CachedLLM validate hook: a band-less answer is not cached → the retry reaches the model."""
+    try:
+        _parse_criterion(raw, "speaking")
+        return True
+    except ValueError:
+        return False
+
+
+class SpeakingPipeline:
+    def __init__(self, llm=None):
+        # Shared response cache: re-scoring the same transcript is free
+        self.llm = llm or CachedLLM(
+            LLMClient("llama3.1"),
+            validate=_has_band,
+        )
+
+        # Band-indexed rubric, read once → fail at startup, not per request
+        missing = set(SPEAKING_CRITERIA) - set(get_speaking_rubrics())
+        if missing:
+            raise FileNotFoundError(f"Speaking rubric missing for: {sorted(missing)}")
+
+    # ==================================================
+    # MAIN ENTRY
+    # ==================================================
+    def score(self, question: str, transcript: str, debug: bool = False):
+        # =====================
+        # PHASE 1 – CRITERIA (PARALLEL)
+        # =====================
+        # Overlap only as far as Ollama allows: the residency scheduler
+        # admits OLLAMA_NUM_PARALLEL calls on llama3.1 at once (default 1 →
+        # the four criteria run one after another). Set it to 4 for both
+        # the Ollama server and this API to score them concurrently.
+        with ThreadPoolExecutor(max_workers=len(SPEAKING_CRITERIA)) as executor:
+            futures = {
+                c: executor.submit(score_criterion, self.llm, c, question, transcript)
+                for c in SPEAKING_CRITERIA
+            }
+            results = {c: f.result() for c, f in futures.items()}
+
+        scores = {c: r["band"] for c, r in results.items()}
+        failed = [c for c, r in results.items() if r.get("failed")]
+        if len(failed) == len(results):
+            raise RuntimeError("Speaking scoring failed: no criterion returned a band")
+
+        # =====================
+        # PHASE 2 – OVERALL (MEAN, IELTS ROUNDING)
+        # =====================
+        # Only from all four criteria; a partial mean is not an IELTS band
+        overall = None if failed else ielts_rounding(sum(scores.values()) / len(scores))
+
+        # =====================
+        # PHASE 3 – FEEDBACK
+        # =====================
+        feedback = {
+            c: r.get("feedback") or "; ".join(r.get("weaknesses", [])[:2])
+            for c, r in results.items()
+            if not r.get("failed")
+        }
+        feedback["summary"] = _summary(scores, overall, failed)
+
+        result = {
+            "transcript": transcript,
+            "scores": scores,
+            "overall": overall,
+            "feedback": feedback,
+            "failed_criteria": failed,
+        }
+
+        if debug:
+            result["debug"] = {"criteria": results}
+
+        return result
+
+
+def _summary(scores: dict, overall: float | None, failed: list) -> str:
+    if failed:
+        names = ", ".join(SPEAKING_CRITERIA[c][1] for c in failed)
+        return f"No overall band: {names} could not be scored. Please submit again."
+
+    best = max(scores, key=scores.get)
+    worst = min(scores, key=scores.get)
+
+    if scores[best] == scores[worst]:
+        return f"Overall band {overall}. Performance is even across all four criteria."
+
+    summary = (
+        f"Overall band {overall}. Strongest area: {SPEAKING_CRITERIA[best][1]} "
+        f"({scores[best]}). Focus next on {SPEAKING_CRITERIA[worst][1]} ({scores[worst]})."
+    )
+
+    # What the next whole band asks for on the weakest criterion
+    target = band_descriptor(worst, scores[worst] + 1)
+    if target:
+        first = next((l[2:] for l in target.splitlines() if l.startswith("- ")), "")
+        if first:
+            summary += f" Band {int(scores[worst]) + 1} requires: {first}"
+
+    return summary
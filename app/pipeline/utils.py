@@ -105,6 +105,15 @@ def extract_json(raw: str) -> dict:
     raise ValueError("Unclosed JSON object in LLM response")
 
 
+def parses_json(raw: str) -> bool:
+    """CachedLLM validate hook: only cache responses extract_json accepts."""
+    try:
+        extract_json(raw)
+        return True
+    except ValueError:
+        return False
+
+
 
 
 # ===============================
@@ -117,4 +126,31 @@ def extract_rubric(doc: str, max_chars: int = 800) -> str:
     if "[BAND DESCRIPTORS]" in doc:
         doc = doc.split("[BAND DESCRIPTORS]")[1]
 
-    return doc.strip()[:max_chars]
\ No newline at end of file
+    return doc.strip()[:max_chars]
+
+def extract_section(doc: str, name: str) -> str:
+    """Body of a canonical [NAME] section from a refactored sample file."""
+    marker = f"[{name}]"
+    if marker not in doc:
+        return ""
+
+    body = doc.split(marker, 1)[1]
+    end = re.search(r"^\[[A-Z_ ]+\]\s*$", body, flags=re.M)
+    return (body[:end.start()] if end else body).strip()
+
+
+def extract_exemplar(doc: str, answer_chars: int = 700, rationale_chars: int = 300) -> str:
+    """
+    Trim a band sample to what calibrates a band:
+    the (truncated) answer and why it got that band.
+    """
+    answer = extract_section(doc, "SAMPLE_ANSWER") or doc.strip()
+    rationale = extract_section(doc, "RATIONALE")
+
+    if len(answer) > answer_chars:
+        answer = answer[:answer_chars].rsplit(" ", 1)[0] + " …"
+
+    if not rationale or rationale.startswith("No rationale"):
+        return answer
+
+    return f"{answer}\nWHY: {rationale[:rationale_chars]}"
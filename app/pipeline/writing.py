@@ -1,16 +1,36 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
 from app.rag_manager import RAGManager
 from app.pipeline.utils import (
     extract_rubric
 )
 from app.pipeline.writing_task1 import WritingTask1Pipeline
 from app.pipeline.writing_task2 import WritingTask2Pipeline
+from app.pipeline.prescreen import PreScreen, prescreen_result
+from app.pipeline.score_store import submission_id
+
+# fast: local features + one LLM call for all four bands (estimate)
+# full: per-phase examiner flow with feedback
+WRITING_MODES = ("fast", "full")
+
+# Chart description + parsed essay per submission, so a fast result can
+# be upgraded to full without repeating phases 0–1
+PREPARED_CACHE_SIZE = int(os.getenv("WRITING_PREPARED_CACHE_SIZE", "256"))
 
 
 class WritingPipeline:
     def __init__(self):
         self.rag = RAGManager()
         self.task1_pipeline = WritingTask1Pipeline()
-        self.task2_pipeline = WritingTask2Pipeline()
+        # One RAGManager (embedder + Chroma client) for the whole process
+        self.task2_pipeline = WritingTask2Pipeline(rag=self.rag)
+        self.prescreen = PreScreen(embedder=self.rag.embedder)
+
+        self._prepared = OrderedDict()
+        self._prepared_lock = threading.Lock()
 
     # --------------------------------------------------
     # MAIN ENTRY
@@ -19,17 +39,73 @@ class WritingPipeline:
         self,
         question: str,
         answer: str,
-        chart_path: str | None = None
+        chart: bytes | str | None = None,
+        mode: str = "full"
     ):
-        if chart_path:
-            return self.task1_pipeline.score(
-                question=question,
-                answer=answer,
-                chart_path=chart_path
-            )
-
-
-        return self.task2_pipeline.score(
-            question=question,
-            answer=answer,
-        )
+        if mode not in WRITING_MODES:
+            raise ValueError(f"Unknown scoring mode: {mode} (expected one of {WRITING_MODES})")
+
+        # =====================
+        # PRE-SCREEN – JUNK SUBMISSIONS SKIP EVERY LLM PHASE
+        # =====================
+        task = 1 if chart else 2
+        key = _submission_key(question, answer, chart)
+
+        screen = self.prescreen.check(question, answer, task=task)
+        if not screen["passed"]:
+            print(f"⚠️ Pre-screen rejected submission: {screen['reason']}")
+            result = prescreen_result(screen, task=task)
+            # Same shape as every other result; no upgrade, full mode would reject it too
+            result["mode"] = mode
+            result["submission_id"] = key
+            return result
+
+        prepared = self._get_prepared(key)
+
+        # chart: image bytes (upload store) or a path
+        if chart:
+            pipeline = self.task1_pipeline
+            run = pipeline.score_fast if mode == "fast" else pipeline.score
+            result = run(question=question, answer=answer, chart=chart, prepared=prepared)
+        else:
+            pipeline = self.task2_pipeline
+            run = pipeline.score_fast if mode == "fast" else pipeline.score
+            result = run(question=question, answer=answer, prepared=prepared)
+
+        self._put_prepared(key, prepared)
+
+        result["mode"] = mode
+        result["submission_id"] = key
+        if mode == "fast":
+            # Same submission with mode=full reuses the parse / chart description
+            result["upgrade"] = {"mode": "full"}
+
+        return result
+
+    # --------------------------------------------------
+    # PREPARED PHASES (FAST → FULL UPGRADE)
+    # --------------------------------------------------
+    def _get_prepared(self, key: str) -> dict:
+        with self._prepared_lock:
+            prepared = self._prepared.get(key)
+            if prepared is not None:
+                self._prepared.move_to_end(key)
+        # Copy → concurrent requests never fill the same dict
+        return dict(prepared or {})
+
+    def _put_prepared(self, key: str, prepared: dict):
+        if not prepared:
+            return
+        with self._prepared_lock:
+            self._prepared[key] = prepared
+            self._prepared.move_to_end(key)
+            while len(self._prepared) > PREPARED_CACHE_SIZE:
+                self._prepared.popitem(last=False)
+
+
+def _submission_key(question: str, answer: str, chart) -> str:
+    key = submission_id(question, answer)
+    if not chart:
+        return key
+    data = chart if isinstance(chart, (bytes, bytearray)) else str(chart).encode("utf-8")
+    return f"{key}-{hashlib.sha256(data).hexdigest()[:16]}"
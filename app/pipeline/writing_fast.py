@@ -0,0 +1,97 @@
+from app.pipeline import phases
+from app.pipeline.features import (
+    extract_features,
+    rule_violations,
+    with_gra_flags,
+)
+from app.pipeline.rule_exec import (
+    apply_all_rules,
+    finalize_bands,
+)
+
+
+# =====================================================
+# FAST TIER (LOCAL FEATURES + ONE LLM CALL)
+# =====================================================
+# Same rule engine and ceilings as the full flow, fed by one compact
+# call that returns all four bands. No per-criterion detection, no
+# phase 7 feedback → a band estimate with a one-line summary.
+# Raw bands are not written to the score store: they come from a
+# different prompt than the per-phase bands it holds.
+
+TASK_NAMES = {"TA": "IELTS Writing Task 1", "TR": "IELTS Writing Task 2"}
+
+
+def score_fast(
+    llm,
+    question: str,
+    answer: str,
+    parsed_essay: dict,
+    primary: str,
+    chart_data=None,
+    debug: bool = False,
+):
+    """primary: "TA" (Task 1) | "TR" (Task 2)"""
+
+    # =====================
+    # PHASE 1.5 – LOCAL FEATURES (NO LLM)
+    # =====================
+    features = extract_features(parsed_essay)
+
+    # =====================
+    # PHASE F – ALL BANDS, ONE CALL
+    # =====================
+    fast = phases.phase_fast(llm, question, answer, features, primary, chart_data=chart_data)
+    raw_bands = fast["bands"]
+
+    # =====================
+    # PHASE 6 – RULE ENGINE (LOCAL VIOLATIONS ONLY)
+    # =====================
+    violations = rule_violations(features)
+    capped_bands, overall_cap, applied_hard, applied_soft = apply_all_rules(
+        raw_bands,
+        violations
+    )
+
+    final_bands, final_band, note = finalize_bands(
+        bands_after_rules=capped_bands,
+        gra_violations=with_gra_flags([], features),
+        overall_cap=overall_cap,
+        primary=primary
+    )
+
+    bands = {
+        c: {
+            "base_band": raw_bands[c],
+            "final_band": final_bands[c],
+            "band": final_bands[c],
+        }
+        for c in (primary, "CC", "LR", "GRA")
+    }
+    bands[primary]["applied_soft"] = applied_soft
+
+    result = {
+        "task": TASK_NAMES[primary],
+        "overall": {
+            "band": final_band,
+            "note": note,
+            "hard_caps": applied_hard
+        },
+        "bands": bands,
+        "feedback": {
+            "type": "quick_estimate",
+            "content": fast["summary"]
+        },
+    }
+
+    if debug:
+        result["debug"] = {
+            "chart_data": chart_data,
+            "parsed_essay": parsed_essay,
+            "features": features,
+            "violations": violations,
+            "raw_bands": raw_bands,
+            "bands_after_rules": capped_bands,
+        }
+
+    return result
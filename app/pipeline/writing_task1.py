@@ -1,14 +1,21 @@
 from concurrent.futures import ThreadPoolExecutor
 
-from app.llm_remote import NvidiaLLM
-from app.llm_factory import LLMFactory
+from app.llm_router import RoutedLLM
+from app.llm_cache import CachedLLM
 from app.vision_client import VisionClient
 from app.pipeline import phases
+from app.pipeline.features import (
+    extract_features,
+    rule_violations,
+    with_gra_flags,
+)
 from app.pipeline.rule_exec import (
     apply_all_rules,
-    finalize_score,
-    apply_gra_ceiling,
+    finalize_bands,
 )
+from app.pipeline.score_store import get_score_store, submission_id
+from app.pipeline.utils import parses_json
+from app.pipeline import writing_fast
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -16,20 +23,64 @@ load_dotenv()
 
 
 class WritingTask1Pipeline:
-    def __init__(self):
-        self.llm = NvidiaLLM(api_key=os.getenv("NVIDIA_API_KEY"))
+    def __init__(self, routing: dict | None = None):
+        # Per-phase backend/model (app/llm_router.py); one shared BatchingLLM
+        # per NVIDIA model → same-phase calls from concurrent requests are batched
+        # Cached → re-scoring a submission (fast → full upgrade) reuses phases
+        self.llm = CachedLLM(
+            RoutedLLM.for_task("task1", routing),
+            validate=parses_json,
+            validators={"phase_fast": phases.fast_has_bands},
+        )
         self.vision = VisionClient()
 
-    def score(self, question: str, answer: str, chart_path: str, debug: bool = False):
+    def prepare(self, answer: str, chart: bytes | str, prepared: dict | None = None) -> dict:
+        """
+        Phases 0–1, shared by both tiers. Fills `prepared` in place, so a
+        fast result can be upgraded to full without re-running them.
+        """
+        prepared = {} if prepared is None else prepared
+
         # =====================
         # PHASE 0 – CHART UNDERSTANDING
         # =====================
-        chart_data = phases.phase0_chart(self.vision, chart_path)
+        if "chart_data" not in prepared:
+            prepared["chart_data"] = phases.phase0_chart(self.vision, chart)
 
         # =====================
         # PHASE 1 – PARSE ESSAY STRUCTURE
         # =====================
-        parsed_essay = phases.phase1_parse(self.llm, answer)
+        if "parsed_essay" not in prepared:
+            prepared["parsed_essay"] = phases.phase1_parse(self.llm, answer)
+
+        return prepared
+
+    def score_fast(self, question: str, answer: str, chart: bytes | str,
+                   debug: bool = False, prepared: dict | None = None):
+        prepared = self.prepare(answer, chart, prepared)
+        return writing_fast.score_fast(
+            self.llm,
+            question,
+            answer,
+            prepared["parsed_essay"],
+            primary="TA",
+            chart_data=prepared["chart_data"],
+            debug=debug,
+        )
+
+    def score(self, question: str, answer: str, chart: bytes | str,
+              debug: bool = False, prepared: dict | None = None):
+        # =====================
+        # PHASE 0–1 – CHART + PARSE (REUSED FROM THE FAST TIER IF DONE)
+        # =====================
+        prepared = self.prepare(answer, chart, prepared)
+        chart_data = prepared["chart_data"]
+        parsed_essay = prepared["parsed_essay"]
+
+        # =====================
+        # PHASE 1.5 – LOCAL FEATURES (NO LLM)
+        # =====================
+        features = extract_features(parsed_essay)
 
         # =====================
         # PHASE 2 – TASK ACHIEVEMENT (DETECTION ONLY)
@@ -48,30 +99,32 @@ class WritingTask1Pipeline:
         # =====================
         # PHASE 3–5 – PARALLEL SCORING (CC, LR, GRA)
         # =====================
-        factory = LLMFactory()
-
         with ThreadPoolExecutor(max_workers=3) as executor:
             futures = {
                "CC": executor.submit(
                      phases.phase3_cc,
-                     factory.create(),
+                     self.llm,
                      parsed_essay
                 ),
                 "LR": executor.submit(
                       phases.phase4_lr,
-                      factory.create(),
-                      parsed_essay
+                      self.llm,
+                      parsed_essay,
+                      features
              ),
                 "GRA": executor.submit(
                        phases.phase5_gra,
-                       factory.create(),
-                       parsed_essay
+                       self.llm,
+                       parsed_essay,
+                       features
                 ),
        }
             cc = futures["CC"].result()
             lr = futures["LR"].result()
             gra = futures["GRA"].result()
 
+        gra["violations"] = with_gra_flags(gra.get("violations", {}), features)
+
         # =====================
         # PHASE 5.5 – RAW BANDS SNAPSHOT
         # =====================
@@ -82,7 +135,10 @@ class WritingTask1Pipeline:
             "GRA": gra["band"],
         }
 
-        violations = ta.get("violations", {})
+        violations = {
+            **ta.get("violations", {}),
+            **rule_violations(features),
+        }
 
         # =====================
         # PHASE 6 – RULE ENGINE (HARD + SOFT)
@@ -92,16 +148,35 @@ class WritingTask1Pipeline:
         # =====================
         # PHASE 6.5 – FINAL OVERALL SCORING
         # =====================
-        final_band, note = finalize_score(
+        final_bands, final_band, note = finalize_bands(
             bands_after_rules=capped_bands,
             gra_violations=gra.get("violations", {}),
-            overall_cap=overall_cap
+            overall_cap=overall_cap,
+            primary="TA"
         )
 
+        # =====================
+        # PHASE 6.6 – PERSIST RAW OUTPUTS (OFFLINE RE-SCORING)
+        # =====================
+        store = get_score_store()
+        if store:
+            # Offline data only → never fail a scored submission over it
+            try:
+                store.append(
+                    submission_id(question, answer),
+                    task2=False,
+                    raw_bands=raw_bands,
+                    violations=violations,
+                    gra_violations=gra.get("violations", {}),
+                    final_band=final_band,
+                )
+            except Exception as e:
+                print(f"⚠️ Score store append failed: {e}")
+
         # =====================
         # PHASE 7 – ATTACH FINAL BANDS (UNIFIED)
         # =====================
-        gra_ceiled = apply_gra_ceiling(capped_bands["GRA"], gra.get("violations", {}))
+        gra_ceiled = final_bands["GRA"]
 
         # GRA ceiling flag
         gra["ceiling_applied"] = gra_ceiled != gra["band"]
@@ -162,6 +237,7 @@ class WritingTask1Pipeline:
             result["debug"] = {
                 "chart_data": chart_data,
                 "parsed_essay": parsed_essay,
+                "features": features,
                 "violations": violations,
                 "raw_bands": raw_bands,
                 "bands_after_rules": capped_bands,
@@ -1,31 +1,87 @@
-from app.llm_client import LLMClient
+from concurrent.futures import ThreadPoolExecutor
+
+from app.llm_router import RoutedLLM
+from app.llm_cache import CachedLLM
 from app.rag_manager import RAGManager
 from app.pipeline import phases
+from app.pipeline.exemplars import ExemplarRetriever
+from app.pipeline.segmenter import classify_task_type
+from app.pipeline.features import (
+    extract_features,
+    rule_violations,
+    with_gra_flags,
+)
 from app.pipeline.rule_exec import (
     apply_all_rules,
-    finalize_score_task2,
-    apply_gra_ceiling,
+    finalize_bands,
 )
+from app.pipeline.score_store import get_score_store, submission_id
+from app.pipeline.utils import parses_json
+from app.pipeline import writing_fast
 
 
 class WritingTask2Pipeline:
-    def __init__(self):
-        self.llm = LLMClient("llama3.1")
-        self.rag = RAGManager()
+    def __init__(self, rag: RAGManager | None = None, routing: dict | None = None):
+        # Per-phase backend/model (app/llm_router.py)
+        # Cached → re-scoring a submission (fast → full upgrade) reuses phases
+        self.llm = CachedLLM(
+            RoutedLLM.for_task("task2", routing),
+            validate=parses_json,
+            validators={"phase_fast": phases.fast_has_bands},
+        )
+        self.rag = rag or RAGManager()
+        self.exemplars = ExemplarRetriever(self.rag)
+
     # ==================================================
     # MAIN ENTRY
     # ==================================================
+    def prepare(self, question: str, answer: str, prepared: dict | None = None) -> dict:
+        """
+        Phase 1, shared by both tiers. Fills `prepared` in place, so a
+        fast result can be upgraded to full without re-parsing.
+        """
+        prepared = {} if prepared is None else prepared
+        if "parsed_essay" not in prepared:
+            prepared["parsed_essay"] = phases.phase1_parse_task2(self.llm, question, answer)
+        return prepared
+
+    def score_fast(self, question: str, answer: str, debug: bool = False,
+                   prepared: dict | None = None):
+        prepared = self.prepare(question, answer, prepared)
+        return writing_fast.score_fast(
+            self.llm,
+            question,
+            answer,
+            prepared["parsed_essay"],
+            primary="TR",
+            debug=debug,
+        )
+
     def score(
         self,
         question: str,
         answer: str,
-        debug: bool = False
+        debug: bool = False,
+        prepared: dict | None = None
     ):
 
         # =====================
-        # PHASE 1 – PARSE ESSAY
+        # PHASE 1 – PARSE ESSAY  ∥  BAND EXEMPLARS (RAG)
+        # =====================
+        # Retrieval only needs the question → runs off the critical path
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            exemplars_future = executor.submit(
+                self._retrieve_exemplars,
+                question,
+                classify_task_type(question)[0],
+            )
+            parsed_essay = self.prepare(question, answer, prepared)["parsed_essay"]
+            exemplars = exemplars_future.result()
+
+        # =====================
+        # PHASE 1.5 – LOCAL FEATURES (NO LLM)
         # =====================
-        parsed_essay = phases.phase1_parse_task2(self.llm, question,answer)
+        features = extract_features(parsed_essay)
 
         # =====================
         # PHASE 2 – TASK RESPONSE (DETECTION ONLY)
@@ -34,7 +90,8 @@ class WritingTask2Pipeline:
             self.llm,
             question,
             parsed_essay,
-            task_type=parsed_essay["task_type"]
+            task_type=parsed_essay["task_type"],
+            exemplars=exemplars,
         )
 
         tr_band = tr_output["band"]
@@ -54,12 +111,13 @@ class WritingTask2Pipeline:
         # =====================
         # PHASE 4 – LEXICAL RESOURCE
         # =====================
-        lr = phases.phase4_lr(self.llm, parsed_essay)
+        lr = phases.phase4_lr(self.llm, parsed_essay, features)
 
         # =====================
         # PHASE 5 – GRAMMATICAL RANGE & ACCURACY
         # =====================
-        gra = phases.phase5_gra(self.llm, parsed_essay)
+        gra = phases.phase5_gra(self.llm, parsed_essay, features)
+        gra["violations"] = with_gra_flags(gra.get("violations", []), features)
 
         # =====================
         # PHASE 5.5 – RAW BANDS SNAPSHOT
@@ -74,35 +132,54 @@ class WritingTask2Pipeline:
         # =====================
         # PHASE 6 – RULE ENGINE (HARD + SOFT)
         # =====================
+        violations = {
+            **tr.get("violations", {}),
+            **rule_violations(features),
+        }
+
         capped_bands, overall_cap, applied_hard, applied_soft = apply_all_rules(
             raw_bands,
-            tr.get("violations", {})
+            violations
         )
 
         # =====================
         # PHASE 6.5 – FINAL OVERALL SCORING
         # =====================
-        final_band, note = finalize_score_task2(
+        final_bands, final_band, note = finalize_bands(
             bands_after_rules=capped_bands,
             gra_violations=gra.get("violations", []),
-            overall_cap=overall_cap
+            overall_cap=overall_cap,
+            primary="TR"
         )
 
         # =====================
-        # PHASE 7 – ATTACH FINAL BANDS (UNIFIED)
+        # PHASE 6.6 – PERSIST RAW OUTPUTS (OFFLINE RE-SCORING)
         # =====================
-        gra_ceiled = apply_gra_ceiling(
-            capped_bands["GRA"],
-            gra.get("violations", [])
-        )
+        store = get_score_store()
+        if store:
+            # Offline data only → never fail a scored submission over it
+            try:
+                store.append(
+                    submission_id(question, answer),
+                    task2=True,
+                    raw_bands=raw_bands,
+                    violations=violations,
+                    gra_violations=gra.get("violations", []),
+                    final_band=final_band,
+                )
+            except Exception as e:
+                print(f"⚠️ Score store append failed: {e}")
 
+        # =====================
+        # PHASE 7 – ATTACH FINAL BANDS (UNIFIED)
+        # =====================
         for criterion, value in zip(
             [tr, cc, lr, gra],
             [
-                capped_bands["TR"],
-                capped_bands["CC"],
-                capped_bands["LR"],
-                gra_ceiled,
+                final_bands["TR"],
+                final_bands["CC"],
+                final_bands["LR"],
+                final_bands["GRA"],
             ]
         ):
             criterion["final_band"] = value
@@ -149,8 +226,10 @@ class WritingTask2Pipeline:
 
         if debug:
             result["debug"] = {
-                "context": context,
+                "exemplars": exemplars,
                 "parsed_essay": parsed_essay,
+                "features": features,
+                "violations": violations,
                 "raw_bands": raw_bands,
                 "bands_after_rules": capped_bands,
                 "applied_hard": applied_hard,
@@ -158,3 +237,11 @@ class WritingTask2Pipeline:
             }
 
         return result
+
+    def _retrieve_exemplars(self, question: str, task_type: str) -> list:
+        # Exemplars only calibrate TR → never fail scoring over them
+        try:
+            return self.exemplars.retrieve(question, task_type)
+        except Exception as e:
+            print(f"⚠️ Exemplar retrieval failed: {e}")
+            return []
@@ -0,0 +1,174 @@
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+# =====================================================
+# QUANTIZED EMBEDDING STORE (EXACT SEARCH, NUMPY)
+# =====================================================
+# Side store next to the Chroma collection holding L2-normalised
+# embeddings as float16 (2 bytes/dim) or int8 (1 byte/dim + one float32
+# scale per row) instead of float32. Used for re-ranking retrieval
+# candidates and as a compact brute-force index:
+#   bge-small (384 dims) → float32 1.5 KB, float16 768 B, int8 388 B per doc
+#
+# int8: symmetric per-row scaling, v ≈ q * scale with q in [-127, 127]
+
+DTYPES = ("float16", "int8")
+
+
+class QuantizedEmbeddingStore:
+    def __init__(self, dtype: str = "int8", dim: int | None = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unsupported dtype: {dtype} (expected one of {DTYPES})")
+
+        self.dtype = dtype
+        self.dim = dim
+
+        self._lock = threading.Lock()
+        self._ids = []
+        self._index = {}
+        self._codes = None   # (N, D) float16 | int8
+        self._scales = None  # (N,) float32, int8 only
+        self._pending = []   # rows appended since the last consolidation
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self._index
+
+    @property
+    def nbytes(self) -> int:
+        self._consolidate()
+        if self._codes is None:
+            return 0
+        return self._codes.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    # --------------------------------------------------
+    # WRITE
+    # --------------------------------------------------
+    def add(self, doc_id: str, embedding):
+        vec = _normalize(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        self.dim = self.dim or vec.shape[0]
+
+        with self._lock:
+            if doc_id in self._index:
+                # Chroma add() on an existing id is a no-op → same here
+                return
+            self._index[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+            self._pending.append(vec)
+
+    def add_many(self, ids: list, embeddings):
+        for doc_id, vec in zip(ids, embeddings):
+            self.add(doc_id, vec)
+
+    def _consolidate(self):
+        with self._lock:
+            if not self._pending:
+                return
+            rows, self._pending = np.stack(self._pending), []
+
+            codes, scales = _quantize(rows, self.dtype)
+            if self._codes is None:
+                self._codes, self._scales = codes, scales
+            else:
+                self._codes = np.concatenate([self._codes, codes])
+                if scales is not None:
+                    self._scales = np.concatenate([self._scales, scales])
+
+    # --------------------------------------------------
+    # READ
+    # --------------------------------------------------
+    def vectors(self, ids: list | None = None) -> np.ndarray:
+        """Dequantized (approximately unit-length) float32 rows."""
+        self._consolidate()
+        if self._codes is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+
+        rows = slice(None) if ids is None else [self._index[i] for i in ids]
+        out = self._codes[rows].astype(np.float32)
+        if self._scales is not None:
+            out *= self._scales[rows, None]
+        return out
+
+    def similarity(self, query, ids: list | None = None) -> np.ndarray:
+        """Cosine similarity of the query against `ids` (default: all rows)."""
+        self._consolidate()
+        if self._codes is None:
+            return np.zeros(0, dtype=np.float32)
+
+        q = _normalize(np.asarray(query, dtype=np.float32)[None, :])[0]
+        rows = slice(None) if ids is None else [self._index[i] for i in ids]
+
+        sims = _dot(self._codes[rows], q)
+        if self._scales is not None:
+            sims *= self._scales[rows]
+        return sims
+
+    def search(self, query, top_k: int = 6) -> list:
+        """Exact top-k by cosine → [(doc_id, similarity)]."""
+        sims = self.similarity(query)
+        if not sims.size:
+            return []
+
+        k = min(top_k, sims.size)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self._ids[i], float(sims[i])) for i in top]
+
+    # --------------------------------------------------
+    # PERSISTENCE
+    # --------------------------------------------------
+    def save(self, path: str | Path):
+        self._consolidate()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                dtype=np.array(self.dtype),
+                ids=np.array(self._ids),
+                codes=self._codes if self._codes is not None else np.zeros((0, self.dim or 0), dtype=self.dtype),
+                scales=self._scales if self._scales is not None else np.zeros(0, dtype=np.float32),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "QuantizedEmbeddingStore":
+        with np.load(path) as z:
+            store = cls(str(z["dtype"]), dim=z["codes"].shape[1] or None)
+            store._ids = z["ids"].tolist()
+            store._index = {doc_id: i for i, doc_id in enumerate(store._ids)}
+            if store._ids:
+                store._codes = z["codes"]
+                store._scales = z["scales"] if store.dtype == "int8" else None
+        return store
+
+
+def _normalize(rows: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return rows / np.maximum(norms, 1e-12)
+
+
+def _dot(codes: np.ndarray, q: np.ndarray, block: int = 4096) -> np.ndarray:
+    # Upcast block by block → float32 BLAS speed, bounded temporary memory
+    out = np.empty(codes.shape[0], dtype=np.float32)
+    for start in range(0, codes.shape[0], block):
+        out[start:start + block] = codes[start:start + block].astype(np.float32) @ q
+    return out
+
+
+def _quantize(rows: np.ndarray, dtype: str):
+    if dtype == "float16":
+        return rows.astype(np.float16), None
+
+    scales = np.abs(rows).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
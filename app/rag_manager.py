@@ -1,13 +1,111 @@
+import os
+import weakref
+from pathlib import Path
+
 import chromadb
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from app.embeddings import get_embedder
+from app.topic_index import TopicIndex
+from app.quantized_store import QuantizedEmbeddingStore
+
+# Built by scripts/refactor_dataset.py
+TOPIC_INDEX_PATH = os.getenv("TOPIC_INDEX_PATH", "data/samples/topic_index.json")
+
+# HNSW parameters are fixed when the collection is created: changing
+# space / M / construction_ef needs a re-index (scripts/index_rubrics.py
+# into a fresh ./vectorstore), a mismatch is only warned about.
+# search_ef is applied to the existing collection on open where Chroma
+# allows it (configuration ef_search, Chroma ≥ 1.0); older versions
+# need the rebuild too. Tune with scripts/bench_retrieval.py.
+HNSW_PARAMS = {
+    "hnsw:space": os.getenv("RAG_HNSW_SPACE", "l2"),
+    "hnsw:M": int(os.getenv("RAG_HNSW_M", "16")),
+    "hnsw:construction_ef": int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "100")),
+    "hnsw:search_ef": int(os.getenv("RAG_HNSW_EF_SEARCH", "50")),
+}
+
+# "int8" | "float16" → keep a quantized copy of every embedding for
+# re-ranking without pulling float32 vectors out of Chroma
+EMBEDDING_STORE = os.getenv("RAG_EMBEDDING_STORE", "")
+EMBEDDING_STORE_PATH = os.getenv("RAG_EMBEDDING_STORE_PATH", "vectorstore/embeddings.npz")
+
+# Chroma ≥ 1.0 collection configuration["hnsw"] key → HNSW_PARAMS key
+HNSW_CONFIG_KEYS = {
+    "space": "hnsw:space",
+    "max_neighbors": "hnsw:M",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+}
 
 
 class RAGManager:
     def __init__(self):
+        self._open_collection()
+
+        # Chroma's SQLite handles and background threads don't survive
+        # fork() → pre-forked workers (app/serve.py) reopen their own
+        _OPEN_MANAGERS.add(self)
+
+        # bge-small-en via EMBEDDING_BACKEND (sentence-transformers | onnx)
+        self.embedder = get_embedder()
+
+        self.topic_index = None
+        self._task_values = None
+        if Path(TOPIC_INDEX_PATH).exists():
+            self.topic_index = TopicIndex.load(TOPIC_INDEX_PATH)
+
+        self.quantized = None
+        if EMBEDDING_STORE:
+            if Path(EMBEDDING_STORE_PATH).exists():
+                self.quantized = QuantizedEmbeddingStore.load(EMBEDDING_STORE_PATH)
+            else:
+                self.quantized = QuantizedEmbeddingStore(EMBEDDING_STORE)
+
+    def _open_collection(self):
         # Lưu vectorstore trong thư mục local
         self.client = chromadb.PersistentClient(path="./vectorstore")
-        self.collection = self.client.get_or_create_collection("ielts_rag")
-        self.embedder = SentenceTransformer("BAAI/bge-small-en")
+        try:
+            self.collection = self.client.get_collection("ielts_rag")
+        except Exception:
+            # HNSW metadata is only applied at creation
+            self.collection = self.client.create_collection(
+                "ielts_rag",
+                metadata=HNSW_PARAMS,
+            )
+            return
+
+        self._sync_hnsw_params()
+
+    def _sync_hnsw_params(self):
+        live = _live_hnsw_params(self.collection)
+
+        want_ef = HNSW_PARAMS["hnsw:search_ef"]
+        if live.get("hnsw:search_ef") != want_ef:
+            try:
+                self.collection.modify(configuration={"hnsw": {"ef_search": want_ef}})
+                live["hnsw:search_ef"] = want_ef
+            except Exception as e:
+                # Chroma < 1.0: no configuration argument, search_ef is creation-time only
+                print(f"⚠️ RAG_HNSW_EF_SEARCH={want_ef} not applied to ./vectorstore ({e})")
+
+        stale = {
+            k: (live[k], v) for k, v in HNSW_PARAMS.items()
+            if k in live and live[k] != v
+        }
+        if stale:
+            diff = ", ".join(f"{k} {old} → {new}" for k, (old, new) in stale.items())
+            print(f"⚠️ ./vectorstore HNSW params differ from the configured ones ({diff}); "
+                  "rebuild with scripts/index_rubrics.py to apply them")
+
+    def _reopen_after_fork(self):
+        # Chroma caches one client system per path → the child would get
+        # the parent's (dead threads, shared SQLite handles) back
+        shared = getattr(getattr(chromadb.api, "client", None), "SharedSystemClient", None)
+        if shared is not None:
+            shared.clear_system_cache()
+
+        self._open_collection()
 
     def embed(self, text: str):
         """Convert text → vector embedding."""
@@ -31,6 +129,14 @@ class RAGManager:
             metadatas=[metadata],  # metadata phải là str/int/float/bool/None, không được list
         )
 
+        if self.quantized is not None:
+            self.quantized.add(doc_id, embedding)
+
+    def save(self):
+        """Persist side stores (Chroma persists itself)."""
+        if self.quantized is not None:
+            self.quantized.save(EMBEDDING_STORE_PATH)
+
     def retrieve(self, query: str, top_k: int = 6, where: dict | None = None):
         """
         Query Chroma, có hỗ trợ filter metadata (where).
@@ -41,7 +147,7 @@ class RAGManager:
         }
 
         if where:
-            query_args["where"] = where
+            query_args["where"] = _chroma_where(where)
 
         results = self.collection.query(**query_args)
 
@@ -51,3 +157,109 @@ class RAGManager:
             "metadatas": results["metadatas"][0],
             "distances": results["distances"][0],
         }
+
+    def task_values(self) -> list:
+        """Distinct "task" metadata values (e.g. task2_opinion), sorted."""
+        if self._task_values is None:
+            if self.topic_index is not None:
+                metas = self.topic_index.meta
+            else:
+                metas = self.collection.get(include=["metadatas"])["metadatas"]
+            self._task_values = sorted({m["task"] for m in metas if m and m.get("task")})
+        return self._task_values
+
+    def lexical_search(self, query: str, top_k: int = 20, where: dict | None = None):
+        """
+        BM25 over the topic index → [(doc_id, score)].
+        where: equality or {"$in": [...]} filter on "task" / "band" only.
+        """
+        if self.topic_index is None:
+            return []
+        return self.topic_index.search(query, top_k=top_k, where=where)
+
+    def retrieve_hybrid(
+        self,
+        query: str,
+        top_k: int = 6,
+        where: dict | None = None,
+        candidates: int = 50,
+        alpha: float = 0.5,
+    ):
+        """
+        Lexical pre-filter, then vector re-rank of the candidates only.
+        score = alpha * bm25 (max-normalized) + (1 - alpha) * cosine
+        Falls back to retrieve() when there is no topic index or no lexical hit.
+        """
+        hits = self.lexical_search(query, top_k=candidates, where=where)
+        if not hits:
+            return self.retrieve(query, top_k=top_k, where=where)
+
+        ids = [doc_id for doc_id, _ in hits]
+        quantized = self.quantized is not None and all(i in self.quantized for i in ids)
+
+        got = self.collection.get(
+            ids=ids,
+            include=["documents", "metadatas"] if quantized else ["embeddings", "documents", "metadatas"],
+        )
+        if not got["ids"]:
+            return self.retrieve(query, top_k=top_k, where=where)
+
+        bm25 = dict(hits)
+        lexical = np.array([bm25[i] for i in got["ids"]], dtype=np.float32)
+        lexical /= lexical.max() or 1.0
+
+        q = np.asarray(self.embed(query), dtype=np.float32)
+        if quantized:
+            cosine = self.quantized.similarity(q, got["ids"])
+        else:
+            vectors = np.asarray(got["embeddings"], dtype=np.float32)
+            cosine = vectors @ q / (
+                np.linalg.norm(vectors, axis=1) * np.linalg.norm(q) + 1e-9
+            )
+
+        scores = alpha * lexical + (1 - alpha) * cosine
+        order = np.argsort(-scores)[:top_k]
+
+        return {
+            "ids": [got["ids"][i] for i in order],
+            "documents": [got["documents"][i] for i in order],
+            "metadatas": [got["metadatas"][i] for i in order],
+            "distances": [float(1 - cosine[i]) for i in order],
+            "scores": [float(scores[i]) for i in order],
+        }
+
+
+# One at-fork hook per process, not per instance (a hook holds its
+# manager alive and runs again for every RAGManager ever created)
+_OPEN_MANAGERS = weakref.WeakSet()
+
+
+def _reopen_all_after_fork():
+    for manager in list(_OPEN_MANAGERS):
+        manager._reopen_after_fork()
+
+
+os.register_at_fork(after_in_child=_reopen_all_after_fork)
+
+
+def _chroma_where(where: dict) -> dict:
+    """Chroma takes one operator per where → several equality keys become $and."""
+    if len(where) <= 1 or any(k.startswith("$") for k in where):
+        return where
+    return {"$and": [{k: v} for k, v in where.items()]}
+
+
+def _live_hnsw_params(collection) -> dict:
+    """HNSW params of an existing collection, keyed like HNSW_PARAMS (only those found)."""
+    live = {
+        k: v for k, v in (collection.metadata or {}).items()
+        if k in HNSW_PARAMS
+    }
+
+    config = getattr(collection, "configuration", None) or {}
+    hnsw = config.get("hnsw") if isinstance(config, dict) else None
+    for key, name in HNSW_CONFIG_KEYS.items():
+        if hnsw and hnsw.get(key) is not None:
+            live.setdefault(name, hnsw[key])
+
+    return live
@@ -0,0 +1,174 @@
+"""
+Pre-fork serving mode: load models once, share them copy-on-write.
+
+    python -m app.serve --workers 4 --port 8000
+
+The parent imports app.main (Whisper, embedder, Chroma client, pipelines),
+freezes the GC so collections don't dirty the shared pages, binds one
+listening socket and forks the workers. Each worker runs its own uvicorn
+server on the inherited socket; the kernel balances accepts between them.
+Model weights stay in pages the workers only read, so resident memory
+grows with per-request state, not with model size x workers.
+
+Compare with `uvicorn app.main:app --workers N`, where every worker
+imports app.main and loads its own copy of every model.
+
+Notes:
+- Nothing may run inference in the parent before fork: OpenMP / torch
+  thread pools started pre-fork can deadlock the children.
+- Objects holding sockets, SQLite handles or threads reopen themselves
+  in the child (RAGManager registers an os.register_at_fork hook).
+- Workers that die are respawned; SIGTERM / SIGINT stop all of them.
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+
+
+def proc_memory_mb(pid: int) -> dict:
+    """RSS and PSS (shared pages split between sharers) from /proc."""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    out[key.lower()] = round(int(rest.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return out
+
+
+def report_memory(parent: int, children: dict):
+    rows = [("parent", parent)] + [(f"worker {i}", pid) for pid, i in children.items()]
+    total_rss = total_pss = 0.0
+
+    for name, pid in rows:
+        mem = proc_memory_mb(pid)
+        total_rss += mem.get("rss", 0.0)
+        total_pss += mem.get("pss", 0.0)
+        print(f"   {name:<10} pid={pid:<7} rss={mem.get('rss', '?')} MB  pss={mem.get('pss', '?')} MB")
+
+    # Sum of RSS counts shared pages once per process; PSS is the real total
+    print(f"   total rss={total_rss:.0f} MB  pss={total_pss:.0f} MB")
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    import uvicorn
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "2")))
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--memory-report", type=float, default=30.0,
+                        help="seconds after start to print RSS/PSS per process (0 = off)")
+    args = parser.parse_args()
+
+    # ===============================
+    # 1. Load every model once
+    # ===============================
+    t0 = time.perf_counter()
+    from app.main import app, transcriber
+    # Lazily loaded otherwise → every worker would load its own copy on
+    # its first request of that class
+    transcriber.preload()
+    print(f"✅ Models loaded in {time.perf_counter() - t0:.1f}s (pid {os.getpid()})")
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+
+    # Everything allocated so far is long-lived → keep the GC off those pages
+    gc.collect()
+    gc.freeze()
+
+    # ===============================
+    # 2. Fork workers
+    # ===============================
+    children = {}
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args.log_level)
+            finally:
+                # os._exit skips atexit → write buffered score rows first
+                try:
+                    from app.pipeline.score_store import flush_score_store
+                    flush_score_store()
+                finally:
+                    os._exit(0)
+        children[pid] = index
+        print(f"🚀 Worker {index} started (pid {pid})")
+
+    def stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for i in range(args.workers):
+        spawn(i)
+
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    # ===============================
+    # 3. Supervise
+    # ===============================
+    report_at = time.monotonic() + args.memory_report if args.memory_report else None
+
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+
+        if pid == 0:
+            if report_at and time.monotonic() >= report_at:
+                print("📊 Memory after warm-up:")
+                report_memory(os.getpid(), children)
+                report_at = None
+            time.sleep(0.5)
+            continue
+
+        index = children.pop(pid)
+        if not stopping:
+            print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, respawning")
+            spawn(index)
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+
+# =====================================================
+# SINGLE-FLIGHT (COLLAPSE CONCURRENT IDENTICAL CALLS)
+# =====================================================
+# The first caller for a key runs the work; callers arriving with the
+# same key while it is in flight wait for that run and get its result
+# (or its exception). Nothing is kept after the call finishes — caching
+# completed results is the response cache's job.
+#
+# - SingleFlight: blocking callers on threads (LLM calls in pipelines)
+# - AsyncSingleFlight: coroutines on the event loop (HTTP endpoints)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def do(self, key: str, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"in_flight": in_flight, "leaders": self.leaders, "shared": self.shared}
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: str, fn, *args, **kwargs):
+        """`fn(*args, **kwargs)` must return an awaitable."""
+        task = self._calls.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        # A disconnecting client cancels its own wait, not the shared run
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
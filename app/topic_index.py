@@ -0,0 +1,132 @@
+import re
+import json
+import math
+from collections import Counter
+from pathlib import Path
+
+
+# =====================================================
+# LEXICAL TOPIC INDEX (BM25)
+# =====================================================
+# Inverted index term → [(doc, bm25 weight)], built by
+# scripts/refactor_dataset.py and loaded by RAGManager for lexical
+# pre-filtering of band exemplars before any vector comparison.
+#
+# Weights are precomputed at build time, so a query is a sum over the
+# postings of its terms.
+
+TOKEN_RE = re.compile(r"[a-z]{3,}")
+
+STOPWORDS = frozenset("""
+the a an and or of to in for on with at by from about as is are was were be
+been being have has had this that these those it its they them their there
+than then which who whom what when where why how not but also can could
+should would will may might must more most some such many much very other
+into over under between both each any all your you our we his her she him
+do does did doing done people think agree extent discuss views give
+opinion own reasons include examples relevant knowledge experience write
+least words essay question
+""".split())
+
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class TopicIndexBuilder:
+    def __init__(self):
+        self.docs = []
+        self.meta = []
+        self.term_counts = []
+
+    def add(self, doc_id: str, terms, metadata: dict | None = None):
+        """terms: token list or {term: count}"""
+        counts = terms if isinstance(terms, dict) else Counter(terms)
+        self.docs.append(doc_id)
+        self.meta.append(metadata or {})
+        self.term_counts.append(dict(counts))
+
+    def build(self) -> "TopicIndex":
+        n = len(self.docs)
+        lengths = [sum(c.values()) for c in self.term_counts]
+        avgdl = (sum(lengths) / n) if n else 0.0
+
+        df = Counter()
+        for counts in self.term_counts:
+            df.update(counts.keys())
+
+        postings = {}
+        for d, counts in enumerate(self.term_counts):
+            norm = K1 * (1 - B + B * lengths[d] / avgdl) if avgdl else K1
+            for term, tf in counts.items():
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                weight = idf * tf * (K1 + 1) / (tf + norm)
+                postings.setdefault(term, []).append((d, round(weight, 4)))
+
+        return TopicIndex(self.docs, self.meta, postings)
+
+
+class TopicIndex:
+    def __init__(self, docs: list, meta: list, postings: dict):
+        self.docs = docs
+        self.meta = meta
+        self.postings = postings
+
+    def __len__(self):
+        return len(self.docs)
+
+    # --------------------------------------------------
+    # QUERY
+    # --------------------------------------------------
+    def search(self, query: str, top_k: int = 20, where: dict | None = None) -> list:
+        """
+        Returns [(doc_id, score)] best first.
+        where: filter on stored metadata, Chroma-style: equality
+        {"task": "task2_opinion"} or membership {"task": {"$in": [...]}}
+        """
+        scores = {}
+        for term in set(tokenize(query)):
+            for d, w in self.postings.get(term, ()):
+                scores[d] = scores.get(d, 0.0) + w
+
+        if where:
+            scores = {
+                d: s for d, s in scores.items()
+                if all(_matches(self.meta[d].get(k), v) for k, v in where.items())
+            }
+
+        best = sorted(scores.items(), key=lambda kv: -kv[1])[:top_k]
+        return [(self.docs[d], s) for d, s in best]
+
+    # --------------------------------------------------
+    # PERSISTENCE
+    # --------------------------------------------------
+    def save(self, path: str | Path):
+        path = Path(path)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps({
+            "k1": K1,
+            "b": B,
+            "docs": self.docs,
+            "meta": self.meta,
+            "postings": self.postings,
+        }, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TopicIndex":
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        postings = {
+            term: [tuple(p) for p in plist]
+            for term, plist in data["postings"].items()
+        }
+        return cls(data["docs"], data["meta"], postings)
+
+
+def _matches(value, condition) -> bool:
+    if isinstance(condition, dict):
+        return value in condition.get("$in", ())
+    return value == condition
@@ -0,0 +1,613 @@
+import os
+import time
+import shutil
+import struct
+import uuid
+import hashlib
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+# =====================================================
+# STREAMING UPLOADS WITH EARLY LIMITS
+# =====================================================
+# Upload endpoints parse their multipart body themselves (read_form) from
+# request.stream(), so each file part is written once, straight into the
+# upload store, hashed on the way, and rejected with 413 as soon as a
+# limit is crossed, before the rest of the body is read:
+#   - whole request: Content-Length / received bytes (BodySizeLimitMiddleware)
+#   - per file field: MAX_AUDIO_BYTES, MAX_CHART_BYTES
+#   - per text field: MAX_FORM_FIELD_BYTES
+#   - audio duration: MAX_AUDIO_SECONDS, from the WAV header (declared
+#     length, or byte rate x bytes received for streamed WAVs)
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(40 * 1024 * 1024)))
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(30 * 1024 * 1024)))
+MAX_CHART_BYTES = int(os.getenv("MAX_CHART_BYTES", str(8 * 1024 * 1024)))
+MAX_AUDIO_SECONDS = float(os.getenv("MAX_AUDIO_SECONDS", "600"))
+MAX_FORM_FIELD_BYTES = int(os.getenv("MAX_FORM_FIELD_BYTES", str(256 * 1024)))
+
+# WAV "fmt " + "data" headers are in the first few hundred bytes
+WAV_HEADER_SCAN = 64 * 1024
+
+
+def too_large(detail: str):
+    # Connection: close → the server drops the unread rest of the body
+    return HTTPException(status_code=413, detail=detail, headers={"Connection": "close"})
+
+
+def wav_info(header: bytes) -> dict | None:
+    """
+    {"byte_rate", "data_offset", "data_bytes" (None if unknown)} for a
+    RIFF/WAVE header, None if `header` is not (yet) a parseable WAV.
+    """
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    pos = 12
+    byte_rate = None
+    while pos + 8 <= len(header):
+        chunk_id = header[pos:pos + 4]
+        (size,) = struct.unpack("<I", header[pos + 4:pos + 8])
+
+        if chunk_id == b"fmt " and pos + 16 <= len(header):
+            (byte_rate,) = struct.unpack("<I", header[pos + 16:pos + 20])
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            return {
+                "byte_rate": byte_rate,
+                "data_offset": pos + 8,
+                # Streamed WAVs leave the size at 0 / 0xFFFFFFFF
+                "data_bytes": size if 0 < size < 0xFFFFFFFF else None,
+            }
+
+        pos += 8 + size + (size & 1)
+
+    return None
+
+
+class UploadSink:
+    """
+    Writes one upload into the binary file object `dest` chunk by chunk,
+    hashing it and enforcing the size / WAV duration limits on every chunk.
+    finish() → {"size", "sha256", "duration"} (duration only for WAV audio).
+    """
+
+    def __init__(self, dest, max_bytes: int, max_seconds: float | None = None,
+                 name: str = "upload"):
+        self.dest = dest
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.name = name
+
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._wav = None
+        self._checked_header = max_seconds is None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise too_large(f"{self.name} exceeds {self.max_bytes} bytes")
+
+        if not self._checked_header:
+            self._head += chunk[:WAV_HEADER_SCAN - len(self._head)]
+            self._wav = wav_info(self._head)
+            if self._wav or len(self._head) >= WAV_HEADER_SCAN:
+                self._checked_header = True
+                if self._wav and self._wav["data_bytes"] is not None:
+                    _check_duration(self._wav["data_bytes"] / self._wav["byte_rate"], self.max_seconds)
+
+        # Streamed WAV without a declared length → limit by bytes received
+        wav = self._wav
+        if wav and wav["data_bytes"] is None:
+            _check_duration((self.size - wav["data_offset"]) / wav["byte_rate"], self.max_seconds)
+
+        self._hash.update(chunk)
+        self.dest.write(chunk)
+
+    def finish(self) -> dict:
+        self.dest.flush()
+
+        duration = None
+        wav = self._wav
+        if wav:
+            data = wav["data_bytes"] if wav["data_bytes"] is not None else self.size - wav["data_offset"]
+            duration = round(data / wav["byte_rate"], 2)
+
+        return {"size": self.size, "sha256": self._hash.hexdigest(), "duration": duration}
+
+
+def _check_duration(seconds: float, max_seconds: float):
+    if seconds > max_seconds:
+        raise too_large(f"Audio longer than {max_seconds:.0f}s ({seconds:.0f}s)")
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject oversized requests before the multipart parser spools them:
+    - Content-Length above the limit → 413 without reading the body
+    - chunked bodies are counted as they arrive and cut off at the limit
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("POST", "PUT", "PATCH"):
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await _reject(send, self.max_bytes)
+
+        received = 0
+        started = False
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal started
+            # The app's answer to a cut-off body (FastAPI: 400 "error parsing
+            # the body") is replaced by the 413 below
+            if exceeded:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except Exception:
+            if not exceeded:
+                raise
+
+        if exceeded and not started:
+            await _reject(send, self.max_bytes)
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _reject(send, max_bytes: int):
+    body = f'{{"detail":"Request body exceeds {max_bytes} bytes"}}'.encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# =====================================================
+# UPLOAD STORE (SCOPED, DEDUPLICATED, SPOOLED)
+# =====================================================
+# Every upload lives in a SpooledTemporaryFile: in memory up to
+# UPLOAD_SPOOL_BYTES, rolled over to an anonymous file in UPLOAD_DIR above
+# that, so small charts never touch the disk or the page cache.
+# Identical uploads (same sha256) share one entry with a reference count;
+# the last release() closes it and removes any on-disk copy.
+#
+# - request scope: `async with uploads.form(request, files) as (fields, uploads)`
+# - job scope: persist() writes a job-owned file (its path goes in the
+#   job payload, so any process can run the job), discard() in the job
+#   cleanup removes it
+# - janitor thread: drops unreferenced entries idle longer than
+#   UPLOAD_TTL_S and stale files in UPLOAD_DIR, sparing files of live
+#   processes (named "<sha256>.<pid><suffix>") and files a queued job
+#   still references
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "data/uploads")
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_TTL_S = float(os.getenv("UPLOAD_TTL_S", str(6 * 3600)))
+UPLOAD_JANITOR_S = float(os.getenv("UPLOAD_JANITOR_S", "300"))
+
+
+class StoredUpload:
+    def __init__(self, file, sha256: str, size: int, suffix: str = "",
+                 duration: float | None = None, directory: str = UPLOAD_DIR):
+        self.sha256 = sha256
+        self.size = size
+        self.suffix = suffix
+        self.duration = duration
+        self.refs = 1
+        self.last_used = time.monotonic()
+
+        self._file = file
+        self._path = None
+        self._dir = directory
+        self._lock = threading.Lock()
+
+    @property
+    def in_memory(self) -> bool:
+        return self._file is not None and not getattr(self._file, "_rolled", True)
+
+    def read(self) -> bytes:
+        with self._lock:
+            self.last_used = time.monotonic()
+            self._file.seek(0)
+            return self._file.read()
+
+    def path(self) -> str:
+        """
+        Named file for consumers that need a path (Whisper / ffmpeg).
+        Written once per content hash and process, removed on the last
+        release(). Blocking copy → call it from an executor.
+        """
+        with self._lock:
+            self.last_used = time.monotonic()
+            if self._path is None:
+                path = os.path.join(self._dir, f"{self.sha256}.{os.getpid()}{self.suffix}")
+                self._copy_to(path)
+                self._path = path
+            return self._path
+
+    def copy_to(self, path: str):
+        with self._lock:
+            self.last_used = time.monotonic()
+            self._copy_to(path)
+
+    def _copy_to(self, path: str):
+        tmp = f"{path}.part"
+        self._file.seek(0)
+        with open(tmp, "wb") as out:
+            shutil.copyfileobj(self._file, out, UPLOAD_CHUNK_BYTES)
+        os.replace(tmp, path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._path:
+                try:
+                    os.remove(self._path)
+                except FileNotFoundError:
+                    pass
+                self._path = None
+
+
+class UploadStore:
+    def __init__(self, directory: str = UPLOAD_DIR, spool_bytes: int = UPLOAD_SPOOL_BYTES,
+                 ttl: float = UPLOAD_TTL_S):
+        self.dir = directory
+        self.spool_bytes = spool_bytes
+        self.ttl = ttl
+        os.makedirs(self.dir, exist_ok=True)
+
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._janitor = None
+
+        self.dedup_hits = 0
+        self.expired = 0
+
+    # --------------------------------------------------
+    # ACQUIRE / RELEASE
+    # --------------------------------------------------
+    def new_spool(self):
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_bytes, dir=self.dir)
+
+    def adopt(self, tmp, info: dict, suffix: str = "") -> StoredUpload:
+        """Register a spool filled by an UploadSink; the caller owns one reference."""
+        with self._lock:
+            entry = self._entries.get(info["sha256"])
+            if entry is not None:
+                entry.refs += 1
+                entry.last_used = time.monotonic()
+                self.dedup_hits += 1
+            else:
+                entry = StoredUpload(tmp, info["sha256"], info["size"], suffix,
+                                     info["duration"], directory=self.dir)
+                self._entries[entry.sha256] = entry
+
+        if entry._file is not tmp:
+            tmp.close()
+        return entry
+
+    def persist(self, entry: StoredUpload) -> str:
+        """
+        Job-owned copy of `entry`: outlives this process and the request's
+        reference, removed by discard(). Blocking copy → call it from an executor.
+        """
+        path = os.path.join(self.dir, f"job-{uuid.uuid4().hex}{entry.suffix}")
+        entry.copy_to(path)
+        return path
+
+    def discard(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def release(self, entry: StoredUpload | str):
+        sha256 = entry if isinstance(entry, str) else entry.sha256
+        with self._lock:
+            entry = self._entries.get(sha256)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self._entries[sha256]
+        entry.close()
+
+    @asynccontextmanager
+    async def form(self, request: Request, files: dict, max_field_bytes: int = MAX_FORM_FIELD_BYTES):
+        """
+        Request-scoped form: `async with uploads.form(request, files) as (fields, uploads)`.
+        See read_form; every upload is released on exit.
+        """
+        fields, entries = await read_form(request, self, files, max_field_bytes)
+        try:
+            yield fields, entries
+        finally:
+            for entry in entries.values():
+                self.release(entry)
+
+    # --------------------------------------------------
+    # JANITOR
+    # --------------------------------------------------
+    def sweep(self, keep=None):
+        """keep: optional () → paths still needed (files of queued jobs)."""
+        now = time.monotonic()
+
+        # Referenced entries are in use (or owned by a running request) → never expired
+        with self._lock:
+            stale = [
+                e for e in self._entries.values()
+                if e.refs <= 0 and now - e.last_used > self.ttl
+            ]
+            for e in stale:
+                del self._entries[e.sha256]
+            live = {os.path.abspath(e._path) for e in self._entries.values() if e._path}
+
+        for e in stale:
+            print(f"⚠️ Upload {e.sha256[:12]} idle for {now - e.last_used:.0f}s, removing")
+            e.close()
+        self.expired += len(stale)
+
+        if keep:
+            live |= {os.path.abspath(p) for p in keep()}
+
+        # Files left behind by crashed processes
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.dir):
+            path = os.path.abspath(os.path.join(self.dir, name))
+            owner = _owner_pid(name)
+            if path in live or (owner is not None and _pid_alive(owner)):
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def start_janitor(self, interval: float = UPLOAD_JANITOR_S, keep=None):
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep(keep)
+                except Exception as e:
+                    print(f"⚠️ Upload janitor failed: {e}")
+
+        self._stop.clear()
+        self._janitor = threading.Thread(target=loop, name="upload-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self):
+        self._stop.set()
+
+    # --------------------------------------------------
+    # METRICS
+    # --------------------------------------------------
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+
+        return {
+            "entries": len(entries),
+            "refs": sum(e.refs for e in entries),
+            "bytes": sum(e.size for e in entries),
+            "in_memory": sum(1 for e in entries if e.in_memory),
+            "on_disk": sum(1 for e in entries if e._path),
+            "dedup_hits": self.dedup_hits,
+            "expired": self.expired,
+        }
+
+
+def _owner_pid(name: str) -> int | None:
+    """pid in "<sha256>.<pid><suffix>[.part]" names written by StoredUpload.path()."""
+    parts = name.split(".")
+    if len(parts) > 1 and len(parts[0]) == 64 and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# =====================================================
+# STREAMING MULTIPART FORMS (LIMITS WHILE PARSING)
+# =====================================================
+async def read_form(request: Request, store: UploadStore, files: dict,
+                    max_field_bytes: int = MAX_FORM_FIELD_BYTES) -> tuple:
+    """
+    Parse the request body as it arrives.
+
+    files: field name → {"max_bytes", "max_seconds"?, "suffix"?}; a file
+    part with another name is a 422. suffix None → the filename's extension.
+
+    Returns (fields, uploads): text fields as str, uploads as StoredUpload
+    (the caller owns one reference each). A form without a file part may
+    also be sent url-encoded.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+
+    if content_type == b"application/x-www-form-urlencoded":
+        form = await request.form()
+        return {k: v for k, v in form.items() if isinstance(v, str)}, {}
+
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=415, detail="Expected multipart/form-data")
+
+    parser = _FormParser(store, files, max_field_bytes)
+    multipart = MultipartParser(params[b"boundary"], parser.callbacks())
+    try:
+        async for chunk in request.stream():
+            multipart.write(chunk)
+            await parser.drain()
+        multipart.finalize()
+        await parser.drain()
+    except BaseException:
+        parser.abort()
+        raise
+
+    return parser.fields, parser.uploads
+
+
+class _FormParser:
+    """
+    python-multipart callbacks collect headers and queue part events;
+    drain() applies them between chunks (disk writes → threadpool).
+    """
+
+    def __init__(self, store: UploadStore, files: dict, max_field_bytes: int):
+        self.store = store
+        self.files = files
+        self.max_field_bytes = max_field_bytes
+
+        self.fields = {}
+        self.uploads = {}
+
+        self._events = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._part = None
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._headers.clear,
+            "on_header_field": lambda d, s, e: self._header(field=d[s:e]),
+            "on_header_value": lambda d, s, e: self._header(value=d[s:e]),
+            "on_header_end": lambda: self._header(end=True),
+            "on_headers_finished": lambda: self._events.append(("headers", dict(self._headers))),
+            "on_part_data": lambda d, s, e: self._events.append(("data", bytes(d[s:e]))),
+            "on_part_end": lambda: self._events.append(("end", None)),
+        }
+
+    def _header(self, field: bytes = b"", value: bytes = b"", end: bool = False):
+        self._header_field += field
+        self._header_value += value
+        if end:
+            self._headers[self._header_field.lower()] = self._header_value
+            self._header_field = self._header_value = b""
+
+    async def drain(self):
+        events, self._events = self._events, []
+        for kind, data in events:
+            if kind == "headers":
+                self._start_part(data)
+            elif kind == "data":
+                await self._write(data)
+            elif kind == "end":
+                await self._end_part()
+
+    def _start_part(self, headers: dict):
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        filename = options.get(b"filename")
+
+        if filename is None:
+            self._part = {"name": name, "data": bytearray()}
+            return
+
+        spec = self.files.get(name)
+        if spec is None:
+            raise HTTPException(status_code=422, detail=f"Unexpected file field: {name}")
+        if name in self.uploads:
+            raise HTTPException(status_code=422, detail=f"Duplicate file field: {name}")
+
+        filename = filename.decode("utf-8", errors="replace")
+        suffix = spec.get("suffix")
+        if suffix is None:
+            suffix = os.path.splitext(filename)[1]
+
+        tmp = self.store.new_spool()
+        self._part = {
+            "name": name,
+            "filename": filename,
+            "suffix": suffix,
+            "tmp": tmp,
+            "sink": UploadSink(tmp, spec["max_bytes"], spec.get("max_seconds"), name=filename or name),
+        }
+
+    async def _write(self, data: bytes):
+        part = self._part
+        if "sink" not in part:
+            part["data"] += data
+            if len(part["data"]) > self.max_field_bytes:
+                raise too_large(f"Field {part['name']} exceeds {self.max_field_bytes} bytes")
+        elif getattr(part["tmp"], "_rolled", False):
+            await run_in_threadpool(part["sink"].write, data)
+        else:
+            part["sink"].write(data)
+
+    async def _end_part(self):
+        part, self._part = self._part, None
+        if "sink" not in part:
+            self.fields[part["name"]] = part["data"].decode("utf-8", errors="replace")
+            return
+
+        # Browsers send an empty, unnamed file part for an empty file input
+        if part["sink"].size == 0 and not part["filename"]:
+            part["tmp"].close()
+            return
+
+        info = await run_in_threadpool(part["sink"].finish)
+        self.uploads[part["name"]] = self.store.adopt(part["tmp"], info, part["suffix"])
+
+    def abort(self):
+        if self._part and "tmp" in self._part:
+            self._part["tmp"].close()
+        self._part = None
+        for entry in self.uploads.values():
+            self.store.release(entry)
+        self.uploads = {}
@@ -1,32 +1,44 @@
 import base64
 import requests
+from contextlib import nullcontext
+
+from app.ollama_config import OLLAMA_URL, ollama_request_fields
+from app.model_scheduler import get_scheduler
 
 class VisionClient:
-    def __init__(self, model="qwen3-vl:8b"):
-        self.url = "http://localhost:11434/api/generate"
+    def __init__(self, model="qwen3-vl:8b", **options):
+        self.url = f"{OLLAMA_URL}/api/generate"
         self.model = model
-
-    def encode_image(self, image_path: str) -> str:
-        """Convert image → base64 string"""
-        with open(image_path, "rb") as f:
+        self.options = options
+        self.scheduler = get_scheduler()
+
+    def encode_image(self, image: bytes | str) -> str:
+        """Convert image (raw bytes, or a path) → base64 string"""
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return base64.b64encode(image).decode()
+        with open(image, "rb") as f:
             return base64.b64encode(f.read()).decode()
 
-    def describe_chart(self, image_path: str):
+    def describe_chart(self, image: bytes | str, phase: str = "phase0_chart"):
         """Send base64-encoded image to Ollama Vision."""
-        img_b64 = self.encode_image(image_path)
+        img_b64 = self.encode_image(image)
 
         payload = {
             "model": self.model,
             "prompt": "Describe this chart in JSON with keys: title, chartType, keyTrends, values.",
             "images": [img_b64],
-            "stream": False
+            "stream": False,
+            **ollama_request_fields(phase, **self.options),
         }
 
         print("\n===== DEBUG: Sending to Ollama =====")
         print(f"POST {self.url}")
         print(f"Payload size: {len(img_b64)} base64 chars")
 
-        res = requests.post(self.url, json=payload)
+        slot = self.scheduler.use(self.model) if self.scheduler else nullcontext()
+
+        with slot:
+            res = requests.post(self.url, json=payload)
 
         print("\n===== DEBUG: Raw response =====")
         print(res.text)
@@ -1,12 +1,121 @@
-import whisper
+import os
+import threading
+
+
+# =====================================================
+# TRANSCRIPTION BACKENDS
+# =====================================================
+# TRANSCRIBE_BACKEND     openai-whisper | faster-whisper
+# WHISPER_MODEL          model for "exam" requests (default medium)
+# WHISPER_MODEL_PRACTICE model for "practice" requests (default small)
+# WHISPER_BEAM_SIZE      beam width (unset → backend default)
+# WHISPER_COMPUTE_TYPE   faster-whisper only: int8 | int8_float32 | float32
+# WHISPER_CPU_THREADS    faster-whisper only (0 → CTranslate2 default)
+
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "openai-whisper")
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+
+MODEL_BY_CLASS = {
+    "exam": os.getenv("WHISPER_MODEL", "medium"),
+    "practice": os.getenv("WHISPER_MODEL_PRACTICE", "small"),
+}
+SPEAKING_MODES = tuple(MODEL_BY_CLASS)
+
+_beam = os.getenv("WHISPER_BEAM_SIZE")
+DEFAULT_BEAM_SIZE = int(_beam) if _beam else None
+
+
+class OpenAIWhisperBackend:
+    """openai-whisper, fp32 PyTorch."""
+    name = "openai-whisper"
+
+    def __init__(self, model_name: str):
+        import whisper
+
+        self.model = whisper.load_model(model_name)
+
+    def transcribe(self, file_path: str, beam_size: int | None = None) -> str:
+        options = {"beam_size": beam_size} if beam_size else {}
+        result = self.model.transcribe(file_path, **options)
+        return result.get("text", "").strip()
+
+
+class FasterWhisperBackend:
+    """faster-whisper (CTranslate2), int8 on CPU by default."""
+    name = "faster-whisper"
+
+    def __init__(
+        self,
+        model_name: str,
+        compute_type: str = WHISPER_COMPUTE_TYPE,
+        cpu_threads: int = WHISPER_CPU_THREADS,
+    ):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            model_name,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+        )
+
+    def transcribe(self, file_path: str, beam_size: int | None = None) -> str:
+        options = {"beam_size": beam_size} if beam_size else {}
+        segments, _ = self.model.transcribe(file_path, **options)
+        # segments is lazy: decoding happens while iterating
+        return " ".join(s.text.strip() for s in segments).strip()
+
+
+BACKENDS = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def load_backend(backend: str, model_name: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown TRANSCRIBE_BACKEND: {backend} (expected one of {list(BACKENDS)})")
+    return BACKENDS[backend](model_name)
+
 
 class Transcriber:
-    def __init__(self, model_name="medium"):
+    def __init__(self, model_name: str | None = None, backend: str | None = None):
         """
         model_name: tiny, base, small, medium, large
+                    (default: the "exam" model, loaded up front)
+        Other request classes load their model on first use.
         """
-        self.model = whisper.load_model(model_name)
+        self.backend = backend or TRANSCRIBE_BACKEND
+        self.model_name = model_name or MODEL_BY_CLASS["exam"]
+        self.models_by_class = {**MODEL_BY_CLASS, "exam": self.model_name}
 
-    def transcribe(self, file_path: str) -> str:
-        result = self.model.transcribe(file_path)
-        return result.get("text", "").strip()
+        self._lock = threading.Lock()
+        self._models = {self.model_name: load_backend(self.backend, self.model_name)}
+
+    def transcribe(
+        self,
+        file_path: str,
+        request_class: str = "exam",
+        beam_size: int | None = DEFAULT_BEAM_SIZE,
+    ) -> str:
+        """request_class: exam | practice"""
+        model_name = self.models_by_class.get(request_class)
+        if model_name is None:
+            raise ValueError(f"Unknown request class: {request_class} (expected one of {SPEAKING_MODES})")
+        return self._model(model_name).transcribe(file_path, beam_size=beam_size)
+
+    def preload(self):
+        """Load the model of every request class now (app/serve.py: before fork)."""
+        for model_name in dict.fromkeys(self.models_by_class.values()):
+            self._model(model_name)
+
+    def _model(self, model_name: str):
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if model_name not in self._models:
+                self._models[model_name] = load_backend(self.backend, model_name)
+            return self._models[model_name]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for a running API worker.
+
+Sends one request alone, then N requests at once, and compares the wall
+time. Every request carries a unique essay (index appended), so the
+response cache and single-flight cannot collapse them into one.
+
+Expected wall / single ratio on a single uvicorn worker:
+- metrics: ≈1 (pure event-loop latency); more → the loop is blocked
+- writing / speaking on Ollama: ≈N / min(N, max_parallel). The Ollama
+  scheduler admits max_parallel requests at a time (OLLAMA_NUM_PARALLEL,
+  default 1 → ≈N, serialised by the backend, not by the server); raise
+  OLLAMA_NUM_PARALLEL on both the Ollama server and the API to overlap
+- writing on NVIDIA: ≈1, bounded by the remote API
+
+The scheduler setting is read from /metrics/scheduler and printed.
+
+Start one worker first, e.g.:
+  uvicorn app.main:app --workers 1 --port 8000
+
+Usage:
+  python scripts/bench_concurrency.py --url http://127.0.0.1:8000 -n 8
+  python scripts/bench_concurrency.py --endpoint speaking --audio sample.wav -n 4
+  python scripts/bench_concurrency.py --endpoint metrics -n 32  # event-loop latency only
+"""
+
+import sys
+import time
+import argparse
+import itertools
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+QUESTION = (
+    "Some people believe that university education should be free for everyone. "
+    "To what extent do you agree or disagree?"
+)
+ANSWER = (
+    "Many people argue that higher education should be free. I partly agree with this view.\n\n"
+    "On the one hand, free tuition gives talented students from poor families a fair chance. "
+    "For example, in Germany university is free and participation is high.\n\n"
+    "On the other hand, the cost must be paid by taxpayers, and some students may not value "
+    "a free degree. Governments also need money for schools and hospitals.\n\n"
+    "In conclusion, I believe tuition should be free for low-income students, while others "
+    "should pay a reasonable fee."
+)
+
+
+def make_request(args):
+    # Unique per request and per run: identical essays would be served
+    # from the response cache / one in-flight call
+    run = int(time.time())
+    counter = itertools.count()
+
+    def tag():
+        return f"(bench {run}-{next(counter)})"
+
+    if args.endpoint == "writing":
+        return lambda: requests.post(
+            f"{args.url}/writing/score",
+            data={"question": QUESTION, "answer": f"{ANSWER}\n\n{tag()}"},
+            timeout=args.timeout,
+        )
+
+    if args.endpoint == "speaking":
+        if not args.audio:
+            raise SystemExit("--audio is required for the speaking endpoint")
+        audio = Path(args.audio).read_bytes()
+        return lambda: requests.post(
+            f"{args.url}/speaking/score",
+            data={"question": f"Describe your hometown. {tag()}", "mode": args.mode},
+            files={"file": (Path(args.audio).name, audio)},
+            timeout=args.timeout,
+        )
+
+    return lambda: requests.get(f"{args.url}/metrics/jobs", timeout=args.timeout)
+
+
+def scheduler_setting(args) -> str:
+    try:
+        stats = requests.get(f"{args.url}/metrics/scheduler", timeout=10).json()
+    except Exception as e:
+        return f"unknown ({e})"
+    if stats.get("enabled") is False:
+        return "residency scheduling off (OLLAMA_RESIDENCY_SCHEDULING=0)"
+    return f"max_parallel={stats.get('max_parallel')} (OLLAMA_NUM_PARALLEL)"
+
+
+def timed(call):
+    t0 = time.perf_counter()
+    r = call()
+    return time.perf_counter() - t0, r.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["writing", "speaking", "metrics"], default="writing")
+    parser.add_argument("--audio", help="audio file for --endpoint speaking")
+    parser.add_argument("--mode", default="practice", help="speaking request class")
+    parser.add_argument("-n", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--timeout", type=float, default=900)
+    args = parser.parse_args()
+
+    call = make_request(args)
+    print(f"Ollama scheduler: {scheduler_setting(args)}")
+
+    # Warm-up: model loads / first-call allocations are not what we measure
+    timed(call)
+
+    single, status = timed(call)
+    print(f"Single request: {single:.2f}s (HTTP {status})")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.n) as pool:
+        results = list(pool.map(lambda _: timed(call), range(args.n)))
+    wall = time.perf_counter() - t0
+
+    latencies = sorted(t for t, _ in results)
+    errors = sum(1 for _, s in results if s >= 400)
+
+    print(f"{args.n} concurrent: wall {wall:.2f}s  "
+          f"min {latencies[0]:.2f}s  max {latencies[-1]:.2f}s  errors {errors}")
+    print(f"Wall / single = {wall / single:.2f}  (≈1 → concurrent, ≈{args.n} → serialised)")
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
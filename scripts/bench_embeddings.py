@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Compare embedding backends: encode latency, peak RSS, torch import and
+vector compatibility with the sentence-transformers index.
+
+Each backend runs in its own subprocess so RSS and imported modules are
+measured in isolation. Vectors are compared by cosine against the
+sentence-transformers backend (the one the existing index was built with).
+
+Texts: [QUESTION] / [SUMMARY] sections under data/samples (what
+RAGManager embeds), or a built-in set if there are none.
+
+Usage:
+  python scripts/bench_embeddings.py
+  python scripts/bench_embeddings.py --backends sentence-transformers,onnx --onnx-files model.onnx,model_int8.onnx
+  python scripts/bench_embeddings.py --texts 500 --tol 0.995 --out emb.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+import numpy as np
+
+# ===============================
+# Add project root to sys.path
+# ===============================
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.pipeline.utils import extract_section
+
+SAMPLES_DIR = ROOT / "data" / "samples"
+REFERENCE = "sentence-transformers"
+
+FALLBACK_TEXTS = [
+    "Some people believe that university education should be free for everyone.",
+    "The bar chart compares the number of visitors to three museums in London.",
+    "Many cities struggle with traffic congestion. What are the causes and solutions?",
+    "The line graph shows changes in the proportion of renewable energy use.",
+    "Children today spend too much time on screens. To what extent do you agree?",
+    "The writer presents a clear position but some ideas lack development.",
+]
+
+
+def load_texts(limit: int) -> list:
+    texts = []
+    if SAMPLES_DIR.exists():
+        for path in sorted(SAMPLES_DIR.rglob("*.txt")):
+            doc = path.read_text(encoding="utf-8")
+            for name in ("QUESTION", "SUMMARY"):
+                section = extract_section(doc, name)
+                if section:
+                    texts.append(section)
+            if len(texts) >= limit:
+                break
+    return texts[:limit] or FALLBACK_TEXTS
+
+
+# =====================================================
+# WORKER (one backend per process)
+# =====================================================
+def worker(backend: str, onnx_file: str | None, texts_path: str, out_path: str, batch: int, repeat: int):
+    if onnx_file:
+        os.environ["EMBEDDING_ONNX_FILE"] = onnx_file
+
+    t0 = time.perf_counter()
+    from app.embeddings import get_embedder
+    embedder = get_embedder(backend)
+    load_s = time.perf_counter() - t0
+
+    texts = json.loads(Path(texts_path).read_text(encoding="utf-8"))
+
+    # Warm-up (first call allocates / JITs)
+    embedder.encode(texts[:1])
+
+    single = []
+    for _ in range(repeat):
+        for text in texts:
+            t = time.perf_counter()
+            embedder.encode([text])
+            single.append((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    vectors = np.concatenate([
+        embedder.encode(texts[i:i + batch]) for i in range(0, len(texts), batch)
+    ])
+    batch_s = time.perf_counter() - t
+
+    np.save(out_path, vectors.astype(np.float32))
+
+    single = np.array(single)
+    print(json.dumps({
+        "load_s": round(load_s, 2),
+        "p50_ms": round(float(np.percentile(single, 50)), 2),
+        "p95_ms": round(float(np.percentile(single, 95)), 2),
+        "batch_texts_per_s": round(len(texts) / batch_s, 1),
+        # Linux reports KiB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "torch_imported": "torch" in sys.modules,
+    }))
+
+
+# =====================================================
+# DRIVER
+# =====================================================
+def run(name, backend, onnx_file, texts_path, tmp, args):
+    out_path = os.path.join(tmp, f"{name.replace(' ', '_')}.npy")
+    cmd = [
+        sys.executable, __file__, "--worker", backend,
+        "--texts-file", texts_path, "--vectors-file", out_path,
+        "--batch", str(args.batch), "--repeat", str(args.repeat),
+    ]
+    if onnx_file:
+        cmd += ["--onnx-file", onnx_file]
+
+    proc = subprocess.run(cmd, capture_output=True, text=True, cwd=ROOT)
+    if proc.returncode != 0:
+        print(f"❌ {name} failed:\n{proc.stderr.strip()[-800:]}")
+        return None, None
+
+    stats = json.loads(proc.stdout.strip().splitlines()[-1])
+    return stats, np.load(out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", default="sentence-transformers,onnx")
+    parser.add_argument("--onnx-files", default="model.onnx,model_int8.onnx")
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--tol", type=float, default=0.99, help="minimum cosine vs the reference backend")
+    parser.add_argument("--out", help="write results as JSON")
+
+    # internal: subprocess mode
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--onnx-file", help=argparse.SUPPRESS)
+    parser.add_argument("--texts-file", help=argparse.SUPPRESS)
+    parser.add_argument("--vectors-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.onnx_file, args.texts_file, args.vectors_file, args.batch, args.repeat)
+        return
+
+    texts = load_texts(args.texts)
+    print(f"Texts: {len(texts)}  batch: {args.batch}  repeat: {args.repeat}\n")
+
+    runs = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        if backend == "onnx":
+            runs += [(f"onnx {f}", "onnx", f) for f in args.onnx_files.split(",") if f.strip()]
+        else:
+            runs.append((backend, backend, None))
+
+    results = {}
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        texts_path = os.path.join(tmp, "texts.json")
+        Path(texts_path).write_text(json.dumps(texts), encoding="utf-8")
+
+        for name, backend, onnx_file in runs:
+            stats, vecs = run(name, backend, onnx_file, texts_path, tmp, args)
+            if stats is not None:
+                results[name] = stats
+                vectors[name] = vecs
+
+    ref = vectors.get(REFERENCE)
+    for name, vecs in vectors.items():
+        if ref is None or name == REFERENCE:
+            continue
+        a = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        b = ref / np.linalg.norm(ref, axis=1, keepdims=True)
+        cos = (a * b).sum(axis=1)
+        results[name]["cosine_min"] = round(float(cos.min()), 5)
+        results[name]["cosine_mean"] = round(float(cos.mean()), 5)
+        results[name]["compatible"] = bool(cos.min() >= args.tol)
+
+    print(f"{'backend':<24} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'txt/s':>8} {'RSS MB':>8} {'torch':>6} {'cos min':>8}")
+    for name, r in results.items():
+        cos = f"{r['cosine_min']:.5f}" if "cosine_min" in r else "ref"
+        print(f"{name:<24} {r['load_s']:>7.2f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['batch_texts_per_s']:>8.1f} {r['peak_rss_mb']:>8.1f} {str(r['torch_imported']):>6} {cos:>8}")
+
+    incompatible = [n for n, r in results.items() if r.get("compatible") is False]
+    if incompatible:
+        print(f"\n⚠️ Below tolerance {args.tol}: {', '.join(incompatible)} (re-index before switching)")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nResults written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
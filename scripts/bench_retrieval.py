@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency of the retrieval index against exact search.
+
+Compares, on the same corpus and queries:
+  - exact float32 brute force (ground truth)
+  - Chroma HNSW for every (M, construction_ef, search_ef) combination
+  - QuantizedEmbeddingStore int8 / float16 exact search
+
+Corpus: embeddings of the ielts_rag collection in ./vectorstore, queries
+are the [QUESTION] sections of sampled documents embedded with
+the configured embedder (the RAGManager.embed path). --synthetic N replaces both with
+N clustered random vectors (to see how a grown corpus behaves).
+
+Usage:
+  python scripts/bench_retrieval.py
+  python scripts/bench_retrieval.py --m 8,16,32 --ef-search 10,50,100
+  python scripts/bench_retrieval.py --synthetic 50000 --queries 500 --out bench.json
+"""
+
+import sys
+import json
+import time
+import uuid
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# ===============================
+# Add project root to sys.path
+# ===============================
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+import chromadb
+
+from app.embeddings import get_embedder
+from app.quantized_store import QuantizedEmbeddingStore
+from app.pipeline.utils import extract_section
+
+
+def int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+# =====================================================
+# CORPUS + QUERIES
+# =====================================================
+def load_corpus(path: str, collection: str, n_queries: int, rng):
+    client = chromadb.PersistentClient(path=path)
+    col = client.get_collection(collection)
+    got = col.get(include=["embeddings", "documents"])
+
+    ids = list(got["ids"])
+    vectors = np.asarray(got["embeddings"], dtype=np.float32)
+    if not ids:
+        raise SystemExit(f"Collection '{collection}' in {path} is empty")
+
+    questions = [
+        extract_section(doc or "", "QUESTION") for doc in got["documents"]
+    ]
+    questions = [q for q in questions if q]
+    if not questions:
+        raise SystemExit("No [QUESTION] sections found; use --synthetic")
+
+    picked = rng.choice(len(questions), size=min(n_queries, len(questions)), replace=False)
+
+    queries = get_embedder().encode([questions[i] for i in picked])
+
+    space = (col.metadata or {}).get("hnsw:space", "l2")
+    return ids, vectors, queries, space
+
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, rng):
+    # Topic clusters, like samples sharing a question
+    centers = rng.normal(size=(max(n // 50, 1), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n)
+    vectors = centers[labels] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    picked = rng.choice(n, size=min(n_queries, n), replace=False)
+    queries = vectors[picked] + 0.1 * rng.normal(size=(len(picked), dim)).astype(np.float32)
+
+    ids = [f"doc_{i}" for i in range(n)]
+    return ids, vectors, queries, "l2"
+
+
+# =====================================================
+# METHODS
+# =====================================================
+def exact_search(vectors: np.ndarray, queries: np.ndarray, k: int, space: str):
+    if space == "l2":
+        # argmin |v - q|^2 = argmin |v|^2 - 2 v·q
+        scores = 2 * queries @ vectors.T - (vectors ** 2).sum(axis=1)[None, :]
+    else:
+        vn = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        scores = queries @ vn.T
+
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def timed(fn, queries):
+    out, lat = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        out.append(fn(q))
+        lat.append((time.perf_counter() - t0) * 1000)
+    return out, np.array(lat)
+
+
+def bench_hnsw(ids, vectors, queries, k, space, m, ef_c, ef_s, batch: int = 5000):
+    client = chromadb.EphemeralClient()
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    col = client.create_collection(name, metadata={
+        "hnsw:space": space,
+        "hnsw:M": m,
+        "hnsw:construction_ef": ef_c,
+        "hnsw:search_ef": ef_s,
+    })
+
+    t0 = time.perf_counter()
+    for start in range(0, len(ids), batch):
+        col.add(
+            ids=ids[start:start + batch],
+            embeddings=vectors[start:start + batch].tolist(),
+        )
+    build_s = time.perf_counter() - t0
+
+    position = {doc_id: i for i, doc_id in enumerate(ids)}
+    results, lat = timed(
+        lambda q: col.query(query_embeddings=[q.tolist()], n_results=k, include=[])["ids"][0],
+        queries,
+    )
+    client.delete_collection(name)
+
+    found = [set(position[i] for i in row) for row in results]
+    return found, lat, build_s
+
+
+def bench_quantized(ids, vectors, queries, k, dtype):
+    store = QuantizedEmbeddingStore(dtype)
+
+    t0 = time.perf_counter()
+    store.add_many(ids, vectors)
+    nbytes = store.nbytes
+    build_s = time.perf_counter() - t0
+
+    position = {doc_id: i for i, doc_id in enumerate(ids)}
+    results, lat = timed(lambda q: store.search(q, k), queries)
+
+    found = [set(position[doc_id] for doc_id, _ in row) for row in results]
+    return found, lat, build_s, nbytes
+
+
+def recall(found: list, truth: list, k: int) -> float:
+    return float(np.mean([len(f & t) / k for f, t in zip(found, truth)]))
+
+
+def row(name, found, truth, k, lat, build_s, nbytes=None):
+    return {
+        "method": name,
+        "recall": round(recall(found, truth, k), 4),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "build_s": round(build_s, 2),
+        "memory_mb": round(nbytes / 2**20, 2) if nbytes is not None else None,
+    }
+
+
+# =====================================================
+# MAIN
+# =====================================================
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--vectorstore", default=str(ROOT / "vectorstore"))
+    parser.add_argument("--collection", default="ielts_rag")
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of the collection")
+    parser.add_argument("--dim", type=int, default=384, help="synthetic vector size (bge-small = 384)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=6, help="top-k, as RAGManager.retrieve")
+    parser.add_argument("--m", type=int_list, default=[16])
+    parser.add_argument("--ef-construction", type=int_list, default=[100])
+    parser.add_argument("--ef-search", type=int_list, default=[10, 50, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+
+    if args.synthetic:
+        ids, vectors, queries, space = synthetic_corpus(args.synthetic, args.dim, args.queries, rng)
+    else:
+        ids, vectors, queries, space = load_corpus(args.vectorstore, args.collection, args.queries, rng)
+
+    k = min(args.k, len(ids))
+    print(f"Corpus: {len(ids)} x {vectors.shape[1]}  queries: {len(queries)}  k={k}  space={space}\n")
+
+    t0 = time.perf_counter()
+    truth = exact_search(vectors, queries, k, space)
+    exact_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    rows = [{
+        "method": "exact float32",
+        "recall": 1.0,
+        "p50_ms": round(exact_ms, 3),
+        "p95_ms": None,
+        "build_s": 0.0,
+        "memory_mb": round(vectors.nbytes / 2**20, 2),
+    }]
+
+    for m in args.m:
+        for ef_c in args.ef_construction:
+            for ef_s in args.ef_search:
+                found, lat, build_s = bench_hnsw(ids, vectors, queries, k, space, m, ef_c, ef_s)
+                rows.append(row(f"hnsw M={m} efC={ef_c} efS={ef_s}", found, truth, k, lat, build_s))
+
+    # The quantized store ranks by cosine; ground truth must match
+    cos_truth = truth if space == "cosine" else exact_search(vectors, queries, k, "cosine")
+    for dtype in ("float16", "int8"):
+        found, lat, build_s, nbytes = bench_quantized(ids, vectors, queries, k, dtype)
+        rows.append(row(f"quantized {dtype}", found, cos_truth, k, lat, build_s, nbytes))
+
+    print(f"{'method':<34} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'build s':>8} {'MB':>8}")
+    for r in rows:
+        p95 = "-" if r["p95_ms"] is None else f"{r['p95_ms']:.3f}"
+        mem = "-" if r["memory_mb"] is None else f"{r['memory_mb']:.2f}"
+        print(f"{r['method']:<34} {r['recall']:>7.4f} {r['p50_ms']:>8.3f} {p95:>8} {r['build_s']:>8.2f} {mem:>8}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({
+            "corpus": len(ids),
+            "dim": int(vectors.shape[1]),
+            "queries": len(queries),
+            "k": k,
+            "space": space,
+            "results": rows,
+        }, indent=2), encoding="utf-8")
+        print(f"\nResults written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Real-time factor of each transcription backend on a fixed audio set.
+
+RTF = processing time / audio duration (lower is better; < 1 is faster
+than real time). Every (backend, model, beam size) combination runs over
+the same .wav files. If a file has a reference transcript next to it
+(same name, .txt), the word error rate is reported as well.
+
+Usage:
+  python scripts/bench_transcribe.py --audio-dir data/bench_audio
+  python scripts/bench_transcribe.py --audio-dir data/bench_audio \\
+      --backends openai-whisper,faster-whisper --models small,medium --beam-sizes 1,5
+"""
+
+import re
+import sys
+import json
+import time
+import wave
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# ===============================
+# Add project root to sys.path
+# ===============================
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.whisper_transcriber import BACKENDS, load_backend
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def wav_duration(path: Path) -> float:
+    with wave.open(str(path), "rb") as w:
+        return w.getnframes() / float(w.getframerate())
+
+
+def word_errors(reference: str, hypothesis: str):
+    """(edit distance in words, reference length)"""
+    ref = WORD_RE.findall(reference.lower())
+    hyp = WORD_RE.findall(hypothesis.lower())
+
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+
+    return prev[-1], len(ref)
+
+
+def bench(backend: str, model: str, beam_size, files: list) -> dict:
+    t0 = time.perf_counter()
+    engine = load_backend(backend, model)
+    load_s = time.perf_counter() - t0
+
+    rtfs = []
+    total_audio = total_proc = 0.0
+    errors = words = 0
+
+    for path, duration, reference in files:
+        t = time.perf_counter()
+        text = engine.transcribe(str(path), beam_size=beam_size)
+        elapsed = time.perf_counter() - t
+
+        rtfs.append(elapsed / duration)
+        total_audio += duration
+        total_proc += elapsed
+
+        if reference is not None:
+            e, n = word_errors(reference, text)
+            errors += e
+            words += n
+
+    return {
+        "backend": backend,
+        "model": model,
+        "beam_size": beam_size,
+        "load_s": round(load_s, 2),
+        "rtf": round(total_proc / total_audio, 3),
+        "rtf_p50": round(float(np.percentile(rtfs, 50)), 3),
+        "rtf_p95": round(float(np.percentile(rtfs, 95)), 3),
+        "wer": round(errors / words, 4) if words else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--audio-dir", required=True, help="directory of .wav files (+ optional .txt references)")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--models", default="small,medium")
+    parser.add_argument("--beam-sizes", default="1,5", help="'0' = backend default")
+    parser.add_argument("--out", help="write results as JSON")
+    args = parser.parse_args()
+
+    files = []
+    for path in sorted(Path(args.audio_dir).glob("*.wav")):
+        ref_path = path.with_suffix(".txt")
+        reference = ref_path.read_text(encoding="utf-8") if ref_path.exists() else None
+        files.append((path, wav_duration(path), reference))
+
+    if not files:
+        raise SystemExit(f"No .wav files in {args.audio_dir}")
+
+    audio_s = sum(d for _, d, _ in files)
+    print(f"Audio: {len(files)} files, {audio_s:.1f}s total\n")
+
+    rows = []
+    for backend in args.backends.split(","):
+        for model in args.models.split(","):
+            for beam in args.beam_sizes.split(","):
+                beam_size = int(beam) or None
+                try:
+                    rows.append(bench(backend.strip(), model.strip(), beam_size, files))
+                except Exception as e:
+                    print(f"❌ {backend}/{model}/beam={beam}: {e}")
+                    continue
+
+                r = rows[-1]
+                wer = "-" if r["wer"] is None else f"{r['wer']:.3f}"
+                print(f"{r['backend']:<16} {r['model']:<8} beam={beam_size or 'default':<8} "
+                      f"load={r['load_s']:>6.1f}s  RTF={r['rtf']:.3f} "
+                      f"(p50 {r['rtf_p50']:.3f}, p95 {r['rtf_p95']:.3f})  WER={wer}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({
+            "files": len(files),
+            "audio_seconds": round(audio_s, 1),
+            "results": rows,
+        }, indent=2), encoding="utf-8")
+        print(f"\nResults written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
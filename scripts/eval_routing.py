@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of per-phase model routings: band agreement vs latency and tokens.
+
+Scores the same essays once per routing (sequentially, each routing with
+its own empty response cache) and reports, per routing:
+  - latency per essay (mean / p50 / p95)
+  - prompt and completion tokens per essay, per phase
+  - agreement with the baseline routing: overall exact / within 0.5,
+    mean absolute difference per criterion
+  - mean absolute error against the reference band, when the dataset has one
+
+The baseline is the current routing (app/llm_router.py + LLM_ROUTING_FILE).
+Each --routing file has the LLM_ROUTING_FILE shape and is merged over the
+built-in defaults, e.g. {"task2": {"phase1_parse_task2": {"backend": "ollama",
+"model": "llama3.2:3b"}}}.
+
+Dataset: --dataset JSONL with {"question", "answer", "band"?, "chart"?}
+(chart = image path, required for --task task1). Without --dataset the
+Task 2 samples in data/samples are used ([QUESTION] / [SAMPLE_ANSWER],
+band from the header).
+
+Usage:
+  python scripts/eval_routing.py --routing small-parse=routing_small.json --limit 20
+  python scripts/eval_routing.py --task task1 --dataset task1.jsonl --routing r1-all=r1.json
+  python scripts/eval_routing.py --mode fast --routing fast-8b=fast.json --out routing.json
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# ===============================
+# Add project root to sys.path
+# ===============================
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.llm_router import load_routing
+from app.llm_cache import ResponseCache
+from app.llm_metrics import PREFIX_CACHE
+from app.pipeline.utils import extract_section
+
+SAMPLES_DIR = ROOT / "data" / "samples"
+BAND_LABEL_RE = re.compile(r"^\s*Band\s*\d(?:\.\d)?\s*[:\-–]?\s*", flags=re.I)
+
+
+# =====================================================
+# DATASET
+# =====================================================
+def load_dataset(path: str | None, task: str, limit: int) -> list:
+    if path:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        if task != "task2":
+            raise SystemExit("--dataset is required for task1 (needs chart images)")
+        rows = list(_sample_rows())
+
+    if task == "task1":
+        rows = [r for r in rows if r.get("chart")]
+
+    rows = [r for r in rows if r.get("question") and r.get("answer")]
+    if not rows:
+        raise SystemExit("No usable essays in the dataset")
+    return rows[:limit] if limit else rows
+
+
+def _sample_rows():
+    for path in sorted(SAMPLES_DIR.rglob("*.txt")):
+        text = path.read_text(encoding="utf-8")
+        header, _, body = text.partition("\n")
+        try:
+            meta = json.loads(header)
+        except json.JSONDecodeError:
+            continue
+
+        if not str(meta.get("task", "")).startswith("task2"):
+            continue
+
+        yield {
+            "id": path.stem,
+            "question": extract_section(body, "QUESTION"),
+            "answer": BAND_LABEL_RE.sub("", extract_section(body, "SAMPLE_ANSWER"), count=1),
+            "band": meta.get("band"),
+        }
+
+
+# =====================================================
+# SCORING
+# =====================================================
+def build_pipeline(task: str, routing: dict, rag):
+    if task == "task1":
+        from app.pipeline.writing_task1 import WritingTask1Pipeline
+        pipeline = WritingTask1Pipeline(routing=routing)
+    else:
+        from app.pipeline.writing_task2 import WritingTask2Pipeline
+        pipeline = WritingTask2Pipeline(rag=rag, routing=routing)
+
+    # Own cache per routing → no routing is served another's responses
+    pipeline.llm.cache = ResponseCache()
+    return pipeline
+
+
+def token_totals() -> dict:
+    totals = {}
+    for row in PREFIX_CACHE.report():
+        phase = totals.setdefault(row["phase"], {"prompt": 0, "completion": 0})
+        phase["prompt"] += row["prompt_tokens"]
+        phase["completion"] += row["completion_tokens"]
+    return totals
+
+
+def token_delta(before: dict, after: dict) -> dict:
+    delta = {}
+    for phase, row in after.items():
+        prev = before.get(phase, {"prompt": 0, "completion": 0})
+        d = {k: row[k] - prev[k] for k in ("prompt", "completion")}
+        if d["prompt"] or d["completion"]:
+            delta[phase] = d
+    return delta
+
+
+def score_one(pipeline, task: str, mode: str, row: dict) -> dict:
+    kwargs = {"question": row["question"], "answer": row["answer"]}
+    if task == "task1":
+        kwargs["chart"] = Path(row["chart"]).read_bytes()
+
+    run = pipeline.score_fast if mode == "fast" else pipeline.score
+
+    before = token_totals()
+    t0 = time.perf_counter()
+    try:
+        result = run(**kwargs)
+        error = None
+    except Exception as e:
+        result, error = None, str(e)
+    latency = time.perf_counter() - t0
+
+    out = {"latency_s": latency, "tokens": token_delta(before, token_totals()), "error": error}
+    if result:
+        out["overall"] = result["overall"]["band"]
+        out["bands"] = {c: v["band"] for c, v in result["bands"].items()}
+    return out
+
+
+def evaluate(name: str, task: str, mode: str, routing: dict, rows: list, rag) -> list:
+    print(f"\n▶ {name}: {json.dumps(routing[task], sort_keys=True)}")
+    pipeline = build_pipeline(task, routing, rag)
+
+    results = []
+    for i, row in enumerate(rows, 1):
+        r = score_one(pipeline, task, mode, row)
+        results.append(r)
+        status = f"band {r['overall']}" if r["error"] is None else f"error: {r['error'][:80]}"
+        print(f"   [{i}/{len(rows)}] {r['latency_s']:.1f}s {status}")
+    return results
+
+
+# =====================================================
+# REPORT
+# =====================================================
+def summarize(results: list, baseline: list, rows: list) -> dict:
+    ok = [r for r in results if r["error"] is None]
+    latencies = np.array([r["latency_s"] for r in ok]) if ok else np.zeros(1)
+
+    phases = {}
+    for r in ok:
+        for phase, t in r["tokens"].items():
+            p = phases.setdefault(phase, {"prompt": 0, "completion": 0})
+            p["prompt"] += t["prompt"]
+            p["completion"] += t["completion"]
+
+    n = max(len(ok), 1)
+    summary = {
+        "essays": len(results),
+        "errors": len(results) - len(ok),
+        "latency_mean_s": round(float(latencies.mean()), 2),
+        "latency_p50_s": round(float(np.percentile(latencies, 50)), 2),
+        "latency_p95_s": round(float(np.percentile(latencies, 95)), 2),
+        "prompt_tokens_per_essay": round(sum(p["prompt"] for p in phases.values()) / n),
+        "completion_tokens_per_essay": round(sum(p["completion"] for p in phases.values()) / n),
+        "tokens_per_phase": {
+            phase: {k: round(v / n) for k, v in p.items()}
+            for phase, p in sorted(phases.items())
+        },
+    }
+
+    # Agreement with the baseline routing, on essays both scored
+    pairs = [
+        (r, b) for r, b in zip(results, baseline)
+        if r["error"] is None and b["error"] is None
+    ]
+    if pairs:
+        diff = np.array([abs(r["overall"] - b["overall"]) for r, b in pairs])
+        summary["vs_baseline"] = {
+            "overall_exact": round(float((diff == 0).mean()), 3),
+            "overall_within_0_5": round(float((diff <= 0.5).mean()), 3),
+            "overall_mad": round(float(diff.mean()), 3),
+            "criterion_mad": {
+                c: round(float(np.mean([abs(r["bands"][c] - b["bands"][c]) for r, b in pairs])), 3)
+                for c in pairs[0][0]["bands"]
+            },
+        }
+
+    # Against the dataset's reference band
+    refs = [
+        (r["overall"], float(row["band"])) for r, row in zip(results, rows)
+        if r["error"] is None and row.get("band") is not None
+    ]
+    if refs:
+        summary["vs_reference_mae"] = round(float(np.mean([abs(a - b) for a, b in refs])), 3)
+
+    return summary
+
+
+def print_table(report: dict):
+    print("\n" + "=" * 96)
+    print(f"{'routing':<18} {'lat mean':>9} {'p95':>7} {'prompt tok':>11} {'compl tok':>10} "
+          f"{'exact':>7} {'±0.5':>7} {'MAD':>6} {'ref MAE':>8}")
+    print("-" * 96)
+    for name, s in report.items():
+        vb = s.get("vs_baseline", {})
+        print(
+            f"{name:<18} {s['latency_mean_s']:>8.1f}s {s['latency_p95_s']:>6.1f}s "
+            f"{s['prompt_tokens_per_essay']:>11} {s['completion_tokens_per_essay']:>10} "
+            f"{vb.get('overall_exact', float('nan')):>7.2f} {vb.get('overall_within_0_5', float('nan')):>7.2f} "
+            f"{vb.get('overall_mad', float('nan')):>6.2f} {s.get('vs_reference_mae', float('nan')):>8.2f}"
+        )
+    print("=" * 96)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--task", choices=["task1", "task2"], default="task2")
+    parser.add_argument("--mode", choices=["fast", "full"], default="full")
+    parser.add_argument("--dataset", help="JSONL with question / answer / band? / chart?")
+    parser.add_argument("--routing", action="append", default=[], metavar="NAME=FILE",
+                        help="routing to compare against the current one (repeatable)")
+    parser.add_argument("--limit", type=int, default=20, help="essays to score (0 = all)")
+    parser.add_argument("--out", help="write per-essay results + summary as JSON")
+    args = parser.parse_args()
+
+    rows = load_dataset(args.dataset, args.task, args.limit)
+
+    routings = {"baseline": load_routing()}
+    for spec in args.routing:
+        name, _, path = spec.partition("=")
+        if not path:
+            raise SystemExit(f"--routing expects NAME=FILE, got: {spec}")
+        routings[name] = load_routing(path)
+
+    rag = None
+    if args.task == "task2":
+        from app.rag_manager import RAGManager
+        rag = RAGManager()
+
+    print(f"Scoring {len(rows)} essays ({args.task}, mode={args.mode}) with {len(routings)} routings")
+
+    results = {
+        name: evaluate(name, args.task, args.mode, routing, rows, rag)
+        for name, routing in routings.items()
+    }
+
+    report = {
+        name: summarize(r, results["baseline"], rows)
+        for name, r in results.items()
+    }
+    print_table(report)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({
+                "task": args.task,
+                "mode": args.mode,
+                "routings": {n: r[args.task] for n, r in routings.items()},
+                "summary": report,
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
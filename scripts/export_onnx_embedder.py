@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Export the RAG embedding model to ONNX (+ optional int8 quantization).
+
+Writes into --out (default models/bge-small-en-onnx):
+  - model.onnx       float32 graph, output = last_hidden_state
+  - model_int8.onnx  dynamic int8 weights (--int8)
+  - tokenizer.json   fast tokenizer used by app.embeddings.OnnxEmbedder
+
+Needs torch + transformers (+ onnxruntime for --int8) at export time
+only; serving with EMBEDDING_BACKEND=onnx needs onnxruntime + tokenizers.
+
+Usage:
+  python scripts/export_onnx_embedder.py
+  python scripts/export_onnx_embedder.py --int8 --check
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# ===============================
+# Add project root to sys.path
+# ===============================
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.embeddings import EMBEDDING_MODEL, EMBEDDING_ONNX_DIR
+
+CHECK_TEXTS = [
+    "Some people believe that university education should be free for everyone.",
+    "The bar chart compares the number of visitors to three museums in London.",
+    "Band 7 sample: the writer presents a clear position throughout the response.",
+]
+
+
+def export(model_name: str, out: Path, opset: int):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+
+    sample = tokenizer(CHECK_TEXTS[:2], padding=True, return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[n] for n in names),
+            str(out / "model.onnx"),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+        )
+
+    # tokenizer.json is all the onnx backend needs
+    tokenizer.save_pretrained(str(out))
+    print(f"Exported: {out / 'model.onnx'}")
+
+
+def quantize(out: Path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        str(out / "model.onnx"),
+        str(out / "model_int8.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+    print(f"Quantized: {out / 'model_int8.onnx'}")
+
+
+def check(model_name: str, out: Path, files: list):
+    from app.embeddings import OnnxEmbedder, SentenceTransformerEmbedder
+
+    reference = SentenceTransformerEmbedder(model_name).encode(CHECK_TEXTS)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+
+    for f in files:
+        vectors = OnnxEmbedder(out, f).encode(CHECK_TEXTS)
+        cos = (vectors * reference).sum(axis=1)
+        print(f"{f}: cosine vs sentence-transformers min={cos.min():.5f} mean={cos.mean():.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--out", default=str(ROOT / EMBEDDING_ONNX_DIR))
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--int8", action="store_true", help="also write model_int8.onnx")
+    parser.add_argument("--check", action="store_true", help="compare against sentence-transformers")
+    args = parser.parse_args()
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+
+    export(args.model, out, args.opset)
+    files = ["model.onnx"]
+
+    if args.int8:
+        quantize(out)
+        files.append("model_int8.onnx")
+
+    if args.check:
+        check(args.model, out, files)
+
+
+if __name__ == "__main__":
+    main()
@@ -101,6 +101,8 @@ def main():
         print(f"📌 Indexed: {doc_id}")
         count += 1
 
+    rag.save()
+
     print(f"\n🎉 DONE! Indexed {count} sample files into ChromaDB.\n")
 
 
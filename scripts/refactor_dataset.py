@@ -2,51 +2,82 @@
 """
 Refactor dataset sample files to canonical RAG-ready format.
 Writes back updated .txt files and produces:
- - data/samples/task_index.json  (metadata for all samples)
- - scripts/changes_log.txt      (list of changed files and brief notes)
+ - data/samples/task_index.jsonl       (metadata for all samples, one JSON per line)
+ - data/samples/topic_index.json       (BM25 inverted index topic → sample ids, for RAGManager)
+ - data/samples/.refactor_manifest.json (mtime/size/hash per file for change detection)
+ - scripts/changes_log.txt             (list of changed files and brief notes)
 
 This script is conservative: it preserves original content, extracts existing sections
 when present, and inserts a JSON metadata header, a [SUMMARY] (1-2 sentences), and
 canonical headings: [QUESTION], [SUMMARY], [SAMPLE_ANSWER], [OVERVIEW], [RATIONALE].
 
 It uses filename and in-file markers to infer band and task. It will try not to alter meaning.
+
+Files are normalized in a process pool. A file whose mtime and size match the
+manifest is only hashed (in the pool, not by the parent) and skipped without
+being normalized if the hash matches too; a file whose canonical form equals
+its current content is never rewritten. Writes, the manifest included, are
+atomic (temp file + rename).
+
+Usage:
+  python scripts/refactor_dataset.py [--workers N] [--full]
 """
 
 import re
 import os
+import sys
 import json
+import hashlib
+import argparse
 from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.topic_index import TopicIndexBuilder, tokenize
+
 SAMPLES_DIR = ROOT / 'data' / 'samples'
 CHANGES_LOG = Path(__file__).resolve().parent / 'changes_log.txt'
-TASK_INDEX = ROOT / 'data' / 'samples' / 'task_index.json'
+TASK_INDEX = ROOT / 'data' / 'samples' / 'task_index.jsonl'
+MANIFEST = ROOT / 'data' / 'samples' / '.refactor_manifest.json'
+TOPIC_INDEX = ROOT / 'data' / 'samples' / 'topic_index.json'
 
 # simple stopwords for topic extraction
 STOPWORDS = set("""the a an and or of to in for on with at by from about as is are was were be have has had this that these those it its""".split())
 
+# Compiled once, shared by every file handled in a worker
+HEADER_RE = re.compile(r'^\s*\[(?P<header>[^\]]+)\]\s*$', flags=re.I | re.M)
+NON_ALNUM_RE = re.compile(r'[^A-Z0-9 ]')
+SPACES_RE = re.compile(r'\s+')
+QUESTION_RE = re.compile(r'^(.*?\?)\s')
+PARA_SPLIT_RE = re.compile(r'\n\s*\n')
+BAND_PREFIX_RE = re.compile(r'(?i)^Band\s*\d')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+BAND_FILE_RE = re.compile(r'band\s*(\d)', flags=re.I)
+BAND_TEXT_RE = re.compile(r'Band\s*(\d)', flags=re.I)
+TOPIC_WORD_RE = re.compile(r"[A-Za-z]{3,}")
+
 
 def extract_sections(text):
     # Normalize CRLF
-    text = text.replace('\r\n','\n').strip()
-    lines = text.split('\n')
-    joined = '\n'.join(lines)
+    joined = text.replace('\r\n','\n').strip()
 
     # Find header markers case-insensitive and canonicalize common variants
     # We'll map header variants to canonical headings: QUESTION, SUMMARY, SAMPLE_ANSWER, OVERVIEW, RATIONALE
     sections = {'QUESTION':'','SUMMARY':'','SAMPLE_ANSWER':'','OVERVIEW':'','RATIONALE':''}
 
     # Generic header regex to find bracketed header lines
-    header_regex = re.compile(r'^\s*\[(?P<header>[^\]]+)\]\s*$', flags=re.I | re.M)
-    headers = [(m.start(), m.end(), m.group('header').strip()) for m in header_regex.finditer(joined)]
+    headers = [(m.start(), m.end(), m.group('header').strip()) for m in HEADER_RE.finditer(joined)]
     if headers:
         # Append sentinel end
         headers.append((len(joined),len(joined),'END'))
         for i in range(len(headers)-1):
             raw_name = headers[i][2].strip()
             # canonicalize name for matching
-            name_up = re.sub(r'[^A-Z0-9 ]', ' ', raw_name.upper())
-            name_up = re.sub(r'\s+', ' ', name_up).strip()
+            name_up = NON_ALNUM_RE.sub(' ', raw_name.upper())
+            name_up = SPACES_RE.sub(' ', name_up).strip()
             start = headers[i][1]
             end = headers[i+1][0]
             body = joined[start:end].strip()
@@ -91,24 +122,24 @@ def extract_sections(text):
         # No explicit headers; attempt heuristics
         # Try to find the question as the first paragraph ending with question mark
         q = ''
-        m = re.search(r'^(.*?\?)\s', joined)
+        m = QUESTION_RE.search(joined)
         if m:
             q = m.group(1).strip()
         else:
             # fallback: first paragraph
-            paras = re.split(r'\n\s*\n', joined)
+            paras = PARA_SPLIT_RE.split(joined)
             q = paras[0].strip() if paras else ''
 
         # Find band marker like 'Band 4' or 'BAND 4' in text
         # Find overview or why band by keywords 'Overview' or 'Why band' or 'Why'
         # We'll attempt to find the last short paragraph that looks evaluative
-        paras = [p.strip() for p in re.split(r'\n\s*\n', joined) if p.strip()]
+        paras = [p.strip() for p in PARA_SPLIT_RE.split(joined) if p.strip()]
         sample = ''
         overview = ''
         rationale = ''
         if paras:
             # If the first para starts with 'Band' or contains numbers, treat others as sample
-            if re.match(r'(?i)^Band\s*\d', paras[0]):
+            if BAND_PREFIX_RE.match(paras[0]):
                 sample = '\n\n'.join(paras)
             else:
                 sample = '\n\n'.join(paras[1:]) if len(paras)>1 else paras[0]
@@ -126,7 +157,7 @@ def generate_summary(sections):
     s = sections.get('SUMMARY','').strip()
     if s:
         # take first 2 sentences
-        parts = re.split(r'(?<=[.!?])\s+', s)
+        parts = SENTENCE_SPLIT_RE.split(s)
         return ' '.join(parts[:2]).strip()
     # else derive from SAMPLE_ANSWER or QUESTION
     # Derive summary strictly from SAMPLE_ANSWER first, else QUESTION. Do not invent facts.
@@ -134,7 +165,7 @@ def generate_summary(sections):
     if not base:
         return ''
     # extract first sentence
-    sentences = re.split(r'(?<=[.!?])\s+', base)
+    sentences = SENTENCE_SPLIT_RE.split(base)
     if sentences:
         # take at most two sentences and ensure concise
         first = sentences[0].strip()
@@ -152,18 +183,16 @@ def generate_summary(sections):
 
 
 def infer_band_from_filename(name):
-    m = re.search(r'band(\d)', name, flags=re.I)
+    # 'band4' and 'Band 4' alike
+    m = BAND_FILE_RE.search(name)
     if m:
         return int(m.group(1))
-    m2 = re.search(r'Band\s*(\d)', name, flags=re.I)
-    if m2:
-        return int(m2.group(1))
     return None
 
 
 def extract_topics(text, limit=6):
     # naive keyword extractor: split words, filter stopwords and short words, pick most frequent
-    words = re.findall(r"[A-Za-z]{3,}", text.lower())
+    words = TOPIC_WORD_RE.findall(text.lower())
     freq = {}
     for w in words:
         if w in STOPWORDS:
@@ -178,7 +207,7 @@ def extract_topics(text, limit=6):
 def normalize_band_label(band, sample_answer):
     # Ensure first line of SAMPLE_ANSWER starts with 'Band X' (preserve existing if present)
     sa = sample_answer.strip()
-    if re.match(r'(?i)^Band\s*\d', sa):
+    if BAND_PREFIX_RE.match(sa):
         return sa
     else:
         label = f"Band {band}\n" if band else ''
@@ -187,11 +216,22 @@ def normalize_band_label(band, sample_answer):
 
 def process_file(path: Path):
     raw = path.read_text(encoding='utf-8')
+    metadata, canonical_text, index_text = normalize_text(raw, path)
+
+    # Count as changed only if content differs; never rewrite identical files
+    changed = canonical_text.strip() != raw.strip()
+    if canonical_text != raw:
+        atomic_write(path, canonical_text)
+
+    return metadata, changed, canonical_text, index_text
+
+
+def normalize_text(raw: str, path: Path):
     sections = extract_sections(raw)
     # infer band from filename or sample content
     band = infer_band_from_filename(path.name)
     if not band:
-        m = re.search(r'Band\s*(\d)', sections.get('SAMPLE_ANSWER',''), flags=re.I)
+        m = BAND_TEXT_RE.search(sections.get('SAMPLE_ANSWER',''))
         if m:
             try:
                 band = int(m.group(1))
@@ -216,7 +256,7 @@ def process_file(path: Path):
     question = sections.get('QUESTION','').strip()
     if not question:
         # try to extract from raw first paragraph
-        para = re.split(r'\n\s*\n', raw)
+        para = PARA_SPLIT_RE.split(raw)
         question = para[0].strip() if para else ''
 
     sample_answer = sections.get('SAMPLE_ANSWER','').strip()
@@ -261,44 +301,153 @@ def process_file(path: Path):
     parts = [json_header, '', '[QUESTION]', question or '', '', '[SUMMARY]', summary or '', '', '[SAMPLE_ANSWER]', sample_answer_norm or '', '', '[OVERVIEW]', overview, '', '[RATIONALE]', rationale, '']
     canonical_text = '\n'.join(parts)
 
-    # Always write back to ensure strict normalization; count as changed only if content differs
-    changed = canonical_text.strip() != raw.strip()
-    # Write back unconditionally to guarantee normalization across all files
-    path.write_text(canonical_text, encoding='utf-8')
-    return metadata, changed
+    # text the lexical topic index is built from
+    index_text = question + '\n' + sample_answer
+
+    return metadata, canonical_text, index_text
+
+
+def atomic_write(path: Path, text: str):
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def iter_sample_files(root: Path):
+    """Walk the samples tree lazily (no full file list in memory)."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.name.endswith('.txt') and not entry.name.startswith('.'):
+                    yield Path(entry.path), entry.stat()
+
+
+def load_manifest():
+    if not MANIFEST.exists():
+        return {}
+    try:
+        return json.loads(MANIFEST.read_text(encoding='utf-8'))
+    except Exception:
+        return {}
+
+
+def text_hash(text: str):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_state(path: Path, text: str):
+    st = path.stat()
+    return {
+        'mtime_ns': st.st_mtime_ns,
+        'size': st.st_size,
+        'sha256': text_hash(text),
+    }
+
+
+def maybe_unchanged(prev: dict, st):
+    """mtime/size as a cheap filter; the content hash is confirmed in the pool (process_path)."""
+    return bool(prev and 'terms' in prev and prev.get('sha256')
+                and prev.get('mtime_ns') == st.st_mtime_ns and prev.get('size') == st.st_size)
+
+
+def process_path(item):
+    """
+    Pool worker: item = (path, sha256 of the manifest entry or None).
+    Returns (rel, same, meta, changed, state, error); same → the content
+    still hashes to sha256 and the file was not normalized.
+    """
+    path_str, prev_sha = item
+    p = Path(path_str)
+    rel = str(p.relative_to(ROOT))
+    try:
+        # Same-size edits, restored mtimes → only the hash tells
+        if prev_sha and text_hash(p.read_text(encoding='utf-8')) == prev_sha:
+            return rel, True, None, False, None, None
+        meta, changed, text, index_text = process_file(p)
+        state = {**file_state(p, text), 'terms': dict(Counter(tokenize(index_text)))}
+        return rel, False, meta, changed, state, None
+    except Exception as e:
+        return rel, False, None, False, None, str(e)
+
+
+def doc_id(meta: dict, rel: str):
+    # same id scheme as scripts/index_rubrics.py → Chroma ids
+    return f"{meta['task']}::{meta.get('sample_id') or Path(rel).stem}"
+
+
+def bounded_map(pool, fn, items, window: int):
+    """Like pool.map, but keeps at most `window` tasks in flight (unordered)."""
+    in_flight = set()
+    for item in items:
+        in_flight.add(pool.submit(fn, item))
+        if len(in_flight) >= window:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for f in done:
+                yield f.result()
+    for f in in_flight:
+        yield f.result()
 
 
 def main():
-    all_metadata = []
+    parser = argparse.ArgumentParser(description='Normalize data/samples to the canonical RAG format.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='process pool size')
+    parser.add_argument('--full', action='store_true', help='ignore the manifest and re-check every file')
+    args = parser.parse_args()
+
+    manifest = {} if args.full else load_manifest()
+    new_manifest = {}
+    topics = TopicIndexBuilder()
     changed_files = []
-    total = 0
-    for dirpath, dirnames, filenames in os.walk(SAMPLES_DIR):
-        for fname in filenames:
-            if not fname.endswith('.txt'):
+    total = skipped = 0
+
+    TASK_INDEX.parent.mkdir(parents=True, exist_ok=True)
+    index_tmp = TASK_INDEX.with_name(f'.{TASK_INDEX.name}.tmp')
+
+    def add_topics(meta, rel, terms):
+        topics.add(doc_id(meta, rel), terms, {'task': meta.get('task'), 'band': meta.get('band')})
+
+    def pending():
+        for p, st in iter_sample_files(SAMPLES_DIR):
+            prev = manifest.get(str(p.relative_to(ROOT)))
+            yield str(p), prev['sha256'] if maybe_unchanged(prev, st) else None
+
+    with open(index_tmp, 'w', encoding='utf-8') as index, \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for rel, same, meta, changed, state, error in bounded_map(pool, process_path, pending(), args.workers * 8):
+            if same:
+                # Unchanged since the last run → reuse its metadata
+                prev = manifest[rel]
+                new_manifest[rel] = prev
+                index.write(json.dumps({**prev['metadata'], 'path': rel}, ensure_ascii=False) + '\n')
+                add_topics(prev['metadata'], rel, prev['terms'])
+                skipped += 1
                 continue
-            # skip index file if any
-            if fname == 'task_index.json':
+            total += 1
+            if error:
+                print(f"Error processing {rel}: {error}")
                 continue
-            p = Path(dirpath) / fname
-            try:
-                meta, changed = process_file(p)
-                if meta:
-                    all_metadata.append({**meta, 'path': str(p.relative_to(ROOT))})
-                if changed:
-                    changed_files.append(str(p.relative_to(ROOT)))
-                total += 1
-            except Exception as e:
-                print(f"Error processing {p}: {e}")
-
-    # write task_index.json
-    TASK_INDEX.parent.mkdir(parents=True, exist_ok=True)
-    TASK_INDEX.write_text(json.dumps(all_metadata, ensure_ascii=False, indent=2), encoding='utf-8')
+            if meta:
+                index.write(json.dumps({**meta, 'path': rel}, ensure_ascii=False) + '\n')
+                new_manifest[rel] = {**state, 'metadata': meta}
+                add_topics(meta, rel, state['terms'])
+            if changed:
+                changed_files.append(rel)
+
+    os.replace(index_tmp, TASK_INDEX)
+    topics.build().save(TOPIC_INDEX)
+
+    # manifest is rewritten whole (small: one entry per file)
+    atomic_write(MANIFEST, json.dumps(new_manifest, ensure_ascii=False))
 
     # write changes log
     CHANGES_LOG.write_text('\n'.join([f"{len(changed_files)} files changed:" ] + changed_files), encoding='utf-8')
 
-    print(f"Processed {total} files. Changed {len(changed_files)} files.")
+    print(f"Processed {total} files, skipped {skipped} unchanged. Changed {len(changed_files)} files.")
     print(f"Index written to: {TASK_INDEX}")
+    print(f"Topic index written to: {TOPIC_INDEX}")
     print(f"Changes log: {CHANGES_LOG}")
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Re-score stored phase outputs with the rule engine only (no LLM calls).
+
+Reads the columnar store written by the pipelines (SCORE_STORE_DIR),
+re-applies apply_all_rules + finalize_bands in bulk through
+rule_exec.score_batch and reports how the overall band distribution
+shifts compared to the bands that were served.
+
+Usage:
+  python scripts/rescore.py --store data/score_store
+  python scripts/rescore.py --store data/score_store --rules candidate_rules.py
+  python scripts/rescore.py --store data/score_store --check 1000 --out shift.json
+
+--rules points at a .py file defining HARD_CAP_RULES / SOFT_RULES /
+GRA_CEILING_RULES (any missing dict falls back to app/pipeline/ruleset.py).
+"""
+
+import sys
+import json
+import argparse
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+
+# ===============================
+# Add project root to sys.path
+# ===============================
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+from app.pipeline import ruleset
+from app.pipeline.rule_exec import (
+    CRITERIA,
+    compile_rules,
+    score_batch,
+    apply_all_rules,
+    finalize_bands,
+)
+from app.pipeline.score_store import ScoreStore
+
+# Half-band histogram bins: 0.0, 0.5, ..., 9.0
+BINS = np.arange(0, 9.5, 0.5)
+
+
+def load_rules(path: str | None):
+    if not path:
+        return compile_rules()
+
+    spec = importlib.util.spec_from_file_location("candidate_rules", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return compile_rules(
+        getattr(module, "HARD_CAP_RULES", ruleset.HARD_CAP_RULES),
+        getattr(module, "SOFT_RULES", ruleset.SOFT_RULES),
+        getattr(module, "GRA_CEILING_RULES", ruleset.GRA_CEILING_RULES),
+    )
+
+
+def histogram(values: np.ndarray) -> np.ndarray:
+    idx = np.clip(np.round(values * 2).astype(np.int64), 0, len(BINS) - 1)
+    return np.bincount(idx, minlength=len(BINS))
+
+
+def check_scalar(chunk: dict, new_overall: np.ndarray, rules, limit: int) -> int:
+    """Compare the batch path with apply_all_rules + finalize_bands."""
+    mismatches = 0
+
+    for i in range(min(limit, len(chunk["ids"]))):
+        bands = {
+            c: float(v) for c, v in zip(CRITERIA, chunk["bands"][i])
+            if not np.isnan(v)
+        }
+        violations = {
+            v: {"active": True}
+            for v, on in zip(rules.violations, chunk["violations"][i]) if on
+        }
+        gra_flags = [
+            g for g, on in zip(rules.gra_flags, chunk["gra_flags"][i]) if on
+        ]
+
+        capped, overall_cap, _, _ = apply_all_rules(bands, violations, rules)
+        _, final, _ = finalize_bands(
+            capped, gra_flags, overall_cap,
+            primary="TR" if chunk["task2"][i] else "TA",
+            rules=rules,
+        )
+
+        if final != new_overall[i]:
+            mismatches += 1
+
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--store", required=True, help="score store directory")
+    parser.add_argument("--rules", help="candidate ruleset .py file")
+    parser.add_argument("--check", type=int, default=0, help="rows per chunk to verify against the scalar path")
+    parser.add_argument("--out", help="write the report as JSON")
+    args = parser.parse_args()
+
+    # ScoreStore creates its directory → a mistyped path would read as an empty store
+    if not Path(args.store).is_dir():
+        raise SystemExit(f"Score store not found: {args.store}")
+
+    rules = load_rules(args.rules)
+    store = ScoreStore(args.store, rules=rules)
+
+    old_hist = np.zeros(len(BINS), dtype=np.int64)
+    new_hist = np.zeros(len(BINS), dtype=np.int64)
+    transitions = {}
+    dropped = set()
+    total = changed = up = down = mismatches = 0
+    shift_sum = 0.0
+
+    for chunk in store.iter_chunks(rules):
+        out = score_batch(
+            chunk["bands"],
+            chunk["violations"],
+            chunk["gra_flags"],
+            chunk["task2"],
+            rules,
+        )
+
+        old = chunk["final_band"].astype(float)
+        new = out["overall"]
+        delta = new - old
+
+        total += len(old)
+        changed += int((delta != 0).sum())
+        up += int((delta > 0).sum())
+        down += int((delta < 0).sum())
+        shift_sum += float(delta.sum())
+
+        old_hist += histogram(old)
+        new_hist += histogram(new)
+
+        moved = delta != 0
+        if moved.any():
+            pairs, counts = np.unique(
+                np.stack([old[moved], new[moved]], axis=1),
+                axis=0,
+                return_counts=True,
+            )
+            for (a, b), c in zip(pairs.tolist(), counts.tolist()):
+                transitions[(a, b)] = transitions.get((a, b), 0) + c
+
+        dropped.update(chunk["dropped"])
+
+        if args.check:
+            mismatches += check_scalar(chunk, new, rules, args.check)
+
+    report = {
+        "submissions": total,
+        "changed": changed,
+        "changed_pct": round(100 * changed / total, 2) if total else 0.0,
+        "raised": up,
+        "lowered": down,
+        "mean_shift": round(shift_sum / total, 4) if total else 0.0,
+        "distribution": {
+            f"{b:.1f}": {"before": int(o), "after": int(n)}
+            for b, o, n in zip(BINS, old_hist, new_hist) if o or n
+        },
+        "top_transitions": [
+            {"from": a, "to": b, "count": c}
+            for (a, b), c in sorted(transitions.items(), key=lambda kv: -kv[1])[:15]
+        ],
+        "dropped_violations": sorted(dropped),
+    }
+    if args.check:
+        report["scalar_mismatches"] = mismatches
+
+    print(f"Submissions: {total}  changed: {changed} ({report['changed_pct']}%)"
+          f"  raised: {up}  lowered: {down}  mean shift: {report['mean_shift']:+}")
+    print("\nBand   before    after")
+    for band, row in report["distribution"].items():
+        print(f"{band:>4}  {row['before']:>7}  {row['after']:>7}")
+    if report["top_transitions"]:
+        print("\nTop transitions:")
+        for t in report["top_transitions"]:
+            print(f"  {t['from']:.1f} → {t['to']:.1f}: {t['count']}")
+    if dropped:
+        print(f"\nStored violations unknown to the ruleset (ignored): {', '.join(sorted(dropped))}")
+    if args.check:
+        print(f"\nScalar check mismatches: {mismatches}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nReport written to: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
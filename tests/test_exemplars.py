@@ -0,0 +1,55 @@
+from app.pipeline.exemplars import ExemplarRetriever
+from app.topic_index import TopicIndexBuilder
+
+
+DOCS = {
+    "task1_bar::a": {"task": "task1_bar", "band": 8},
+    "task1_bar::b": {"task": "task1_bar", "band": 7},
+    "task2_opinion::a": {"task": "task2_opinion", "band": 7},
+    "task2_opinion::b": {"task": "task2_opinion", "band": 7},
+    "task2_discussion::a": {"task": "task2_discussion", "band": 6},
+    "task2_discussion::b": {"task": "task2_discussion", "band": 8},
+}
+
+
+class FakeRAG:
+    """Lexical-only retrieve_hybrid over DOCS, every doc matches the query."""
+
+    def __init__(self):
+        builder = TopicIndexBuilder()
+        for doc_id, meta in DOCS.items():
+            builder.add(doc_id, ["technology"], meta)
+        self.index = builder.build()
+        self.calls = []
+
+    def task_values(self):
+        return sorted({m["task"] for m in DOCS.values()})
+
+    def retrieve_hybrid(self, query, top_k=6, where=None):
+        self.calls.append(where)
+        ids = [doc_id for doc_id, _ in self.index.search(query, top_k=top_k, where=where)]
+        return {
+            "ids": ids,
+            "documents": [f"SAMPLE_ANSWER:\n{doc_id}" for doc_id in ids],
+            "metadatas": [DOCS[doc_id] for doc_id in ids],
+        }
+
+
+def test_task_filter_is_passed_to_the_search():
+    rag = FakeRAG()
+    exemplars = ExemplarRetriever(rag, top_k=3).retrieve("Technology question", "opinion_agree_disagree")
+
+    assert rag.calls == [
+        {"task": {"$in": ["task2_opinion"]}},
+        {"task": {"$in": ["task2_discussion", "task2_opinion"]}},
+    ]
+    assert all(e["task"].startswith("task2") for e in exemplars)
+    assert sorted(e["band"] for e in exemplars) == [6, 7, 8]
+
+
+def test_second_search_skipped_when_same_type_covers_top_k():
+    rag = FakeRAG()
+    exemplars = ExemplarRetriever(rag, top_k=1).retrieve("Technology question", "opinion_agree_disagree")
+
+    assert len(rag.calls) == 1
+    assert [e["task"] for e in exemplars] == ["task2_opinion"]
@@ -0,0 +1,96 @@
+from app.pipeline.features import extract_features, rule_violations, with_gra_flags
+
+
+CLEAN = [
+    "The chart shows the number of visitors to three museums.",
+    "Overall, the British Museum was the most popular.",
+    "In 2010, about five million people visited it.",
+    "By contrast, the Science Museum attracted fewer visitors.",
+    "Visits to both museums rose steadily over the decade.",
+]
+
+RUN_ON = (
+    "Many people think that the government should pay for university because education "
+    "is important for the economy and for society and students who study hard deserve "
+    "support and families cannot always afford the fees that universities charge today "
+    "so many young people never go to university at all."
+)
+
+
+def _features(sentences: list) -> dict:
+    return extract_features({"sentences": sentences})
+
+
+def _active(features: dict) -> set:
+    return {k for k, v in features["violations"].items() if v["active"]}
+
+
+def test_clean_text_has_no_flags():
+    features = _features(CLEAN)
+
+    assert _active(features) == set()
+    assert rule_violations(features) == {}
+    assert with_gra_flags([], features) == []
+
+
+def test_repetitive_openings():
+    features = _features([
+        "I think education is important.",
+        "I believe students should work hard.",
+        "I agree that fees are too high.",
+        "Moreover, governments have limited budgets.",
+    ])
+
+    assert features["repeated_openings"] == {"i": 3}
+    assert "repetitive_sentence_openings" in rule_violations(features)
+
+
+def test_article_openings_are_not_repetition():
+    features = _features([
+        "The chart shows sales.",
+        "The figure for 2010 was low.",
+        "The table gives prices.",
+    ])
+
+    assert features["repeated_openings"] == {}
+    assert "repetitive_sentence_openings" not in _active(features)
+
+
+def test_capitalization_errors_become_gra_flag():
+    features = _features([
+        "education is important.",
+        "Students think i should study more.",
+        "Fees are high.",
+    ])
+
+    assert features["capitalization_errors"] == 2
+    assert with_gra_flags([], features) == ["capitalization_errors"]
+
+
+def test_systematic_punctuation_errors():
+    features = _features([
+        "Fees are high , and rising.",
+        "Students work hard,but pay more.",
+        "Governments should help",
+        "Universities agree.",
+    ])
+
+    assert features["punctuation_errors"] == 3
+    assert "systematic_punctuation_errors" in features["gra_flags"]
+
+
+def test_run_on_sentences():
+    features = _features([RUN_ON, RUN_ON, "This is a short sentence."])
+
+    assert features["run_on_sentences"] == 2
+    assert "run_on_sentences" in features["gra_flags"]
+
+
+def test_with_gra_flags_merges_into_llm_violations_dict():
+    features = _features([RUN_ON, RUN_ON])
+    llm = {"tense_errors": {"active": True}}
+
+    merged = with_gra_flags(llm, features)
+
+    assert merged["tense_errors"] == {"active": True}
+    assert merged["run_on_sentences"]["source"] == "local_features"
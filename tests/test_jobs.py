@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from app import jobs as jobs_module
+from app.jobs import JobQueue, check_webhook_url
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(tmp_path / "jobs.sqlite3")
+
+
+def test_exception_with_empty_message_marks_job_failed(queue):
+    # Regression: str(TimeoutError()) == "" was stored as status "done"
+    def handler(payload):
+        raise TimeoutError()
+
+    queue.register("writing", handler)
+    job_id = queue.submit("writing", {})
+    queue._work_once()
+
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "TimeoutError()"
+
+
+def test_expired_lease_requeues_then_fails_after_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(jobs_module, "JOBS_LEASE_S", 0.0)
+    cleaned = []
+    queue.register("writing", lambda payload: {}, cleanup=cleaned.append)
+    job_id = queue.submit("writing", {"n": 1})
+
+    for _ in range(jobs_module.JOBS_MAX_ATTEMPTS):
+        assert queue._claim()["id"] == job_id
+        time.sleep(0.01)
+        queue._requeue_expired()
+
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["attempts"] == jobs_module.JOBS_MAX_ATTEMPTS
+    assert cleaned == [{"n": 1}]
+    assert queue._claim() is None
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "file:///etc/passwd",
+    "http://127.0.0.1:8000/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://10.0.0.5/hook",
+    "http://[::1]/hook",
+])
+def test_webhook_url_rejects_non_http_and_internal_hosts(url):
+    with pytest.raises(ValueError):
+        check_webhook_url(url)
+
+
+def test_webhook_url_allow_list(monkeypatch):
+    monkeypatch.setattr(jobs_module, "WEBHOOK_HOSTS", {"hooks.example.com"})
+
+    assert check_webhook_url("https://hooks.example.com/ielts") == "https://hooks.example.com/ielts"
+    with pytest.raises(ValueError):
+        check_webhook_url("https://other.example.com/ielts")
@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+
+from app import llm_remote
+from app.llm_remote import NvidiaLLM
+
+
+def _chunk(content):
+    delta = SimpleNamespace(content=content, reasoning_content=None)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class FakeStream(list):
+    def close(self):
+        pass
+
+
+class FakeCompletions:
+    """Replays one list of content pieces per create() call."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeStream(_chunk(piece) for piece in self.responses.pop(0))
+
+
+def _llm(responses):
+    llm = NvidiaLLM("key", model="deepseek-ai/deepseek-r1")
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions(responses)))
+    return llm
+
+
+def test_reasoning_model_without_think_stops_at_end_of_json():
+    llm = _llm([['  {"band"', ': 6}', ' trailing text', ' never read']])
+
+    assert llm.ask("sys", "user", phase="phase_fast") == '{"band": 6}'
+
+
+def test_follow_up_answer_after_budget_hit():
+    llm = _llm([
+        ["<think>"] + ["step "] * 20,
+        ['{"band": 7}'],
+    ])
+
+    assert llm.ask("sys", "user", phase="phase_fast", reasoning_tokens=5) == '{"band": 7}'
+    assert len(llm.client.chat.completions.calls) == 2
+
+
+def test_follow_up_that_keeps_reasoning_raises(monkeypatch):
+    monkeypatch.setattr(llm_remote, "FOLLOW_UP_REASONING_TOKENS", 3)
+    llm = _llm([
+        ["<think>"] + ["step "] * 20,
+        ["<think>"] + ["more "] * 20,
+    ])
+
+    with pytest.raises(RuntimeError):
+        llm.ask("sys", "user", phase="phase_fast", reasoning_tokens=5)
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from app.llm_cache import CachedLLM, ResponseCache
+from app.pipeline import phases
+from app.singleflight import SingleFlight
+
+
+GOOD = json.dumps({"bands": {"TASK": 6, "CC": 6.5, "LR": 6, "GRA": 5.5}, "summary": "Clear position."})
+NO_GRA = json.dumps({"bands": {"TASK": 6, "CC": 6.5, "LR": 6}, "summary": "?"})
+NO_BANDS = json.dumps({"summary": "?"})
+
+
+class Replay:
+    model = "replay"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def ask(self, system_prompt, user_prompt, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+def _fast(llm):
+    return phases.phase_fast(llm, "Question?", "Essay text.", {}, "TR")
+
+
+def test_missing_band_is_retried_then_accepted():
+    llm = Replay(NO_GRA, GOOD)
+
+    fast = _fast(llm)
+
+    assert llm.calls == 2
+    assert fast["bands"] == {"TR": 6.0, "CC": 6.5, "LR": 6.0, "GRA": 5.5}
+
+
+def test_no_bands_twice_fails_instead_of_defaulting():
+    with pytest.raises(RuntimeError):
+        _fast(Replay(NO_BANDS, NO_BANDS))
+
+
+def test_band_less_response_is_not_cached():
+    backend = Replay(NO_BANDS, GOOD)
+    llm = CachedLLM(
+        backend,
+        cache=ResponseCache(),
+        validate=lambda raw: True,
+        flight=SingleFlight(),
+        validators={"phase_fast": phases.fast_has_bands},
+    )
+
+    assert _fast(llm)["bands"]["TR"] == 6.0
+    assert backend.calls == 2
+    # The good answer is cached → no third call
+    assert _fast(llm)["bands"]["GRA"] == 5.5
+    assert backend.calls == 2
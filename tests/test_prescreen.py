@@ -0,0 +1,61 @@
+import pytest
+
+from app.pipeline.prescreen import PreScreen, prescreen_result
+
+
+QUESTION = (
+    "Some people believe that university education should be free for everyone. "
+    "To what extent do you agree or disagree?"
+)
+SENTENCE = "I think that students who work hard in their studies should get help from the state. "
+
+
+def _words(n: int) -> str:
+    words = (SENTENCE * (n // 15 + 1)).split()
+    return " ".join(words[:n])
+
+
+@pytest.mark.parametrize("answer, reason", [
+    ("", "empty"),
+    ("   ... !!! ", "empty"),
+    ("我认为大学教育应该对所有人免费，因为教育是每个人的基本权利。" * 3, "not_english"),
+    (QUESTION, "copied_prompt"),
+    (_words(30), "too_short"),
+])
+def test_junk_is_rejected(answer, reason):
+    screen = PreScreen().check(QUESTION, answer, task=2)
+
+    assert not screen["passed"]
+    assert screen["reason"] == reason
+
+
+def test_full_length_answer_passes_without_embedder():
+    screen = PreScreen().check(QUESTION, _words(260), task=2)
+
+    assert screen["passed"]
+    assert screen["reason"] is None
+
+
+@pytest.mark.parametrize("words, band", [(8, 1.0), (20, 1.0), (30, 2.0), (60, 3.0)])
+def test_too_short_band_scales_with_word_count(words, band):
+    screen = PreScreen().check(QUESTION, _words(words), task=2)
+    result = prescreen_result(screen, task=2)
+
+    assert screen["reason"] == "too_short"
+    assert result["overall"]["band"] == band
+    assert {b["band"] for b in result["bands"].values()} == {band}
+
+
+@pytest.mark.parametrize("task, main", [(1, "TA"), (2, "TR")])
+def test_result_has_pipeline_shape(task, main):
+    screen = PreScreen().check(QUESTION, QUESTION, task=task)
+    result = prescreen_result(screen, task=task)
+
+    assert result["task"] == f"IELTS Writing Task {task}"
+    assert set(result["overall"]) == {"band", "note", "hard_caps"}
+    assert set(result["bands"]) == {main, "CC", "LR", "GRA"}
+    for criterion, band in result["bands"].items():
+        assert {"base_band", "final_band", "band", "violations"} <= set(band)
+    assert "prescreen_copied_prompt" in result["bands"][main]["violations"]
+    assert result["feedback"]["type"] == "tutor_feedback"
+    assert result["prescreen"] is screen
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from app.pipeline.rule_exec import (
+    CRITERIA,
+    RULES,
+    apply_all_rules,
+    finalize_bands,
+    score_batch,
+)
+
+
+def _random_case(rng):
+    primary = "TR" if rng.random() < 0.5 else "TA"
+    bands = {c: float(rng.integers(6, 19)) / 2 for c in (primary, "CC", "LR", "GRA")}
+    violations = {
+        v: {"active": bool(rng.random() < 0.2), "location": "", "evidence": "", "reason": ""}
+        for v in RULES.violations
+    }
+    gra_flags = [g for g in RULES.gra_flags if rng.random() < 0.2]
+    return primary, bands, violations, gra_flags
+
+
+def _scalar(primary, bands, violations, gra_flags):
+    capped, overall_cap, _, _ = apply_all_rules(bands, violations)
+    return finalize_bands(capped, gra_flags, overall_cap, primary=primary)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_score_batch_matches_scalar_path(seed):
+    rng = np.random.default_rng(seed)
+    cases = [_random_case(rng) for _ in range(200)]
+
+    out = score_batch(
+        np.stack([RULES.band_vector(bands) for _, bands, _, _ in cases]),
+        np.stack([RULES.violation_mask(violations) for _, _, violations, _ in cases]),
+        np.stack([RULES.gra_mask(flags) for _, _, _, flags in cases]),
+        np.array([primary == "TR" for primary, _, _, _ in cases]),
+    )
+
+    for i, case in enumerate(cases):
+        final_bands, final, _ = _scalar(*case)
+        assert out["overall"][i] == final, case
+        for criterion, band in final_bands.items():
+            assert out["bands"][i, CRITERIA.index(criterion)] == band, (criterion, case)
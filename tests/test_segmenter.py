@@ -0,0 +1,39 @@
+from app.pipeline import segmenter
+
+
+INTRO = (
+    "The bar chart compares the number of visitors to four London museums "
+    "between 2010 and 2020."
+)
+BODY_1 = (
+    "In 2010, the British Museum received about 5 million visitors. "
+    "The Science Museum attracted roughly 3 million people in the same year."
+)
+BODY_2 = (
+    "By 2020, visits to the Tate Modern had doubled to 6 million. "
+    "The Natural History Museum grew more slowly and reached 4 million."
+)
+
+
+def test_task1_overview_with_marker_is_accepted_locally():
+    overview = (
+        "Overall, the British Museum was the most popular attraction, "
+        "while the Tate Modern showed the fastest growth."
+    )
+    parsed = segmenter.segment_task1("\n\n".join([INTRO, overview, BODY_1, BODY_2]))
+
+    assert parsed["overview"] == overview
+    assert parsed["_confidence"] >= segmenter.MIN_CONFIDENCE
+
+
+def test_task1_overview_without_marker_falls_back_to_llm():
+    # Regression: returned _confidence 0.8 with overview "" → phase2_ta
+    # flagged no_overview on an essay that has one
+    overview = (
+        "As can be seen, the British Museum was the most popular attraction, "
+        "while the Tate Modern showed the fastest growth."
+    )
+    parsed = segmenter.segment_task1("\n\n".join([INTRO, overview, BODY_1, BODY_2]))
+
+    assert parsed["overview"] == ""
+    assert parsed["_confidence"] < segmenter.MIN_CONFIDENCE
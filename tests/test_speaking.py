@@ -0,0 +1,37 @@
+import pytest
+
+from app.pipeline import speaking
+
+
+class Replay:
+    model = "replay"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def ask(self, system_prompt, user_prompt, **kwargs):
+        return self.responses.pop(0)
+
+
+@pytest.mark.parametrize("raw", ['{"band": 65}', '{"band": -1}', '{"band": "9.5"}', '{"comment": "ok"}'])
+def test_out_of_range_or_missing_band_is_rejected(raw):
+    with pytest.raises(ValueError):
+        speaking._parse_criterion(raw, "FC")
+    assert not speaking._has_band(raw)
+
+
+def test_out_of_range_band_is_retried_then_reported_failed():
+    llm = Replay('{"band": 70}', '{"band": 70}')
+
+    result = speaking.score_criterion(llm, "FC", "Describe your hometown.", "I live in Hanoi.")
+
+    assert result["band"] is None
+    assert result["failed"]
+
+
+def test_valid_band_after_retry():
+    llm = Replay('{"band": 70}', '{"band": 7}')
+
+    result = speaking.score_criterion(llm, "LR", "Describe your hometown.", "I live in Hanoi.")
+
+    assert result["band"] == 7.0
@@ -0,0 +1,142 @@
+import struct
+import hashlib
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.uploads import BodySizeLimitMiddleware, UploadStore
+
+
+BOUNDARY = "testboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def multipart(fields: dict, files: dict) -> bytes:
+    out = b""
+    for name, value in fields.items():
+        out += (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+            f"{value}\r\n"
+        ).encode()
+    for name, (filename, data) in files.items():
+        out += (
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'
+        ).encode() + data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+
+def chunked(body: bytes, size: int = 1024):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def wav(seconds: float, byte_rate: int = 16000) -> bytes:
+    data = b"\0" * int(seconds * byte_rate)
+    fmt = struct.pack("<HHIIHH", 1, 1, byte_rate // 2, byte_rate, 2, 16)
+    return (
+        b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+        + b"fmt " + struct.pack("<I", 16) + fmt
+        + b"data" + struct.pack("<I", len(data)) + data
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(directory=str(tmp_path), spool_bytes=4096)
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=64 * 1024)
+    files = {"file": {"max_bytes": 16 * 1024, "max_seconds": 1.0, "suffix": None}}
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        async with store.form(request, files=files, max_field_bytes=1024) as (fields, uploads):
+            entry = uploads.get("file")
+            return {
+                "fields": fields,
+                "sha256": entry.sha256 if entry else None,
+                "suffix": entry.suffix if entry else None,
+                "entries": store.stats()["entries"],
+            }
+
+    return TestClient(app)
+
+
+def test_upload_fields_and_file(client, store):
+    data = wav(0.5)
+    r = client.post("/upload", content=multipart({"question": "Q?"}, {"file": ("a.wav", data)}),
+                    headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["fields"] == {"question": "Q?"}
+    assert body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert body["suffix"] == ".wav"
+    assert body["entries"] == 1
+    # Released when the request scope ends
+    assert store.stats()["entries"] == 0
+
+
+def test_oversized_chunked_body_is_413(client):
+    body = multipart({}, {"file": ("a.bin", b"x" * (128 * 1024))})
+    r = client.post("/upload", content=chunked(body), headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 413
+
+
+def test_oversized_content_length_is_413(client):
+    body = multipart({}, {"file": ("a.bin", b"x" * (128 * 1024))})
+    r = client.post("/upload", content=body, headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 413
+
+
+def test_file_field_limit_is_enforced_while_streaming(client, store):
+    body = multipart({}, {"file": ("a.bin", b"x" * (32 * 1024))})
+    r = client.post("/upload", content=chunked(body), headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 413
+    assert "exceeds" in r.json()["detail"]
+    assert store.stats()["entries"] == 0
+
+
+def test_wav_duration_limit(client):
+    r = client.post("/upload", content=multipart({}, {"file": ("a.wav", wav(2.0, byte_rate=4000))}),
+                    headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 413
+    assert "longer" in r.json()["detail"]
+
+
+def test_text_field_limit(client):
+    r = client.post("/upload", content=multipart({"answer": "w " * 1000}, {}),
+                    headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 413
+
+
+def test_unexpected_file_field_is_422(client):
+    r = client.post("/upload", content=multipart({}, {"other": ("a.png", b"png")}),
+                    headers={"content-type": CONTENT_TYPE})
+
+    assert r.status_code == 422
+
+
+def test_empty_file_input_and_urlencoded_form(client):
+    r = client.post("/upload", content=multipart({"q": "1"}, {"file": ("", b"")}),
+                    headers={"content-type": CONTENT_TYPE})
+    assert r.status_code == 200
+    assert r.json()["sha256"] is None
+
+    r = client.post("/upload", data={"q": "2"})
+    assert r.status_code == 200
+    assert r.json()["fields"] == {"q": "2"}